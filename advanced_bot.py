@@ -1,10 +1,24 @@
 import asyncio
 import logging
-from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+from datetime import time as dt_time, timedelta, timezone
+from telegram import Update
 from telegram.ext import Application, CommandHandler, MessageHandler, CallbackQueryHandler, filters, ContextTypes
 from weather_api import WeatherAPI
 from news_api import NewsAPI
+from news_index import NewsIndex
 from currency_api import CurrencyAPI
+from http_client import HttpClient
+from user_settings import UserSettingsStore
+from update_processor import ChatOrderedUpdateProcessor
+from progressive_reply import ProgressiveReplier
+from send_queue import PRIORITY_ALERT, PRIORITY_BULK, OutboundDispatcher
+from subscriptions import CURRENCY, KINDS, NEWS, WEATHER, DigestEngine, SubscriptionStore
+from alerts import ABOVE, BELOW, RATE, TEMPERATURE, WIND, AlertEngine
+from geo import geohash_center, geohash_encode, is_valid_geohash
+from prefetch import PrefetchScheduler
+from cache_store import SQLiteCacheStore
+from webhook import run_webhook
+import rendering
 import config
 
 # Настройка логирования
@@ -18,61 +32,45 @@ class AdvancedWeatherBot:
     """Расширенный телеграм бот с функциями погоды, новостей и валют"""
     
     def __init__(self):
-        self.weather_api = WeatherAPI()
-        self.news_api = NewsAPI()
-        self.currency_api = CurrencyAPI()
+        self.http_client = HttpClient()
+        self.user_settings = UserSettingsStore(config.USER_DB_PATH, config.USER_SETTINGS_CACHE_SIZE)
+        self.cache_store = SQLiteCacheStore(config.CACHE_DB_PATH) if config.PERSISTENT_CACHE_ENABLED else None
+        self.weather_api = WeatherAPI(self.http_client, self.cache_store)
+        self.news_index = NewsIndex(config.NEWS_INDEX_DB_PATH, config.NEWS_INDEX_MAX_ARTICLES) \
+            if config.NEWS_INDEX_ENABLED else None
+        self.news_api = NewsAPI(self.http_client, self.cache_store, self.news_index)
+        self.currency_api = CurrencyAPI(self.http_client, self.cache_store)
+        self.prefetcher = PrefetchScheduler(self.weather_api, self.currency_api, self.news_api)
+        self.update_processor = ChatOrderedUpdateProcessor(config.MAX_CONCURRENT_UPDATES)
+        self.replier = ProgressiveReplier(config.REPLY_PLACEHOLDER_DELAY, config.REPLY_PROGRESS_INDICATOR)
+        self.subscriptions = SubscriptionStore(config.USER_DB_PATH)
+        self.digests = DigestEngine(
+            self.subscriptions, self.weather_api, self.currency_api, self.news_api,
+            send=self._send_digest, send_concurrency=config.DIGEST_SEND_CONCURRENCY
+        )
+        self.alerts = AlertEngine(config.USER_DB_PATH, self.weather_api, self.currency_api, send=self._send_alert)
+        self.send_queue = OutboundDispatcher(
+            global_rate=config.TELEGRAM_GLOBAL_RATE,
+            chat_rate=config.TELEGRAM_CHAT_RATE,
+            chat_burst=config.TELEGRAM_CHAT_BURST,
+            group_rate_per_minute=config.TELEGRAM_GROUP_RATE_PER_MINUTE,
+            max_retries=config.TELEGRAM_MAX_RETRIES,
+            max_chat_buckets=config.TELEGRAM_MAX_CHAT_BUCKETS
+        )
+        # Валюты для сообщения с курсами: (код, символ) в порядке популярности
+        self.rate_currencies = tuple(
+            (currency, self.currency_api.get_currency_symbol(currency))
+            for currency in self.currency_api.get_popular_currencies()
+        )
         self.application = None
     
     async def start_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Обработчик команды /start"""
-        keyboard = [
-            [InlineKeyboardButton("🌤️ Погода", callback_data="weather_menu")],
-            [InlineKeyboardButton("📰 Новости", callback_data="news_menu")],
-            [InlineKeyboardButton("💱 Курсы валют", callback_data="currency_menu")],
-            [InlineKeyboardButton("⚙️ Настройки", callback_data="settings")],
-            [InlineKeyboardButton("❓ Помощь", callback_data="help")]
-        ]
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        
-        welcome_text = """
-🤖 **Добро пожаловать в Advanced Weather Bot!**
-
-Этот бот поможет вам:
-• 🌤️ Узнать погоду в любом городе
-• 📰 Читать последние новости
-• 💱 Следить за курсами валют
-• ⚙️ Настраивать параметры
-
-Выберите нужную функцию:
-        """.strip()
-        
-        await update.message.reply_text(welcome_text, reply_markup=reply_markup)
+        await update.message.reply_text(rendering.WELCOME_TEXT, reply_markup=rendering.MAIN_MENU_KEYBOARD)
     
     async def help_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Обработчик команды /help"""
-        help_text = """
-📚 **Справка по использованию бота:**
-
-**🌤️ Погода:**
-• `/weather <город>` - текущая погода
-• `/forecast <город>` - прогноз на 5 дней
-
-**📰 Новости:**
-• `/news` - топ новости России
-• `/news <категория>` - новости по категории
-• `/search <запрос>` - поиск новостей
-
-**💱 Валюты:**
-• `/currency` - курсы валют
-• `/convert <сумма> <из> <в>` - конвертер
-
-**⚙️ Настройки:**
-• `/settings` - настройки бота
-
-💡 **Совет:** Просто напишите название города для получения погоды!
-        """.strip()
-        
-        await update.message.reply_text(help_text)
+        await update.message.reply_text(rendering.HELP_TEXT)
     
     # === ОБРАБОТЧИКИ ПОГОДЫ ===
     async def weather_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -85,6 +83,11 @@ class AdvancedWeatherBot:
             return
         
         city = " ".join(context.args)
+        if "," in city:
+            # /weather Москва, Казань, Сочи - погода сразу в нескольких городах
+            cities = list(dict.fromkeys(name.strip() for name in city.split(",") if name.strip()))
+            await self._show_current_weather_many(update, context, cities[:config.MAX_CITIES_PER_REQUEST])
+            return
         await self._show_current_weather(update, context, city)
     
     async def forecast_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -144,13 +147,244 @@ class AdvancedWeatherBot:
         """Обработчик команды /settings"""
         await self._show_settings(update, context)
     
+    # === ОБРАБОТЧИКИ ПОДПИСОК ===
+    async def subscribe_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Обработчик команды /subscribe <weather|currency|news> <тема> [час]"""
+        args = list(context.args)
+        hour = config.DIGEST_DEFAULT_HOUR
+        if len(args) >= 3 and args[-1].isdigit():
+            hour = int(args.pop())
+        if len(args) < 2 or args[0].lower() not in KINDS or not 0 <= hour <= 23:
+            await update.message.reply_text(
+                "❌ Неправильный формат команды!\n"
+                "Примеры:\n"
+                "/subscribe weather Москва\n"
+                "/subscribe currency USD RUB 9\n"
+                "/subscribe news technology"
+            )
+            return
+        
+        chat_id = update.effective_chat.id
+        kind = args[0].lower()
+        # Повторная подписка на ту же тему только меняет час и не занимает место
+        if (len(self.subscriptions.for_chat(chat_id)) >= config.MAX_SUBSCRIPTIONS_PER_CHAT and
+                not self.subscriptions.has(chat_id, kind, self._normalize_topic(kind, args[1:]))):
+            await update.message.reply_text(
+                f"❌ Можно оформить не больше {config.MAX_SUBSCRIPTIONS_PER_CHAT} подписок."
+            )
+            return
+        
+        topic = await self._subscription_topic(update, kind, args[1:])
+        if topic is None:
+            return
+        
+        settings = self.user_settings.get(update.effective_user.id)
+        self.subscriptions.add(chat_id, kind, topic, settings.language, settings.units, hour)
+        await update.message.reply_text(
+            f"✅ Подписка оформлена: {self._describe_subscription(kind, topic)}\n"
+            f"Сводка будет приходить каждый день в {hour:02d}:00 (UTC+{config.DIGEST_UTC_OFFSET})."
+        )
+    
+    async def unsubscribe_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Обработчик команды /unsubscribe [тип [тема]]"""
+        args = list(context.args)
+        kind = args[0].lower() if args else None
+        if kind is not None and kind not in KINDS:
+            await update.message.reply_text("❌ Тип подписки: weather, currency или news.")
+            return
+        
+        topic = None
+        if kind and len(args) > 1:
+            topic = self._normalize_topic(kind, args[1:])
+        removed = self.subscriptions.remove(update.effective_chat.id, kind, topic)
+        if removed:
+            await update.message.reply_text(f"✅ Отменено подписок: {removed}")
+        else:
+            await update.message.reply_text("ℹ️ Подходящих подписок нет. Список: /subscriptions")
+    
+    async def subscriptions_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Обработчик команды /subscriptions"""
+        rows = self.subscriptions.for_chat(update.effective_chat.id)
+        if not rows:
+            await update.message.reply_text(
+                "🔔 У вас нет подписок.\n"
+                "Оформить: /subscribe weather Москва"
+            )
+            return
+        
+        message = "🔔 **Ваши подписки:**\n\n"
+        for kind, topic, hour in rows:
+            message += f"• {self._describe_subscription(kind, topic)} - в {hour:02d}:00\n"
+        message += "\nОтменить: /unsubscribe <тип> <тема> или /unsubscribe для всех"
+        await update.message.reply_text(message)
+    
+    async def _subscription_topic(self, update: Update, kind: str, args: list):
+        """Проверить тему подписки; при ошибке ответить пользователю и вернуть None"""
+        topic = self._normalize_topic(kind, args)
+        if kind == WEATHER:
+            settings = self.user_settings.get(update.effective_user.id)
+            if not await self.weather_api.get_current_weather(topic, settings.language, settings.units):
+                await update.message.reply_text(
+                    f"❌ Город '{' '.join(args)}' не найден." + self._city_hint(' '.join(args))
+                )
+                return None
+        elif kind == CURRENCY:
+            currencies = topic.split('/')
+            if len(currencies) != 2 or not all(len(code) == 3 and code.isalpha() for code in currencies):
+                await update.message.reply_text("❌ Укажите две валюты, например: /subscribe currency USD RUB")
+                return None
+        elif kind == NEWS:
+            categories = self.news_api.get_available_categories()
+            if topic not in categories:
+                await update.message.reply_text(f"❌ Доступные категории: {', '.join(categories)}")
+                return None
+        return topic
+    
+    def _normalize_topic(self, kind: str, args: list) -> str:
+        """Тема подписки в том виде, в каком она хранится"""
+        if kind == WEATHER:
+            return self.weather_api.city_key(self._canonical_city(" ".join(args)))
+        if kind == CURRENCY:
+            return "/".join(code.upper() for code in args[:2])
+        return args[0].lower()
+    
+    def _describe_subscription(self, kind: str, topic: str) -> str:
+        """Подпись подписки для пользователя"""
+        if kind == WEATHER:
+            return f"🌤️ погода, {self.weather_api.city_name(topic)}"
+        if kind == CURRENCY:
+            return f"💱 курс {topic}"
+        return f"📰 новости, {topic}"
+    
+    async def _send_digest(self, chat_id: int, text: str):
+        """Отправить сводку подписчику (после ответов пользователям в очереди)"""
+        await self.application.bot.send_message(
+            chat_id, text, disable_web_page_preview=True, rate_limit_args=PRIORITY_BULK
+        )
+    
+    async def _digest_job(self, context: ContextTypes.DEFAULT_TYPE):
+        """Задача рассылки сводок подписчикам текущего часа"""
+        await self.digests.run(context.job.data)
+    
+    # === ОБРАБОТЧИКИ УВЕДОМЛЕНИЙ ===
+    async def alert_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Обработчик команды /alert <пара|temp город|wind город> <>|<> <порог>"""
+        args = list(context.args)
+        try:
+            threshold = float(args[-1].replace(',', '.'))
+            direction = args[-2]
+            subject_args = args[:-2]
+        except (IndexError, ValueError):
+            direction, subject_args = None, []
+        if direction not in (ABOVE, BELOW) or not subject_args:
+            await update.message.reply_text(
+                "❌ Неправильный формат команды!\n"
+                "Примеры:\n"
+                "/alert USD/RUB > 100\n"
+                "/alert wind Москва > 15\n"
+                "/alert temp Москва < -20"
+            )
+            return
+        
+        chat_id = update.effective_chat.id
+        if len(self.alerts.for_chat(chat_id)) >= config.MAX_ALERTS_PER_CHAT:
+            await update.message.reply_text(f"❌ Можно создать не больше {config.MAX_ALERTS_PER_CHAT} уведомлений.")
+            return
+        
+        metric = subject_args[0].lower()
+        if metric in (TEMPERATURE, WIND):
+            city = self._canonical_city(" ".join(subject_args[1:]))
+            if not city or not await self.weather_api.get_current_weather(city):
+                await update.message.reply_text("❌ Город не найден." + self._city_hint(city))
+                return
+            subject = self.weather_api.city_key(city)
+        else:
+            metric = RATE
+            currencies = [code for code in "/".join(subject_args).upper().split("/") if code]
+            if len(currencies) != 2 or not all(len(code) == 3 and code.isalpha() for code in currencies):
+                await update.message.reply_text("❌ Укажите пару валют, например: /alert USD/RUB > 100")
+                return
+            subject = "/".join(currencies)
+        
+        rule, already_met = await self.alerts.add(chat_id, metric, subject, direction, threshold)
+        message = f"✅ Уведомление создано: {rendering.describe_alert(rule, self.alerts.subject_name(rule))}"
+        if already_met:
+            message += "\nУсловие уже выполняется: уведомление придет после следующего пересечения порога."
+        await update.message.reply_text(message)
+    
+    async def alerts_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Обработчик команды /alerts"""
+        rules = self.alerts.for_chat(update.effective_chat.id)
+        if not rules:
+            await update.message.reply_text("🔔 У вас нет уведомлений.\nСоздать: /alert USD/RUB > 100")
+            return
+        
+        message = "🔔 **Ваши уведомления:**\n\n"
+        message += "\n".join(rendering.describe_alert(rule, self.alerts.subject_name(rule)) for rule in rules)
+        message += "\n\nУдалить: /unalert <номер> или /unalert для всех"
+        await update.message.reply_text(message)
+    
+    async def unalert_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Обработчик команды /unalert [номер]"""
+        rule_id = None
+        if context.args:
+            try:
+                rule_id = int(context.args[0].lstrip('#'))
+            except ValueError:
+                await update.message.reply_text("❌ Укажите номер уведомления из /alerts")
+                return
+        removed = self.alerts.remove(update.effective_chat.id, rule_id)
+        if removed:
+            await update.message.reply_text(f"✅ Удалено уведомлений: {removed}")
+        else:
+            await update.message.reply_text("ℹ️ Подходящих уведомлений нет. Список: /alerts")
+    
+    async def _send_alert(self, chat_id: int, text: str):
+        """Отправить уведомление (после ответов пользователям, раньше сводок)"""
+        await self.application.bot.send_message(chat_id, text, rate_limit_args=PRIORITY_ALERT)
+    
+    # === СЛУЖЕБНЫЕ КОМАНДЫ ===
+    async def stats_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Обработчик команды /stats (только для администраторов)"""
+        if update.effective_user.id not in config.ADMIN_IDS:
+            return
+        
+        sections = {
+            'Очередь обновлений': self.update_processor.stats(),
+            'Ответы': self.replier.stats(),
+            'Исходящие сообщения': self.send_queue.stats(),
+            'Подписки': self.digests.stats(),
+            'Уведомления': self.alerts.stats(),
+            'Кэш погоды': self.weather_api.cache.stats(),
+            'Кэш новостей': self.news_api.cache.stats(),
+            'Статьи': self.news_api.store.stats(),
+            'Поиск по статьям': self.news_index.stats() if self.news_index is not None else {'enabled': 0},
+            'Кэш валют': self.currency_api.cache.stats(),
+            'Фоновое обновление': self.prefetcher.stats(),
+            'Кэш сообщений': rendering.render_cache_stats(),
+            'Лимиты OpenWeatherMap': self.weather_api.limiter.stats(),
+            'Лимиты News API': self.news_api.limiter.stats(),
+            'Ключи OpenWeatherMap': self.weather_api.keys.stats(),
+            'Ключи News API': self.news_api.keys.stats(),
+            'Ключи ExchangeRate-API': self.currency_api.keys.stats(),
+            **{f'Доступность {name}': breaker.stats() for name, breaker in self.http_client.breakers.items()}
+        }
+        
+        message = "📊 Статистика бота\n"
+        for title, values in sections.items():
+            message += f"\n{title}:\n"
+            for name, value in values.items():
+                message += f"• {name}: {value}\n"
+        
+        await update.message.reply_text(message.strip())
+    
     # === ОБРАБОТЧИКИ СООБЩЕНИЙ ===
     async def handle_message(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Обработчик текстовых сообщений"""
         text = update.message.text.strip()
         
         # Если сообщение похоже на название города, показываем погоду
-        if len(text) > 1 and text.replace(' ', '').isalpha():
+        if self.weather_api.known_city(text) or (len(text) > 1 and text.replace(' ', '').isalpha()):
             await self._show_current_weather(update, context, text)
         else:
             await update.message.reply_text(
@@ -162,6 +396,23 @@ class AdvancedWeatherBot:
                 "/currency - курсы валют"
             )
     
+    async def handle_location(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Обработчик геопозиции: погода в точке без поиска города по названию"""
+        location = update.message.location
+        settings = self.user_settings.get(update.effective_user.id)
+        weather_data = await self.weather_api.get_current_weather_at(
+            location.latitude, location.longitude, settings.language, settings.units
+        )
+        
+        if weather_data:
+            cell = geohash_encode(location.latitude, location.longitude, config.GEO_CELL_PRECISION)
+            await update.message.reply_text(
+                rendering.render_weather(weather_data, settings.units),
+                reply_markup=rendering.forecast_button(cell)
+            )
+        else:
+            await update.message.reply_text("❌ Не удалось получить погоду для этого места.")
+    
     # === ОБРАБОТЧИКИ CALLBACK ===
     async def handle_callback(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Обработчик callback кнопок"""
@@ -180,6 +431,8 @@ class AdvancedWeatherBot:
             await self._show_help_menu(query)
         elif query.data == "back_to_main":
             await self._show_main_menu(query)
+        elif query.data.startswith(("weather_city_", "weather_asis_")):
+            await self._handle_city_choice(update, context)
         elif query.data.startswith("weather_"):
             await self._handle_weather_callback(query, context)
         elif query.data.startswith("news_"):
@@ -192,99 +445,35 @@ class AdvancedWeatherBot:
     # === МЕНЮ ПОГОДЫ ===
     async def _show_weather_menu(self, query):
         """Показать меню погоды"""
-        keyboard = [
-            [InlineKeyboardButton("🌤️ Погода сейчас", callback_data="weather_current")],
-            [InlineKeyboardButton("📅 Прогноз на 5 дней", callback_data="weather_forecast")],
-            [InlineKeyboardButton("🔙 Назад", callback_data="back_to_main")]
-        ]
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        
-        await query.edit_message_text(
-            "🌤️ **Меню погоды**\n\n"
-            "Выберите, что хотите узнать:",
-            reply_markup=reply_markup
-        )
+        await query.edit_message_text(rendering.WEATHER_MENU_TEXT, reply_markup=rendering.WEATHER_MENU_KEYBOARD)
     
     # === МЕНЮ НОВОСТЕЙ ===
     async def _show_news_menu(self, query):
         """Показать меню новостей"""
-        categories = self.news_api.get_available_categories()
-        keyboard = []
-        
-        # Создаем кнопки для категорий (по 2 в ряд)
-        for i in range(0, len(categories), 2):
-            row = []
-            row.append(InlineKeyboardButton(
-                categories[i].title(), 
-                callback_data=f"news_category_{categories[i]}"
-            ))
-            if i + 1 < len(categories):
-                row.append(InlineKeyboardButton(
-                    categories[i + 1].title(), 
-                    callback_data=f"news_category_{categories[i + 1]}"
-                ))
-            keyboard.append(row)
-        
-        keyboard.append([InlineKeyboardButton("🔙 Назад", callback_data="back_to_main")])
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        
+        categories = tuple(self.news_api.get_available_categories())
         await query.edit_message_text(
-            "📰 **Меню новостей**\n\n"
-            "Выберите категорию новостей:",
-            reply_markup=reply_markup
+            rendering.NEWS_MENU_TEXT, reply_markup=rendering.news_menu_keyboard(categories)
         )
     
     # === МЕНЮ ВАЛЮТ ===
     async def _show_currency_menu(self, query):
         """Показать меню валют"""
-        keyboard = [
-            [InlineKeyboardButton("💱 Курсы валют", callback_data="currency_rates")],
-            [InlineKeyboardButton("🔄 Конвертер", callback_data="currency_converter")],
-            [InlineKeyboardButton("🔙 Назад", callback_data="back_to_main")]
-        ]
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        
-        await query.edit_message_text(
-            "💱 **Меню валют**\n\n"
-            "Выберите функцию:",
-            reply_markup=reply_markup
-        )
+        await query.edit_message_text(rendering.CURRENCY_MENU_TEXT, reply_markup=rendering.CURRENCY_MENU_KEYBOARD)
     
     # === МЕНЮ НАСТРОЕК ===
     async def _show_settings_menu(self, query):
         """Показать меню настроек"""
-        keyboard = [
-            [InlineKeyboardButton("🇷🇺 Русский", callback_data="settings_lang_ru")],
-            [InlineKeyboardButton("🇺🇸 English", callback_data="settings_lang_en")],
-            [InlineKeyboardButton("🌡️ Цельсий", callback_data="settings_units_metric")],
-            [InlineKeyboardButton("🌡️ Фаренгейт", callback_data="settings_units_imperial")],
-            [InlineKeyboardButton("🔙 Назад", callback_data="back_to_main")]
-        ]
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        
-        await query.edit_message_text(
-            "⚙️ **Настройки бота**\n\n"
-            "Выберите язык и единицы измерения:",
-            reply_markup=reply_markup
-        )
+        await query.edit_message_text(rendering.SETTINGS_MENU_TEXT, reply_markup=rendering.SETTINGS_MENU_KEYBOARD)
     
     # === ГЛАВНОЕ МЕНЮ ===
     async def _show_main_menu(self, query):
         """Показать главное меню"""
-        keyboard = [
-            [InlineKeyboardButton("🌤️ Погода", callback_data="weather_menu")],
-            [InlineKeyboardButton("📰 Новости", callback_data="news_menu")],
-            [InlineKeyboardButton("💱 Курсы валют", callback_data="currency_menu")],
-            [InlineKeyboardButton("⚙️ Настройки", callback_data="settings")],
-            [InlineKeyboardButton("❓ Помощь", callback_data="help")]
-        ]
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        
-        await query.edit_message_text(
-            "🤖 **Главное меню**\n\n"
-            "Выберите нужную функцию:",
-            reply_markup=reply_markup
-        )
+        await query.edit_message_text(rendering.MAIN_MENU_TEXT, reply_markup=rendering.MAIN_MENU_KEYBOARD)
+    
+    # === СПРАВКА ===
+    async def _show_help_menu(self, query):
+        """Показать справку"""
+        await query.edit_message_text(rendering.HELP_TEXT, reply_markup=rendering.BACK_TO_MAIN_KEYBOARD)
     
     # === ОБРАБОТЧИКИ CALLBACK ПО ФУНКЦИЯМ ===
     async def _handle_weather_callback(self, query, context):
@@ -299,6 +488,25 @@ class AdvancedWeatherBot:
                 "📅 Введите название города для получения прогноза на 5 дней:"
             )
             context.user_data['waiting_for'] = 'weather_forecast'
+        elif query.data.startswith("weather_geo_forecast_"):
+            cell = query.data[len("weather_geo_forecast_"):]
+            if is_valid_geohash(cell):
+                await self._show_forecast_at(query, cell)
+    
+    async def _handle_city_choice(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Выбор города после вопроса о названии не из справочника"""
+        query = update.callback_query
+        _, choice, action, *rest = query.data.split("_")
+        if choice == "city":
+            known = self.weather_api.city_by_id(int(rest[0])) if rest and rest[0].isdigit() else None
+            city = known.name if known else None
+        else:
+            city = context.user_data.pop('unlisted_city', None)
+        if not city:
+            await query.edit_message_text("❌ Выбор устарел, напишите название города еще раз.")
+            return
+        show = self._show_forecast if action == "forecast" else self._show_current_weather
+        await show(update, context, city, confirmed=True)
     
     async def _handle_news_callback(self, query, context):
         """Обработка callback для новостей"""
@@ -312,255 +520,302 @@ class AdvancedWeatherBot:
             await self._show_currency_rates_callback(query, context)
         elif query.data == "currency_converter":
             await query.edit_message_text(
-                "🔄 **Конвертер валют**\n\n"
-                "Используйте команду:\n"
-                "`/convert <сумма> <из> <в>`\n\n"
-                "Примеры:\n"
-                "• `/convert 100 USD RUB`\n"
-                "• `/convert 50 EUR USD`\n"
-                "• `/convert 1000 RUB EUR`\n\n"
-                "🔙 Нажмите кнопку для возврата:",
-                reply_markup=InlineKeyboardMarkup([[
-                    InlineKeyboardButton("🔙 Назад", callback_data="currency_menu")
-                ]])
+                rendering.CONVERTER_HELP_TEXT, reply_markup=rendering.BACK_TO_CURRENCY_KEYBOARD
             )
     
     async def _handle_settings_callback(self, query, context):
         """Обработка callback для настроек"""
         if query.data.startswith("settings_lang_"):
             lang = query.data.split("_")[2]
-            self.weather_api.language = lang
+            settings = self.user_settings.get(query.from_user.id)
+            self.user_settings.set(query.from_user.id, settings.with_language(lang))
             await query.edit_message_text(f"✅ Язык изменен на: {lang.upper()}")
         elif query.data.startswith("settings_units_"):
             units = query.data.split("_")[2]
-            self.weather_api.units = units
+            settings = self.user_settings.get(query.from_user.id)
+            self.user_settings.set(query.from_user.id, settings.with_units(units))
             await query.edit_message_text(f"✅ Единицы измерения изменены на: {units}")
     
     # === ФУНКЦИИ ПОКАЗА ДАННЫХ ===
-    async def _show_current_weather(self, update: Update, context: ContextTypes.DEFAULT_TYPE, city: str):
+    async def _show_current_weather(self, update: Update, context: ContextTypes.DEFAULT_TYPE, city: str,
+                                    confirmed: bool = False):
         """Показать текущую погоду"""
-        await update.message.reply_text(f"🌤️ Получаю погоду для города {city}...")
-        
-        weather_data = await self.weather_api.get_current_weather(city)
-        
-        if weather_data:
-            emoji = self.weather_api.get_weather_emoji(weather_data['icon'])
-            temp_unit = "°C" if self.weather_api.units == "metric" else "°F"
-            wind_unit = "м/с" if self.weather_api.units == "metric" else "миль/ч"
-            
-            message = f"""
-{emoji} **Погода в {weather_data['city']}, {weather_data['country']}**
-
-🌡️ Температура: {weather_data['temperature']}{temp_unit}
-🌡️ Ощущается как: {weather_data['feels_like']}{temp_unit}
-☁️ Описание: {weather_data['description']}
-💧 Влажность: {weather_data['humidity']}%
-🌪️ Ветер: {weather_data['wind_speed']} {wind_unit}
-📊 Давление: {weather_data['pressure']} гПа
-            """.strip()
-            
-            await update.message.reply_text(message)
-        else:
-            await update.message.reply_text(
+        if not confirmed and await self._confirm_city(update, context, city, "current"):
+            return
+        city = self._canonical_city(city)
+        settings = self.user_settings.get(update.effective_user.id)
+        self.prefetcher.record_city(city, settings.language, settings.units)
+        
+        async def produce():
+            weather_data = await self.weather_api.get_current_weather(city, settings.language, settings.units)
+            if weather_data:
+                return rendering.render_weather(weather_data, settings.units), {}
+            return (
                 f"❌ Не удалось получить погоду для города {city}.\n"
                 "Проверьте правильность названия города."
-            )
+            ), {}
+        
+        await self._deliver(update, f"🌤️ Получаю погоду для города {city}...", produce())
     
-    async def _show_forecast(self, update: Update, context: ContextTypes.DEFAULT_TYPE, city: str):
+    async def _show_current_weather_many(self, update: Update, context: ContextTypes.DEFAULT_TYPE, cities: list):
+        """Показать текущую погоду в нескольких городах одним сообщением"""
+        cities = list(dict.fromkeys(self._canonical_city(city) for city in cities))
+        settings = self.user_settings.get(update.effective_user.id)
+        for city in cities:
+            self.prefetcher.record_city(city, settings.language, settings.units)
+        
+        async def produce():
+            weather_by_city = await self.weather_api.get_current_weather_many(cities, settings.language, settings.units)
+            lines = []
+            for city in cities:
+                weather_data = weather_by_city.get(city)
+                if weather_data:
+                    lines.append(rendering.render_weather_line(weather_data, settings.units))
+                else:
+                    lines.append(f"❌ {city}: не удалось получить погоду")
+            return "\n".join(lines), {}
+        
+        await self.replier.reply(update.message, f"🌤️ Получаю погоду для городов: {', '.join(cities)}...", produce())
+    
+    async def _show_forecast(self, update: Update, context: ContextTypes.DEFAULT_TYPE, city: str,
+                             confirmed: bool = False):
         """Показать прогноз погоды"""
-        await update.message.reply_text(f"📅 Получаю прогноз погоды для города {city}...")
+        if not confirmed and await self._confirm_city(update, context, city, "forecast"):
+            return
+        city = self._canonical_city(city)
+        settings = self.user_settings.get(update.effective_user.id)
+        self.prefetcher.record_city(city, settings.language, settings.units)
+        
+        async def produce():
+            forecast_data = await self.weather_api.get_forecast(city, settings.language, settings.units)
+            if forecast_data:
+                return rendering.render_forecast(forecast_data, settings.units), {}
+            return (
+                f"❌ Не удалось получить прогноз для города {city}.\n"
+                "Проверьте правильность названия города."
+            ), {}
         
-        forecast_data = await self.weather_api.get_forecast(city)
+        await self._deliver(update, f"📅 Получаю прогноз погоды для города {city}...", produce())
+    
+    async def _show_forecast_at(self, query, cell: str):
+        """Показать прогноз погоды для ячейки geohash (кнопка под погодой по геопозиции)"""
+        settings = self.user_settings.get(query.from_user.id)
+        lat, lon = geohash_center(cell)
+        forecast_data = await self.weather_api.get_forecast_at(lat, lon, settings.language, settings.units)
         
         if forecast_data:
-            temp_unit = "°C" if self.weather_api.units == "metric" else "°F"
-            
-            message = f"📅 **Прогноз погоды в {forecast_data['city']}, {forecast_data['country']}**\n\n"
-            
-            for forecast in forecast_data['forecasts']:
-                emoji = self.weather_api.get_weather_emoji(forecast['icon'])
-                date = forecast['date']
-                message += f"{emoji} **{date}**\n"
-                message += f"🌡️ {forecast['temperature']}{temp_unit} | 💧 {forecast['humidity']}%\n"
-                message += f"☁️ {forecast['description']}\n\n"
-            
-            await update.message.reply_text(message.strip())
+            await query.message.reply_text(rendering.render_forecast(forecast_data, settings.units))
         else:
-            await update.message.reply_text(
-                f"❌ Не удалось получить прогноз для города {city}.\n"
-                "Проверьте правильность названия города."
-            )
+            await query.message.reply_text("❌ Не удалось получить прогноз для этого места.")
     
     async def _show_news(self, update: Update, context: ContextTypes.DEFAULT_TYPE, category: str = "general"):
         """Показать новости по категории"""
-        await update.message.reply_text(f"📰 Получаю новости категории '{category}'...")
-        
-        news_data = await self.news_api.get_top_headlines(country="ru", category=category, limit=5)
-        
-        if news_data:
-            message = f"📰 **Топ новости России - {category.title()}**\n\n"
-            
-            for i, news in enumerate(news_data, 1):
-                message += f"**{i}. {news['title']}**\n"
-                message += f"📝 {news['description']}\n"
-                message += f"📰 Источник: {news['source']}\n"
-                if news['url']:
-                    message += f"🔗 [Читать далее]({news['url']})\n"
-                message += "\n"
-            
-            await update.message.reply_text(message.strip(), disable_web_page_preview=True)
-        else:
-            await update.message.reply_text(
+        async def produce():
+            news_data = await self.news_api.get_top_headlines(country="ru", category=category, limit=5)
+            if news_data:
+                message = rendering.render_news(f"📰 **Топ новости России - {category.title()}**", tuple(news_data))
+                return message, {'disable_web_page_preview': True}
+            return (
                 f"❌ Не удалось получить новости категории '{category}'.\n"
                 "Возможно, API ключ не настроен или произошла ошибка."
-            )
+            ), {}
+        
+        await self.replier.reply(update.message, f"📰 Получаю новости категории '{category}'...", produce())
     
     async def _search_news(self, update: Update, context: ContextTypes.DEFAULT_TYPE, query: str):
         """Поиск новостей по запросу"""
-        await update.message.reply_text(f"🔍 Ищу новости по запросу '{query}'...")
-        
-        news_data = await self.news_api.search_news(query, limit=5)
-        
-        if news_data:
-            message = f"🔍 **Результаты поиска: '{query}'**\n\n"
-            
-            for i, news in enumerate(news_data, 1):
-                message += f"**{i}. {news['title']}**\n"
-                message += f"📝 {news['description']}\n"
-                message += f"📰 Источник: {news['source']}\n"
-                if news['url']:
-                    message += f"🔗 [Читать далее]({news['url']})\n"
-                message += "\n"
-            
-            await update.message.reply_text(message.strip(), disable_web_page_preview=True)
-        else:
-            await update.message.reply_text(
+        async def produce():
+            news_data = await self.news_api.search_news(query, limit=5)
+            if news_data:
+                message = rendering.render_news(f"🔍 **Результаты поиска: '{query}'**", tuple(news_data))
+                return message, {'disable_web_page_preview': True}
+            return (
                 f"❌ Не удалось найти новости по запросу '{query}'.\n"
                 "Попробуйте изменить поисковый запрос."
-            )
+            ), {}
+        
+        await self.replier.reply(update.message, f"🔍 Ищу новости по запросу '{query}'...", produce())
     
     async def _show_news_by_category(self, query, context, category: str):
         """Показать новости по категории через callback"""
-        await query.edit_message_text(f"📰 Получаю новости категории '{category}'...")
-        
-        news_data = await self.news_api.get_top_headlines(country="ru", category=category, limit=5)
-        
-        if news_data:
-            message = f"📰 **Топ новости России - {category.title()}**\n\n"
-            
-            for i, news in enumerate(news_data, 1):
-                message += f"**{i}. {news['title']}**\n"
-                message += f"📝 {news['description']}\n"
-                message += f"📰 Источник: {news['source']}\n"
-                if news['url']:
-                    message += f"🔗 [Читать далее]({news['url']})\n"
-                message += "\n"
-            
-            keyboard = [[InlineKeyboardButton("🔙 Назад к категориям", callback_data="news_menu")]]
-            reply_markup = InlineKeyboardMarkup(keyboard)
-            
-            await query.edit_message_text(
-                message.strip(), 
-                reply_markup=reply_markup,
-                disable_web_page_preview=True
-            )
-        else:
-            await query.edit_message_text(
-                f"❌ Не удалось получить новости категории '{category}'.",
-                reply_markup=InlineKeyboardMarkup([[
-                    InlineKeyboardButton("🔙 Назад", callback_data="news_menu")
-                ]])
-            )
+        async def produce():
+            news_data = await self.news_api.get_top_headlines(country="ru", category=category, limit=5)
+            if news_data:
+                message = rendering.render_news(f"📰 **Топ новости России - {category.title()}**", tuple(news_data))
+                return message, {
+                    'reply_markup': rendering.BACK_TO_NEWS_CATEGORIES_KEYBOARD,
+                    'disable_web_page_preview': True
+                }
+            return f"❌ Не удалось получить новости категории '{category}'.", {
+                'reply_markup': rendering.BACK_TO_NEWS_KEYBOARD
+            }
+        
+        await self.replier.edit(query, f"📰 Получаю новости категории '{category}'...", produce())
     
     async def _show_currency_rates(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Показать курсы валют"""
-        await update.message.reply_text("💱 Получаю курсы валют...")
-        
-        rates_data = await self.currency_api.get_all_rates("RUB")
-        
-        if rates_data:
-            popular_currencies = self.currency_api.get_popular_currencies()
-            message = f"💱 **Курсы валют относительно {rates_data['base']}**\n"
-            message += f"📅 Дата: {rates_data['date']}\n\n"
-            
-            for currency, name in popular_currencies.items():
-                if currency != "RUB" and currency in rates_data['rates']:
-                    rate = rates_data['rates'][currency]
-                    symbol = self.currency_api.get_currency_symbol(currency)
-                    message += f"{symbol} **{currency}**: {rate:.4f}\n"
-            
-            await update.message.reply_text(message.strip())
-        else:
-            await update.message.reply_text(
+        async def produce():
+            rates_data = await self.currency_api.get_all_rates("RUB")
+            if rates_data:
+                return rendering.render_rates(rates_data, self.rate_currencies), {}
+            return (
                 "❌ Не удалось получить курсы валют.\n"
                 "Попробуйте позже."
-            )
+            ), {}
+        
+        await self.replier.reply(update.message, "💱 Получаю курсы валют...", produce())
     
     async def _show_currency_rates_callback(self, query, context):
         """Показать курсы валют через callback"""
-        await query.edit_message_text("💱 Получаю курсы валют...")
-        
-        rates_data = await self.currency_api.get_all_rates("RUB")
-        
-        if rates_data:
-            popular_currencies = self.currency_api.get_popular_currencies()
-            message = f"💱 **Курсы валют относительно {rates_data['base']}**\n"
-            message += f"📅 Дата: {rates_data['date']}\n\n"
-            
-            for currency, name in popular_currencies.items():
-                if currency != "RUB" and currency in rates_data['rates']:
-                    rate = rates_data['rates'][currency]
-                    symbol = self.currency_api.get_currency_symbol(currency)
-                    message += f"{symbol} **{currency}**: {rate:.4f}\n"
-            
-            keyboard = [[InlineKeyboardButton("🔙 Назад", callback_data="currency_menu")]]
-            reply_markup = InlineKeyboardMarkup(keyboard)
-            
-            await query.edit_message_text(
-                message.strip(),
-                reply_markup=reply_markup
-            )
-        else:
-            await query.edit_message_text(
-                "❌ Не удалось получить курсы валют.",
-                reply_markup=InlineKeyboardMarkup([[
-                    InlineKeyboardButton("🔙 Назад", callback_data="currency_menu")
-                ]])
-            )
+        async def produce():
+            rates_data = await self.currency_api.get_all_rates("RUB")
+            if rates_data:
+                text = rendering.render_rates(rates_data, self.rate_currencies)
+            else:
+                text = "❌ Не удалось получить курсы валют."
+            return text, {'reply_markup': rendering.BACK_TO_CURRENCY_KEYBOARD}
+        
+        await self.replier.edit(query, "💱 Получаю курсы валют...", produce())
     
     async def _convert_currency(self, update: Update, context: ContextTypes.DEFAULT_TYPE, 
                                amount: float, from_currency: str, to_currency: str):
         """Конвертировать валюту"""
+        async def produce():
+            conversion_data = await self.currency_api.convert_currency(amount, from_currency, to_currency)
+            if conversion_data:
+                from_symbol = self.currency_api.get_currency_symbol(from_currency)
+                to_symbol = self.currency_api.get_currency_symbol(to_currency)
+                return rendering.render_conversion(conversion_data, from_symbol, to_symbol), {}
+            return (
+                f"❌ Не удалось конвертировать {amount} {from_currency} в {to_currency}.\n"
+                "Проверьте правильность кодов валют."
+            ), {}
+        
+        await self.replier.reply(
+            update.message, f"🔄 Конвертирую {amount} {from_currency} в {to_currency}...", produce()
+        )
+    
+    def _canonical_city(self, city: str) -> str:
+        """Название города из справочника для синонимов (СПб, Питер); остальные - как есть"""
+        known = self.weather_api.known_city(city)
+        return known.name if known else city
+    
+    async def _confirm_city(self, update: Update, context: ContextTypes.DEFAULT_TYPE, city: str, action: str) -> bool:
+        """Спросить о городе не из справочника, если в нем есть похожие, до запроса к API.
+        
+        Возвращает True, если вместо погоды показан выбор города. Похожий
+        город не подставляется сам: похожее название часто оказывается
+        другим реальным городом, поэтому есть кнопка "Искать как написано".
+        """
+        if self.weather_api.known_city(city):
+            return False
+        suggestions = self.weather_api.suggest_cities(city)
+        if not suggestions:
+            return False
+        context.user_data['unlisted_city'] = city
         await update.message.reply_text(
-            f"🔄 Конвертирую {amount} {from_currency} в {to_currency}..."
+            f"🔎 Города '{city}' нет в справочнике. Возможно, вы имели в виду:",
+            reply_markup=rendering.city_choice_keyboard([(known.id, known.name) for known in suggestions], action)
         )
-        
-        conversion_data = await self.currency_api.convert_currency(amount, from_currency, to_currency)
-        
-        if conversion_data:
-            from_symbol = self.currency_api.get_currency_symbol(from_currency)
-            to_symbol = self.currency_api.get_currency_symbol(to_currency)
-            
-            message = f"""
-🔄 **Конвертация валют**
-
-💰 **{amount} {from_symbol}{from_currency}** = **{conversion_data['converted_amount']} {to_symbol}{to_currency}**
-
-📊 Курс: 1 {from_currency} = {conversion_data['rate']:.4f} {to_currency}
-📅 Дата: {conversion_data['date']}
-            """.strip()
-            
-            await update.message.reply_text(message)
+        return True
+    
+    async def _deliver(self, update: Update, placeholder: str, produce) -> None:
+        """Ответить на сообщение или заменить сообщение с кнопками выбора города"""
+        if update.callback_query:
+            await self.replier.edit(update.callback_query, placeholder, produce)
         else:
-            await update.message.reply_text(
-                f"❌ Не удалось конвертировать {amount} {from_currency} в {to_currency}.\n"
-                "Проверьте правильность кодов валют."
-            )
+            await self.replier.reply(update.message, placeholder, produce)
+    
+    def _city_hint(self, city: str) -> str:
+        """Подсказка с похожими городами из справочника"""
+        names = [known.name for known in self.weather_api.suggest_cities(city) if known.name != city]
+        if not names:
+            return ""
+        return "\nВозможно, вы имели в виду: " + ", ".join(names)
     
     async def _show_settings(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Показать настройки"""
         await self._show_settings_menu(update)
     
+    async def _post_init(self, application: Application):
+        """Инициализация общих ресурсов после запуска приложения"""
+        await self.http_client.start()
+        
+        # Восстанавливаем кэш, сохраненный до перезапуска
+        if self.cache_store:
+            for cache in self._api_caches():
+                loaded = await cache.warm_load(config.CACHE_WARM_LOAD_LIMIT)
+                logger.info(f"Загружено из постоянного кэша '{cache.name}': {loaded}")
+            self.currency_api.warm_rate_table()
+        
+        # Периодически обновляем таблицу кросс-курсов и кэш популярных запросов
+        if application.job_queue:
+            application.job_queue.run_repeating(
+                self._refresh_rate_table_job,
+                interval=config.RATE_TABLE_REFRESH_INTERVAL,
+                first=0
+            )
+            if self.cache_store:
+                application.job_queue.run_repeating(
+                    self._flush_cache_job,
+                    interval=config.CACHE_FLUSH_INTERVAL,
+                    first=config.CACHE_FLUSH_INTERVAL
+                )
+            if config.PREFETCH_ENABLED:
+                application.job_queue.run_repeating(
+                    self.prefetcher.run,
+                    interval=config.PREFETCH_INTERVAL,
+                    first=config.PREFETCH_INTERVAL
+                )
+            application.job_queue.run_repeating(
+                self.alerts.check,
+                interval=config.ALERT_CHECK_INTERVAL,
+                first=config.ALERT_CHECK_INTERVAL
+            )
+            digest_timezone = timezone(timedelta(hours=config.DIGEST_UTC_OFFSET))
+            for hour in range(24):
+                application.job_queue.run_daily(
+                    self._digest_job,
+                    time=dt_time(hour=hour, tzinfo=digest_timezone),
+                    data=hour,
+                    name=f"digest_{hour:02d}"
+                )
+        else:
+            logger.warning("JobQueue недоступна: фоновое обновление данных отключено")
+    
+    async def _refresh_rate_table_job(self, context: ContextTypes.DEFAULT_TYPE):
+        """Задача обновления таблицы кросс-курсов"""
+        if not await self.currency_api.refresh_rate_table():
+            logger.warning("Не удалось обновить таблицу кросс-курсов")
+    
+    async def _flush_cache_job(self, context: ContextTypes.DEFAULT_TYPE):
+        """Задача сохранения кэша на диск"""
+        await self._flush_caches()
+    
+    def _api_caches(self):
+        """Кэши всех API клиентов"""
+        return [self.weather_api.cache, self.news_api.cache, self.currency_api.cache]
+    
+    async def _flush_caches(self):
+        """Сохранить измененные записи всех кэшей на диск"""
+        for cache in self._api_caches():
+            try:
+                await cache.flush()
+            except Exception as e:
+                logger.error(f"Ошибка сохранения кэша '{cache.name}': {e}")
+    
+    async def _post_shutdown(self, application: Application):
+        """Освобождение общих ресурсов при остановке приложения"""
+        await self.http_client.close()
+        self.user_settings.close()
+        self.subscriptions.close()
+        self.alerts.close()
+        if self.news_index is not None:
+            self.news_index.close()
+        if self.cache_store:
+            await self._flush_caches()
+            self.cache_store.close()
+    
     def run(self):
         """Запуск бота"""
         if not config.BOT_TOKEN:
@@ -568,7 +823,15 @@ class AdvancedWeatherBot:
             return
         
         # Создаем приложение
-        self.application = Application.builder().token(config.BOT_TOKEN).build()
+        self.application = (
+            Application.builder()
+            .token(config.BOT_TOKEN)
+            .concurrent_updates(self.update_processor)
+            .rate_limiter(self.send_queue)
+            .post_init(self._post_init)
+            .post_shutdown(self._post_shutdown)
+            .build()
+        )
         
         # Добавляем обработчики команд
         self.application.add_handler(CommandHandler("start", self.start_command))
@@ -580,14 +843,26 @@ class AdvancedWeatherBot:
         self.application.add_handler(CommandHandler("currency", self.currency_command))
         self.application.add_handler(CommandHandler("convert", self.convert_command))
         self.application.add_handler(CommandHandler("settings", self.settings_command))
+        self.application.add_handler(CommandHandler("subscribe", self.subscribe_command))
+        self.application.add_handler(CommandHandler("unsubscribe", self.unsubscribe_command))
+        self.application.add_handler(CommandHandler("subscriptions", self.subscriptions_command))
+        self.application.add_handler(CommandHandler("alert", self.alert_command))
+        self.application.add_handler(CommandHandler("alerts", self.alerts_command))
+        self.application.add_handler(CommandHandler("unalert", self.unalert_command))
+        self.application.add_handler(CommandHandler("stats", self.stats_command))
         
         # Добавляем обработчики callback и сообщений
         self.application.add_handler(CallbackQueryHandler(self.handle_callback))
         self.application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, self.handle_message))
+        self.application.add_handler(MessageHandler(filters.LOCATION, self.handle_location))
         
         # Запускаем бота
-        logger.info("Расширенный бот запущен!")
-        self.application.run_polling()
+        if config.UPDATE_MODE == "webhook":
+            logger.info(f"Расширенный бот запущен в режиме webhook на порту {config.WEBHOOK_PORT}!")
+            run_webhook(self.application)
+        else:
+            logger.info("Расширенный бот запущен!")
+            self.application.run_polling()
 
 if __name__ == "__main__":
     bot = AdvancedWeatherBot()
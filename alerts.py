@@ -0,0 +1,309 @@
+import bisect
+import logging
+import sqlite3
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+import rendering
+import config
+
+logger = logging.getLogger(__name__)
+
+# Величины, за которыми можно следить
+RATE = 'rate'  # курс пары валют, subject - "USD/RUB"
+TEMPERATURE = 'temp'  # температура в городе (°C), subject - ключ города
+WIND = 'wind'  # скорость ветра в городе (м/с), subject - ключ города
+METRICS = (RATE, TEMPERATURE, WIND)
+
+# Направление пересечения порога
+ABOVE = '>'
+BELOW = '<'
+
+# (величина, объект) - один поток значений, на который подписаны правила
+MetricKey = Tuple[str, str]
+
+
+@dataclass(frozen=True)
+class AlertRule:
+    """Правило уведомления: величина пересекла порог в заданную сторону"""
+    __slots__ = ('id', 'chat_id', 'metric', 'subject', 'direction', 'threshold', 'hysteresis')
+    id: int
+    chat_id: int
+    metric: str
+    subject: str
+    direction: str
+    threshold: float
+    hysteresis: float
+
+    def is_met(self, value: float) -> bool:
+        """Условие выполняется для значения value"""
+        return value > self.threshold if self.direction == ABOVE else value < self.threshold
+
+
+class RuleIndex:
+    """Правила одной величины, отсортированные по порогам.
+
+    Взведенные правила "выше" срабатывают, когда значение больше порога,
+    поэтому сработавшие - это префикс списка, найденный bisect; правила
+    "ниже" - суффикс своего списка. Сработавшее правило переносится в
+    список ожидающих по уровню повторного взвода (порог минус/плюс
+    гистерезис) и не срабатывает снова, пока значение туда не вернется.
+    Проверка значения - O(log n + число сработавших и перевзведенных).
+    """
+    __slots__ = ('armed_above', 'armed_below', 'fired_above', 'fired_below', 'last_value')
+
+    def __init__(self):
+        # Взведенные: (порог, id, уровень взвода); сработавшие: (уровень взвода, id, порог)
+        self.armed_above: List[Tuple[float, int, float]] = []
+        self.armed_below: List[Tuple[float, int, float]] = []
+        self.fired_above: List[Tuple[float, int, float]] = []
+        self.fired_below: List[Tuple[float, int, float]] = []
+        self.last_value: Optional[float] = None
+
+    def __len__(self) -> int:
+        return len(self.armed_above) + len(self.armed_below) + len(self.fired_above) + len(self.fired_below)
+
+    def _entry(self, rule: AlertRule, armed: bool) -> Tuple[List[Tuple[float, int, float]], Tuple[float, int, float]]:
+        """Список, в котором лежит правило, и его запись в этом списке"""
+        if rule.direction == ABOVE:
+            rearm_level = rule.threshold - rule.hysteresis
+            if armed:
+                return self.armed_above, (rule.threshold, rule.id, rearm_level)
+            return self.fired_above, (rearm_level, rule.id, rule.threshold)
+        rearm_level = rule.threshold + rule.hysteresis
+        if armed:
+            return self.armed_below, (rule.threshold, rule.id, rearm_level)
+        return self.fired_below, (rearm_level, rule.id, rule.threshold)
+
+    def add(self, rule: AlertRule, armed: bool):
+        """Добавить правило взведенным или уже сработавшим"""
+        items, entry = self._entry(rule, armed)
+        bisect.insort(items, entry)
+
+    def remove(self, rule: AlertRule):
+        """Удалить правило, в каком бы списке оно ни было"""
+        for armed in (True, False):
+            items, entry = self._entry(rule, armed)
+            position = bisect.bisect_left(items, entry)
+            if position < len(items) and items[position] == entry:
+                del items[position]
+                return
+
+    def update(self, value: float) -> Tuple[List[int], List[int]]:
+        """Учесть новое значение: вернуть id сработавших и перевзведенных правил"""
+        self.last_value = value
+        below_value = (value, -1)  # меньше любой записи с этим уровнем
+        above_value = (value, float('inf'))  # больше любой записи с этим уровнем
+
+        # Срабатывают взведенные "выше" с порогом < value и "ниже" с порогом > value
+        end = bisect.bisect_left(self.armed_above, below_value)
+        fired_above = self.armed_above[:end]
+        del self.armed_above[:end]
+        start = bisect.bisect_right(self.armed_below, above_value)
+        fired_below = self.armed_below[start:]
+        del self.armed_below[start:]
+
+        # Перевзводятся правила, значение для которых вернулось за уровень взвода
+        start = bisect.bisect_right(self.fired_above, above_value)
+        rearmed_above = self.fired_above[start:]
+        del self.fired_above[start:]
+        end = bisect.bisect_left(self.fired_below, below_value)
+        rearmed_below = self.fired_below[:end]
+        del self.fired_below[:end]
+
+        for items, moved in ((self.fired_above, fired_above), (self.fired_below, fired_below),
+                             (self.armed_above, rearmed_above), (self.armed_below, rearmed_below)):
+            for level, rule_id, other_level in moved:
+                bisect.insort(items, (other_level, rule_id, level))
+
+        return [rule_id for _, rule_id, _ in fired_above + fired_below], \
+            [rule_id for _, rule_id, _ in rearmed_above + rearmed_below]
+
+
+class AlertEngine:
+    """Уведомления о пересечении порогов курсами валют и погодой.
+
+    Правила хранятся в SQLite, в памяти - RuleIndex на каждую величину.
+    check() раз в несколько минут берет курсы (get_all_rates) и погоду
+    в городах с правилами (get_current_weather_many) и проверяет только
+    изменившиеся свежие значения. Сработавшее правило отправляет одно
+    уведомление и молчит, пока значение не вернется за гистерезис.
+    """
+
+    def __init__(self, path: str, weather_api, currency_api, send: Callable[[int, str], Awaitable]):
+        self.weather_api = weather_api
+        self.currency_api = currency_api
+        self.send = send
+        self.rules: Dict[int, AlertRule] = {}
+        self.indexes: Dict[MetricKey, RuleIndex] = {}
+        self.checks = 0
+        self.evaluated = 0
+        self.notified = 0
+        self._conn = sqlite3.connect(path)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS alerts ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " chat_id INTEGER NOT NULL,"
+            " metric TEXT NOT NULL,"
+            " subject TEXT NOT NULL,"
+            " direction TEXT NOT NULL,"
+            " threshold REAL NOT NULL,"
+            " hysteresis REAL NOT NULL,"
+            " armed INTEGER NOT NULL DEFAULT 1"
+            ")"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS alerts_chat ON alerts (chat_id)")
+        self._conn.commit()
+        for *fields, armed in self._conn.execute(
+            "SELECT id, chat_id, metric, subject, direction, threshold, hysteresis, armed FROM alerts"
+        ):
+            self._index(AlertRule(*fields), bool(armed))
+
+    def _index(self, rule: AlertRule, armed: bool):
+        """Добавить правило в память"""
+        self.rules[rule.id] = rule
+        key = (rule.metric, rule.subject)
+        index = self.indexes.get(key)
+        if index is None:
+            index = self.indexes[key] = RuleIndex()
+        index.add(rule, armed)
+
+    async def add(self, chat_id: int, metric: str, subject: str, direction: str,
+                  threshold: float) -> Tuple[AlertRule, bool]:
+        """Создать правило; второй результат - условие уже выполняется сейчас.
+
+        Текущее значение берется из последней проверки, а если величину
+        еще не проверяли - из API (обычно из кэша). Если оно уже за
+        порогом, правило создается сработавшим: уведомление придет после
+        возврата значения и нового пересечения.
+        """
+        hysteresis = threshold * config.ALERT_RATE_HYSTERESIS if metric == RATE else \
+            config.ALERT_WEATHER_HYSTERESIS[metric]
+        index = self.indexes.get((metric, subject))
+        last_value = index.last_value if index else None
+        if last_value is None:
+            last_value = await self._current_value(metric, subject)
+
+        with self._conn:
+            cursor = self._conn.execute(
+                "INSERT INTO alerts (chat_id, metric, subject, direction, threshold, hysteresis)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (chat_id, metric, subject, direction, threshold, abs(hysteresis))
+            )
+        rule = AlertRule(cursor.lastrowid, chat_id, metric, subject, direction, threshold, abs(hysteresis))
+        already_met = last_value is not None and rule.is_met(last_value)
+        if already_met:
+            self._set_armed([rule.id], False)
+        self._index(rule, not already_met)
+        return rule, already_met
+
+    async def _current_value(self, metric: str, subject: str) -> Optional[float]:
+        """Текущее значение величины (None, если API недоступен)"""
+        if metric == RATE:
+            rates = await self.currency_api.get_all_rates(config.ALERT_RATES_BASE)
+            return pair_rate(rates, subject) if rates else None
+        weather = await self.weather_api.get_current_weather(subject, config.DEFAULT_LANGUAGE, 'metric')
+        if weather is None:
+            return None
+        return weather.temperature if metric == TEMPERATURE else weather.wind_speed
+
+    def remove(self, chat_id: int, rule_id: Optional[int] = None) -> int:
+        """Удалить правило чата (или все правила чата); вернуть число удаленных"""
+        removed = [rule for rule in self.for_chat(chat_id) if rule_id is None or rule.id == rule_id]
+        for rule in removed:
+            key = (rule.metric, rule.subject)
+            self.indexes[key].remove(rule)
+            if not self.indexes[key]:
+                del self.indexes[key]
+            del self.rules[rule.id]
+        with self._conn:
+            self._conn.executemany("DELETE FROM alerts WHERE id = ?", ((rule.id,) for rule in removed))
+        return len(removed)
+
+    def for_chat(self, chat_id: int) -> List[AlertRule]:
+        """Правила чата"""
+        rows = self._conn.execute("SELECT id FROM alerts WHERE chat_id = ? ORDER BY id", (chat_id,))
+        return [self.rules[rule_id] for rule_id, in rows if rule_id in self.rules]
+
+    def subject_name(self, rule: AlertRule) -> str:
+        """Что отслеживает правило, для пользователя: пара валют или название города"""
+        if rule.metric == RATE:
+            return rule.subject
+        return self.weather_api.city_name(rule.subject)
+
+    def evaluate(self, metric: str, subject: str, value: float) -> List[AlertRule]:
+        """Учесть новое значение величины и вернуть сработавшие правила"""
+        index = self.indexes.get((metric, subject))
+        if index is None or index.last_value == value:
+            return []  # нет правил или значение не изменилось с прошлой проверки
+        self.evaluated += 1
+        fired, rearmed = index.update(value)
+        if fired:
+            self._set_armed(fired, False)
+        if rearmed:
+            self._set_armed(rearmed, True)
+        return [self.rules[rule_id] for rule_id in fired]
+
+    def _set_armed(self, rule_ids: List[int], armed: bool):
+        """Сохранить состояние правил, чтобы не повторять уведомления после перезапуска"""
+        with self._conn:
+            self._conn.executemany(
+                "UPDATE alerts SET armed = ? WHERE id = ?", ((int(armed), rule_id) for rule_id in rule_ids)
+            )
+
+    async def check(self, context=None):
+        """Получить свежие курсы и погоду и разослать сработавшие уведомления"""
+        self.checks += 1
+        fired: List[Tuple[AlertRule, float]] = []
+        pairs: Set[str] = set()
+        cities: Set[str] = set()
+        for metric, subject in self.indexes:
+            (pairs if metric == RATE else cities).add(subject)
+
+        if pairs:
+            rates = await self.currency_api.get_all_rates(config.ALERT_RATES_BASE)
+            if rates and rates.stale_age is None:
+                for pair in pairs:
+                    value = pair_rate(rates, pair)
+                    if value is not None:
+                        fired.extend((rule, value) for rule in self.evaluate(RATE, pair, value))
+
+        if cities:
+            weather_by_city = await self.weather_api.get_current_weather_many(
+                sorted(cities), config.DEFAULT_LANGUAGE, 'metric'
+            )
+            for city, weather in weather_by_city.items():
+                if weather is None or weather.stale_age is not None:
+                    continue
+                for metric, value in ((TEMPERATURE, weather.temperature), (WIND, weather.wind_speed)):
+                    fired.extend((rule, value) for rule in self.evaluate(metric, city, value))
+
+        for rule, value in fired:
+            try:
+                await self.send(rule.chat_id, rendering.render_alert(rule, value, self.subject_name(rule)))
+                self.notified += 1
+            except Exception as e:
+                logger.warning(f"Не удалось отправить уведомление {rule.id} в чат {rule.chat_id}: {e}")
+
+    def stats(self) -> Dict[str, int]:
+        """Статистика уведомлений"""
+        return {
+            'rules': len(self.rules),
+            'metrics': len(self.indexes),
+            'checks': self.checks,
+            'evaluated': self.evaluated,
+            'notified': self.notified
+        }
+
+    def close(self):
+        """Закрыть хранилище"""
+        self._conn.close()
+
+
+def pair_rate(rates, pair: str) -> Optional[float]:
+    """Курс пары "A/B" (сколько B за 1 A) из курсов относительно базовой валюты"""
+    from_currency, to_currency = pair.split('/')
+    from_rate = 1.0 if from_currency == rates.base else rates.rates.get(from_currency)
+    to_rate = 1.0 if to_currency == rates.base else rates.rates.get(to_currency)
+    if not from_rate or to_rate is None:
+        return None
+    return to_rate / from_rate
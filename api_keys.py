@@ -0,0 +1,96 @@
+import time
+from typing import Dict, List, Optional
+from rate_limiter import DailyQuota
+
+class ApiKeyState:
+    """Состояние одного API ключа"""
+    __slots__ = ('key', 'quota', 'error_rate', 'ejected_until', 'requests', 'ejections')
+
+    def __init__(self, key: str, daily_quota: int):
+        self.key = key
+        self.quota = DailyQuota(daily_quota)
+        self.error_rate = 0.0
+        self.ejected_until = 0.0
+        self.requests = 0
+        self.ejections = 0
+
+
+class ApiKeyPool:
+    """Набор API ключей одного сервиса с выбором наиболее здорового ключа.
+
+    Выбирается ключ с наибольшей долей оставшейся квоты с поправкой на
+    частоту ошибок. Ключи, получившие 401/403 или 429, временно исключаются.
+    """
+
+    # Сглаживание частоты ошибок (экспоненциальное среднее)
+    ERROR_SMOOTHING = 0.2
+
+    def __init__(self, name: str, keys: List[str], daily_quota: int,
+                 auth_cooldown: float = 3600, throttle_cooldown: float = 60):
+        self.name = name
+        self.auth_cooldown = auth_cooldown
+        self.throttle_cooldown = throttle_cooldown
+        self._states = [ApiKeyState(key, daily_quota) for key in keys]
+        self._by_key = {state.key: state for state in self._states}
+        self._next = 0
+
+    def __len__(self) -> int:
+        return len(self._states)
+
+    def available(self) -> bool:
+        """Есть ли ключ, который сейчас не исключен и не исчерпан"""
+        now = time.monotonic()
+        return any(state.ejected_until <= now and state.quota.remaining() for state in self._states)
+
+    def acquire(self) -> Optional[str]:
+        """Выбрать ключ для запроса (None - все ключи исключены или исчерпаны)"""
+        now = time.monotonic()
+        best = None
+        best_score = 0.0
+        count = len(self._states)
+        # Начинаем с разных ключей, чтобы при равных оценках нагрузка чередовалась
+        for offset in range(count):
+            state = self._states[(self._next + offset) % count]
+            if state.ejected_until > now or not state.quota.remaining():
+                continue
+            score = (1 - state.quota.usage()) * (1 - state.error_rate)
+            if best is None or score > best_score:
+                best, best_score = state, score
+        if best is None:
+            return None
+
+        self._next = (self._next + 1) % count
+        best.quota.try_consume()
+        best.requests += 1
+        return best.key
+
+    def report(self, key: str, status: int):
+        """Учесть HTTP статус ответа, полученного с этим ключом"""
+        state = self._by_key.get(key)
+        if state is None:
+            return
+
+        failed = status in (401, 403, 429) or status >= 500
+        state.error_rate += self.ERROR_SMOOTHING * ((1.0 if failed else 0.0) - state.error_rate)
+
+        if status in (401, 403):
+            self._eject(state, self.auth_cooldown)
+        elif status == 429:
+            self._eject(state, self.throttle_cooldown)
+
+    def _eject(self, state: ApiKeyState, cooldown: float):
+        """Временно исключить ключ"""
+        state.ejected_until = time.monotonic() + cooldown
+        state.ejections += 1
+        print(f"API ключ {self.name} ...{state.key[-4:]} исключен на {int(cooldown)} с")
+
+    def stats(self) -> Dict[str, int]:
+        """Счетчики по ключам"""
+        now = time.monotonic()
+        return {
+            'keys': len(self._states),
+            'active_keys': sum(1 for state in self._states if state.ejected_until <= now),
+            'requests': sum(state.requests for state in self._states),
+            'ejections': sum(state.ejections for state in self._states),
+            'quota_remaining': sum(state.quota.remaining() for state in self._states)
+        }
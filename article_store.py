@@ -0,0 +1,194 @@
+import bisect
+import hashlib
+import re
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Set, Tuple
+from models import Article
+
+# Лента новостей: (страна, категория)
+FeedKey = Tuple[str, str]
+
+_WORD_RE = re.compile(r"\w+")
+# Заголовки News API часто заканчиваются названием источника: "... - РБК"
+_SOURCE_SUFFIX_RE = re.compile(r"\s+[-–—|]\s+[^-–—|]{1,60}$")
+
+FINGERPRINT_BITS = 64
+
+
+def _hash64(text: str) -> int:
+    """Стабильный 64-битный хэш строки"""
+    return int.from_bytes(hashlib.blake2b(text.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+def url_hash(url: str) -> int:
+    """Ключ статьи в хранилище"""
+    return _hash64(url.strip())
+
+
+def title_fingerprint(title: str) -> int:
+    """SimHash заголовка по словам и парам слов.
+
+    У почти одинаковых заголовков (перепечатки одной новости разными
+    источниками) отпечатки отличаются в нескольких битах.
+    """
+    title = _SOURCE_SUFFIX_RE.sub("", title).lower().replace('ё', 'е')
+    words = _WORD_RE.findall(title)
+    features = words + [f"{first} {second}" for first, second in zip(words, words[1:])]
+    weights = [0] * FINGERPRINT_BITS
+    for feature in features:
+        value = _hash64(feature)
+        for bit in range(FINGERPRINT_BITS):
+            weights[bit] += 1 if value >> bit & 1 else -1
+    return sum(1 << bit for bit, weight in enumerate(weights) if weight > 0)
+
+
+class ArticleStore:
+    """Хранилище статей в памяти: одна статья на URL и на почти одинаковый заголовок.
+
+    Статьи, уже известные по хэшу URL, не разбираются повторно; перепечатки
+    с другим URL находятся по SimHash заголовка и заменяются уже
+    сохраненной статьей. Отпечаток делится на max_distance + 1 полос: у
+    отпечатков, отличающихся не больше чем в max_distance битах, хотя бы
+    одна полоса совпадает, поэтому кандидаты ищутся по полосам, а не
+    перебором. Для каждой ленты (страна, категория) хранится индекс
+    последних статей, отсортированный по publishedAt, и отметка времени
+    самой свежей статьи. Новые статьи каждого ответа передаются в
+    on_added (например, в полнотекстовый индекс).
+    """
+
+    def __init__(self, max_articles: int, feed_size: int, max_distance: int,
+                 on_added: Optional[Callable[[List[Tuple[int, Article]]], None]] = None):
+        self.max_articles = max_articles
+        self.feed_size = feed_size
+        self.max_distance = max_distance
+        self.on_added = on_added
+        self.articles: "OrderedDict[int, Article]" = OrderedDict()
+        self._aliases: Dict[int, int] = {}  # хэш URL перепечатки -> хэш сохраненной статьи
+        self._aliases_of: Dict[int, Set[int]] = {}  # хэш сохраненной статьи -> хэши перепечаток
+        self._fingerprints: Dict[int, int] = {}
+        self._band_bits = FINGERPRINT_BITS // (max_distance + 1)
+        self._bands: List[Dict[int, Set[int]]] = [{} for _ in range(max_distance + 1)]
+        self.feeds: Dict[FeedKey, List[Tuple[str, int]]] = {}  # (publishedAt, хэш), новые в конце
+        self.watermarks: Dict[FeedKey, str] = {}
+        self.added = 0
+        self.known = 0
+        self.duplicates = 0
+
+    def ingest(self, raw_articles: List[Dict]) -> List[Article]:
+        """Сохранить статьи из ответа News API и вернуть их (без повторов, в исходном порядке)"""
+        return [self.articles[key] for key in self._ingest(raw_articles)]
+
+    def ingest_feed(self, feed: FeedKey, raw_articles: List[Dict]) -> int:
+        """Добавить статьи в ленту; вернуть число новых для ленты статей"""
+        watermark = self.watermarks.get(feed, "")
+        entries = self.feeds.setdefault(feed, [])
+        in_feed = {key for _, key in entries}
+        new = 0
+        for key in self._ingest(raw_articles, watermark):
+            if key in in_feed:
+                continue
+            in_feed.add(key)
+            bisect.insort(entries, (self.articles[key].published_at, key))
+            new += 1
+        del entries[:-self.feed_size]
+        if entries:
+            self.watermarks[feed] = max(watermark, entries[-1][0])
+        return new
+
+    def feed(self, feed: FeedKey, limit: Optional[int] = None) -> List[Article]:
+        """Последние статьи ленты, новые первыми"""
+        result = []
+        for _, key in reversed(self.feeds.get(feed, ())):
+            article = self.articles.get(key)
+            if article is not None:
+                result.append(article)
+                if limit is not None and len(result) >= limit:
+                    break
+        return result
+
+    def _ingest(self, raw_articles: List[Dict], watermark: str = "") -> List[int]:
+        """Ключи статей ответа; новые статьи разбираются и сохраняются"""
+        keys = []
+        added: List[Tuple[int, Article]] = []
+        for raw in raw_articles:
+            if not raw.get('title') or not raw.get('description'):
+                continue
+            key = url_hash(raw.get('url') or raw['title'])
+            key = self._aliases.get(key, key)
+            if key in self.articles:
+                # Уже разобрана раньше: повторно статья не форматируется
+                self.known += 1
+                keys.append(key)
+                continue
+            # У top-headlines нет параметра from: статьи старше отметки
+            # времени ленты отсекаются здесь
+            if watermark and (raw.get('publishedAt') or "") < watermark:
+                self.known += 1
+                continue
+
+            fingerprint = title_fingerprint(raw['title'])
+            duplicate = self._find_duplicate(fingerprint)
+            if duplicate is not None:
+                self.duplicates += 1
+                self._aliases[key] = duplicate
+                self._aliases_of.setdefault(duplicate, set()).add(key)
+                keys.append(duplicate)
+                continue
+
+            article = Article.from_newsapi(raw)
+            self._add(key, article, fingerprint)
+            added.append((key, article))
+            keys.append(key)
+        if added and self.on_added is not None:
+            self.on_added(added)
+        return list(dict.fromkeys(keys))
+
+    def _band(self, fingerprint: int, band: int) -> int:
+        """Биты отпечатка, попадающие в полосу band"""
+        return fingerprint >> (band * self._band_bits) & ((1 << self._band_bits) - 1)
+
+    def _find_duplicate(self, fingerprint: int) -> Optional[int]:
+        """Сохраненная статья с почти таким же заголовком"""
+        candidates: Set[int] = set()
+        for band, table in enumerate(self._bands):
+            candidates |= table.get(self._band(fingerprint, band), set())
+        best, best_distance = None, self.max_distance + 1
+        for key in candidates:
+            distance = bin(fingerprint ^ self._fingerprints[key]).count('1')
+            if distance < best_distance:
+                best, best_distance = key, distance
+        return best
+
+    def _add(self, key: int, article: Article, fingerprint: int):
+        """Сохранить статью, вытеснив самые старые при переполнении"""
+        self.articles[key] = article
+        self._fingerprints[key] = fingerprint
+        for band, table in enumerate(self._bands):
+            table.setdefault(self._band(fingerprint, band), set()).add(key)
+        self.added += 1
+        while len(self.articles) > self.max_articles:
+            self._evict(next(iter(self.articles)))
+
+    def _evict(self, key: int):
+        """Удалить статью и ее перепечатки (ссылки в лентах пропускаются при чтении)"""
+        del self.articles[key]
+        fingerprint = self._fingerprints.pop(key)
+        for band, table in enumerate(self._bands):
+            band_value = self._band(fingerprint, band)
+            keys = table.get(band_value)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del table[band_value]
+        for alias in self._aliases_of.pop(key, ()):
+            del self._aliases[alias]
+
+    def stats(self) -> Dict[str, int]:
+        """Статистика хранилища статей"""
+        return {
+            'articles': len(self.articles),
+            'feeds': len(self.feeds),
+            'added': self.added,
+            'known': self.known,
+            'duplicates': self.duplicates
+        }
@@ -3,6 +3,9 @@ import logging
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import Application, CommandHandler, MessageHandler, CallbackQueryHandler, filters, ContextTypes
 from weather_api import WeatherAPI
+from http_client import HttpClient
+from user_settings import UserSettingsStore
+from webhook import run_webhook
 import config
 
 # Настройка логирования
@@ -16,7 +19,9 @@ class WeatherBot:
     """Основной класс телеграм бота для погоды"""
     
     def __init__(self):
-        self.weather_api = WeatherAPI()
+        self.http_client = HttpClient()
+        self.user_settings = UserSettingsStore(config.USER_DB_PATH, config.USER_SETTINGS_CACHE_SIZE)
+        self.weather_api = WeatherAPI(self.http_client)
         self.application = None
     
     async def start_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -122,34 +127,37 @@ class WeatherBot:
             
         elif query.data.startswith("lang_"):
             lang = query.data.split("_")[1]
-            self.weather_api.language = lang
+            settings = self.user_settings.get(query.from_user.id)
+            self.user_settings.set(query.from_user.id, settings.with_language(lang))
             await query.edit_message_text(f"✅ Язык изменен на: {lang.upper()}")
             
         elif query.data.startswith("units_"):
             units = query.data.split("_")[1]
-            self.weather_api.units = units
+            settings = self.user_settings.get(query.from_user.id)
+            self.user_settings.set(query.from_user.id, settings.with_units(units))
             await query.edit_message_text(f"✅ Единицы измерения изменены на: {units}")
     
     async def _show_current_weather(self, update: Update, context: ContextTypes.DEFAULT_TYPE, city: str):
         """Показать текущую погоду"""
         await update.message.reply_text(f"🌤️ Получаю погоду для города {city}...")
         
-        weather_data = await self.weather_api.get_current_weather(city)
+        settings = self.user_settings.get(update.effective_user.id)
+        weather_data = await self.weather_api.get_current_weather(city, settings.language, settings.units)
         
         if weather_data:
-            emoji = self.weather_api.get_weather_emoji(weather_data['icon'])
-            temp_unit = "°C" if self.weather_api.units == "metric" else "°F"
-            wind_unit = "м/с" if self.weather_api.units == "metric" else "миль/ч"
+            emoji = self.weather_api.get_weather_emoji(weather_data.icon)
+            temp_unit = "°C" if settings.units == "metric" else "°F"
+            wind_unit = "м/с" if settings.units == "metric" else "миль/ч"
             
             message = f"""
-{emoji} **Погода в {weather_data['city']}, {weather_data['country']}**
+{emoji} **Погода в {weather_data.city}, {weather_data.country}**
 
-🌡️ Температура: {weather_data['temperature']}{temp_unit}
-🌡️ Ощущается как: {weather_data['feels_like']}{temp_unit}
-☁️ Описание: {weather_data['description']}
-💧 Влажность: {weather_data['humidity']}%
-🌪️ Ветер: {weather_data['wind_speed']} {wind_unit}
-📊 Давление: {weather_data['pressure']} гПа
+🌡️ Температура: {weather_data.temperature}{temp_unit}
+🌡️ Ощущается как: {weather_data.feels_like}{temp_unit}
+☁️ Описание: {weather_data.description}
+💧 Влажность: {weather_data.humidity}%
+🌪️ Ветер: {weather_data.wind_speed} {wind_unit}
+📊 Давление: {weather_data.pressure} гПа
             """.strip()
             
             await update.message.reply_text(message)
@@ -163,19 +171,25 @@ class WeatherBot:
         """Показать прогноз погоды"""
         await update.message.reply_text(f"📅 Получаю прогноз погоды для города {city}...")
         
-        forecast_data = await self.weather_api.get_forecast(city)
+        settings = self.user_settings.get(update.effective_user.id)
+        forecast_data = await self.weather_api.get_forecast(city, settings.language, settings.units)
         
         if forecast_data:
-            temp_unit = "°C" if self.weather_api.units == "metric" else "°F"
+            temp_unit = "°C" if settings.units == "metric" else "°F"
             
-            message = f"📅 **Прогноз погоды в {forecast_data['city']}, {forecast_data['country']}**\n\n"
+            message = f"📅 **Прогноз погоды в {forecast_data.city}, {forecast_data.country}**\n\n"
             
-            for forecast in forecast_data['forecasts']:
-                emoji = self.weather_api.get_weather_emoji(forecast['icon'])
-                date = forecast['date']
+            for forecast in forecast_data.forecasts:
+                emoji = self.weather_api.get_weather_emoji(forecast.icon)
+                date = forecast.date
                 message += f"{emoji} **{date}**\n"
-                message += f"🌡️ {forecast['temperature']}{temp_unit} | 💧 {forecast['humidity']}%\n"
-                message += f"☁️ {forecast['description']}\n\n"
+                message += (
+                    f"🌡️ {forecast.temperature}{temp_unit} "
+                    f"({forecast.temp_min}…{forecast.temp_max}) | 💧 {forecast.humidity}%\n"
+                )
+                if forecast.precipitation:
+                    message += f"☔ Осадки: {forecast.precipitation} мм\n"
+                message += f"☁️ {forecast.description}\n\n"
             
             await update.message.reply_text(message.strip())
         else:
@@ -216,6 +230,15 @@ class WeatherBot:
             reply_markup=reply_markup
         )
     
+    async def _post_init(self, application: Application):
+        """Инициализация общих ресурсов после запуска приложения"""
+        await self.http_client.start()
+    
+    async def _post_shutdown(self, application: Application):
+        """Освобождение общих ресурсов при остановке приложения"""
+        await self.http_client.close()
+        self.user_settings.close()
+    
     def run(self):
         """Запуск бота"""
         if not config.BOT_TOKEN:
@@ -223,7 +246,13 @@ class WeatherBot:
             return
         
         # Создаем приложение
-        self.application = Application.builder().token(config.BOT_TOKEN).build()
+        self.application = (
+            Application.builder()
+            .token(config.BOT_TOKEN)
+            .post_init(self._post_init)
+            .post_shutdown(self._post_shutdown)
+            .build()
+        )
         
         # Добавляем обработчики
         self.application.add_handler(CommandHandler("start", self.start_command))
@@ -235,8 +264,12 @@ class WeatherBot:
         self.application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, self.handle_message))
         
         # Запускаем бота
-        logger.info("Бот запущен!")
-        self.application.run_polling()
+        if config.UPDATE_MODE == "webhook":
+            logger.info(f"Бот запущен в режиме webhook на порту {config.WEBHOOK_PORT}!")
+            run_webhook(self.application)
+        else:
+            logger.info("Бот запущен!")
+            self.application.run_polling()
 
 if __name__ == "__main__":
     bot = WeatherBot()
@@ -0,0 +1,257 @@
+import asyncio
+import time
+from collections import OrderedDict
+from dataclasses import replace
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+from singleflight import SingleFlight
+from cache_store import CacheStore, StoredEntry, monotonic_to_wall, wall_to_monotonic
+
+class TTLCache:
+    """LRU кэш с временем жизни записей и ограничением по количеству.
+
+    Истекшие записи хранятся еще stale_ttl секунд, чтобы их можно было
+    отдать как устаревшие, пока данные обновляются.
+    """
+
+    def __init__(self, max_entries: int = 10000, stale_ttl: float = 0):
+        self.max_entries = max_entries
+        self.stale_ttl = stale_ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._dirty = set()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Получить значение из кэша (None, если нет или истекло)"""
+        entry = self.get_entry(key)
+        if entry is None or not entry[2]:
+            return None
+        return entry[0]
+
+    def get_entry(self, key: Hashable) -> Optional[Tuple[Any, float, bool]]:
+        """Получить (значение, возраст в секундах, свежее ли) или None"""
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        value, stored_at, expires_at = entry
+        now = time.monotonic()
+        if expires_at + self.stale_ttl <= now:
+            del self._data[key]
+            self.misses += 1
+            return None
+
+        self._data.move_to_end(key)
+        fresh = expires_at > now
+        if fresh:
+            self.hits += 1
+        else:
+            self.stale_hits += 1
+        return value, now - stored_at, fresh
+
+    def set(self, key: Hashable, value: Any, ttl: float):
+        """Сохранить значение на ttl секунд"""
+        now = time.monotonic()
+        self._data[key] = (value, now, now + ttl)
+        self._data.move_to_end(key)
+        self._dirty.add(key)
+        self._evict()
+
+    def _evict(self):
+        """Вытеснить самые давно использованные записи"""
+        while len(self._data) > self.max_entries:
+            key, _ = self._data.popitem(last=False)
+            self._dirty.discard(key)
+            self.evictions += 1
+
+    def load_entries(self, entries: List[Tuple[Hashable, Any, float, float]]):
+        """Загрузить записи (ключ, значение, сохранено, истекает) от новых к старым.
+
+        Загруженные записи встают в начало порядка LRU перед уже имеющимися:
+        самая старая из них вытесняется первой, самая новая - последней.
+        """
+        for key, value, stored_at, expires_at in entries:
+            if key not in self._data:
+                self._data[key] = (value, stored_at, expires_at)
+                self._data.move_to_end(key, last=False)
+        self._evict()
+
+    def pop_dirty(self) -> List[Tuple[Hashable, Any, float, float]]:
+        """Забрать записи, измененные с прошлого вызова"""
+        entries = []
+        for key in self._dirty:
+            entry = self._data.get(key)
+            if entry is not None:
+                entries.append((key, *entry))
+        self._dirty.clear()
+        return entries
+
+    def clear(self):
+        """Очистить кэш"""
+        self._data.clear()
+        self._dirty.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, int]:
+        """Статистика попаданий и промахов"""
+        return {
+            'size': len(self._data),
+            'hits': self.hits,
+            'stale_hits': self.stale_hits,
+            'misses': self.misses,
+            'evictions': self.evictions
+        }
+
+
+def mark_stale(value: Any, age: float) -> Any:
+    """Пометить копию закэшированного ответа его возрастом (поле stale_age)"""
+    age = int(age)
+    if isinstance(value, list):
+        return [mark_stale(item, age) for item in value]
+    if hasattr(value, 'stale_age'):
+        return replace(value, stale_age=age)
+    return value
+
+
+def get_stale_age(value: Any) -> Optional[int]:
+    """Возраст устаревшего ответа в секундах (None, если ответ свежий)"""
+    if isinstance(value, list):
+        value = value[0] if value else None
+    return getattr(value, 'stale_age', None)
+
+
+class CachedFetcher:
+    """Кэш ответов API с объединением одинаковых одновременных запросов.
+
+    В режиме stale-while-revalidate истекшая запись сразу отдается
+    пользователю (помеченная возрастом), а обновление идет в фоне. Если
+    запрос к API не удался, тоже отдается последняя удачная запись.
+
+    Если задано постоянное хранилище, записи периодически сохраняются в
+    него (flush) и загружаются обратно при старте (warm_load).
+    """
+
+    def __init__(self, max_entries: int = 10000, stale_ttl: float = 0,
+                 stale_while_revalidate: bool = False, name: str = "default",
+                 store: Optional[CacheStore] = None):
+        self.name = name
+        self.store = store
+        self.cache = TTLCache(max_entries=max_entries, stale_ttl=stale_ttl)
+        self.flight = SingleFlight()
+        self.stale_while_revalidate = stale_while_revalidate
+        self._background = set()
+        self.stale_served = 0
+        self.revalidations = 0
+
+    async def get(self, key: Hashable, ttl: float, factory: Callable[[], Awaitable[Any]],
+                  refresh: bool = False, prefer_stale: bool = False) -> Optional[Any]:
+        """Получить значение из кэша или запросить его через factory.
+
+        При refresh=True кэш не читается, но новый результат сохраняется
+        (используется для фонового обновления). При prefer_stale=True
+        устаревшая запись отдается без обращения к API (квота на исходе).
+        Пустые результаты не кэшируются.
+        """
+        async def fetch():
+            value = await factory()
+            if value:
+                self.cache.set(key, value, ttl)
+            return value
+
+        stale = None
+        if not refresh:
+            entry = self.cache.get_entry(key)
+            if entry is not None:
+                value, age, fresh = entry
+                if fresh:
+                    return value
+                if prefer_stale:
+                    self.stale_served += 1
+                    return mark_stale(value, age)
+                if self.stale_while_revalidate:
+                    self._revalidate(key, fetch)
+                    self.stale_served += 1
+                    return mark_stale(value, age)
+                stale = entry
+
+        value = await self.flight.do(key, fetch)
+        if not value and stale is not None:
+            # API недоступен - отдаем последний удачный ответ
+            self.stale_served += 1
+            return mark_stale(stale[0], stale[1])
+        return value
+
+    def peek(self, key: Hashable) -> Optional[Any]:
+        """Получить свежее значение из кэша без обращения к API"""
+        return self.cache.get(key)
+
+    def put(self, key: Hashable, value: Any, ttl: float):
+        """Положить значение, полученное в обход get (например, пакетным запросом)"""
+        self.cache.set(key, value, ttl)
+
+    def _revalidate(self, key: Hashable, fetch: Callable[[], Awaitable[Any]]):
+        """Обновить запись в фоне"""
+        self.revalidations += 1
+        task = asyncio.ensure_future(self.flight.do(key, fetch))
+        self._background.add(task)
+        task.add_done_callback(self._on_revalidated)
+
+    def _on_revalidated(self, task: asyncio.Task):
+        """Завершение фонового обновления"""
+        self._background.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            print(f"Ошибка фонового обновления кэша: {task.exception()}")
+
+    async def warm_load(self, limit: Optional[int] = None) -> int:
+        """Загрузить самые свежие записи из постоянного хранилища.
+
+        Чтение SQLite и распаковка идут в отдельном потоке, не блокируя цикл событий.
+        """
+        if self.store is None:
+            return 0
+
+        limit = min(limit or self.cache.max_entries, self.cache.max_entries)
+        stored: List[StoredEntry] = await asyncio.to_thread(
+            self.store.load, self.name, limit, time.time() - self.cache.stale_ttl
+        )
+        self.cache.load_entries([
+            (key, value, wall_to_monotonic(stored_at), wall_to_monotonic(expires_at))
+            for key, value, stored_at, expires_at in stored
+        ])
+        return len(stored)
+
+    async def flush(self) -> int:
+        """Сохранить измененные записи в постоянное хранилище.
+
+        Измененные записи забираются в цикле событий, а сжатие и запись в
+        SQLite идут в отдельном потоке.
+        """
+        if self.store is None:
+            return 0
+
+        entries = [
+            (key, value, monotonic_to_wall(stored_at), monotonic_to_wall(expires_at))
+            for key, value, stored_at, expires_at in self.cache.pop_dirty()
+        ]
+        await asyncio.to_thread(self._write, entries, time.time() - self.cache.stale_ttl)
+        return len(entries)
+
+    def _write(self, entries: List[StoredEntry], purge_before: float):
+        """Записать изменения и удалить истекшие записи (в потоке to_thread)"""
+        if entries:
+            self.store.save_many(self.name, entries)
+        self.store.purge(self.name, purge_before)
+
+    def stats(self) -> Dict[str, int]:
+        """Статистика кэша и объединения запросов"""
+        return {
+            **self.cache.stats(),
+            **self.flight.stats(),
+            'stale_served': self.stale_served,
+            'revalidations': self.revalidations
+        }
@@ -0,0 +1,132 @@
+import json
+import sqlite3
+import threading
+import time
+import zlib
+from abc import ABC, abstractmethod
+from typing import Any, Hashable, Iterable, List, Tuple
+from models import from_primitive, to_primitive
+
+# (ключ, значение, время сохранения, время истечения) - время по time.time()
+StoredEntry = Tuple[Hashable, Any, float, float]
+
+class CacheStore(ABC):
+    """Базовый класс постоянного хранилища для кэша ответов API.
+
+    Методы вызываются из потоков asyncio.to_thread, поэтому реализация
+    должна быть потокобезопасной.
+    """
+
+    @abstractmethod
+    def load(self, namespace: str, limit: int, min_expires_at: float) -> List[StoredEntry]:
+        """Загрузить самые свежие записи, истекающие не раньше min_expires_at"""
+
+    @abstractmethod
+    def save_many(self, namespace: str, entries: Iterable[StoredEntry]):
+        """Сохранить записи одной транзакцией"""
+
+    @abstractmethod
+    def purge(self, namespace: str, before: float):
+        """Удалить записи, истекшие раньше before"""
+
+    def close(self):
+        """Закрыть хранилище"""
+
+
+class SQLiteCacheStore(CacheStore):
+    """Хранилище кэша в SQLite: значения хранятся как сжатый JSON.
+
+    Соединение используется из разных потоков по очереди (под _lock).
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            " namespace TEXT NOT NULL,"
+            " key TEXT NOT NULL,"
+            " value BLOB NOT NULL,"
+            " stored_at REAL NOT NULL,"
+            " expires_at REAL NOT NULL,"
+            " PRIMARY KEY (namespace, key)"
+            ") WITHOUT ROWID"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS cache_stored_at ON cache (namespace, stored_at)"
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def _encode_key(key: Hashable) -> str:
+        return json.dumps(key, ensure_ascii=False, separators=(',', ':'))
+
+    @staticmethod
+    def _decode_key(raw: str) -> Hashable:
+        key = json.loads(raw)
+        return tuple(key) if isinstance(key, list) else key
+
+    @staticmethod
+    def _encode_value(value: Any) -> bytes:
+        data = to_primitive(value)
+        return zlib.compress(json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+
+    @staticmethod
+    def _decode_value(raw: bytes) -> Any:
+        return from_primitive(json.loads(zlib.decompress(raw)))
+
+    def load(self, namespace: str, limit: int, min_expires_at: float) -> List[StoredEntry]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT key, value, stored_at, expires_at FROM cache"
+                " WHERE namespace = ? AND expires_at >= ?"
+                " ORDER BY stored_at DESC LIMIT ?",
+                (namespace, min_expires_at, limit)
+            ).fetchall()
+        entries = []
+        for key, value, stored_at, expires_at in rows:
+            try:
+                entries.append((self._decode_key(key), self._decode_value(value), stored_at, expires_at))
+            except (ValueError, KeyError, TypeError):
+                # Запись в формате другой версии бота (например, словарь вместо модели) - пропускаем
+                continue
+        return entries
+
+    def save_many(self, namespace: str, entries: Iterable[StoredEntry]):
+        # Сжатие - вне блокировки, запись - одной транзакцией
+        rows = [
+            (namespace, self._encode_key(key), self._encode_value(value), stored_at, expires_at)
+            for key, value, stored_at, expires_at in entries
+        ]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO cache (namespace, key, value, stored_at, expires_at)"
+                " VALUES (?, ?, ?, ?, ?)",
+                rows
+            )
+            self._conn.commit()
+
+    def purge(self, namespace: str, before: float):
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM cache WHERE namespace = ? AND expires_at < ?",
+                (namespace, before)
+            )
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def wall_to_monotonic(timestamp: float) -> float:
+    """Перевести время time.time() в шкалу time.monotonic()"""
+    return time.monotonic() - (time.time() - timestamp)
+
+
+def monotonic_to_wall(timestamp: float) -> float:
+    """Перевести время time.monotonic() в шкалу time.time()"""
+    return time.time() - (time.monotonic() - timestamp)
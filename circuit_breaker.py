@@ -0,0 +1,113 @@
+import time
+from collections import deque
+from typing import Deque, Dict, Tuple
+
+# Состояния circuit breaker
+CLOSED = 'closed'  # запросы идут как обычно
+OPEN = 'open'  # API отключен, запросы сразу отклоняются
+HALF_OPEN = 'half_open'  # пробные запросы проверяют, ожил ли API
+
+
+class CircuitBreaker:
+    """Circuit breaker одного внешнего API.
+
+    Хранит результаты последних window запросов: ошибка (сеть, таймаут,
+    ответ 5xx) и медленный ответ (дольше slow_call_seconds). Когда в окне
+    хотя бы min_calls запросов и доля ошибок или медленных ответов
+    достигает порога, API отключается на open_seconds: запросы к нему не
+    ждут таймаута, а сразу отклоняются. Затем пропускается не больше
+    half_open_calls пробных запросов; быстрый успешный ответ снова
+    включает API, ошибка или медленный ответ отключают его еще раз.
+
+    Клиент API вызывает allow() до траты квоты и ключа, а после
+    разрешения - record() с результатом запроса или release(), если
+    запрос так и не был отправлен.
+    """
+
+    def __init__(self, name: str, window: int, min_calls: int, failure_ratio: float,
+                 slow_call_seconds: float, slow_ratio: float, open_seconds: float, half_open_calls: int):
+        self.name = name
+        self.min_calls = min_calls
+        self.failure_ratio = failure_ratio
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_ratio = slow_ratio
+        self.open_seconds = open_seconds
+        self.half_open_calls = half_open_calls
+        self.state = CLOSED
+        self._calls: Deque[Tuple[bool, bool]] = deque(maxlen=window)  # (ошибка, медленный)
+        self._failures = 0
+        self._slow = 0
+        self._opened_at = 0.0
+        self._probes = 0
+        self.trips = 0
+        self.rejected = 0
+        self.latency = 0.0  # скользящее среднее времени ответа, секунд
+
+    def allow(self) -> bool:
+        """Разрешить запрос (в half-open - зарезервировать пробный); отказ учитывается в rejected"""
+        if self.state == OPEN and time.monotonic() - self._opened_at >= self.open_seconds:
+            self.state = HALF_OPEN
+            self._probes = 0
+        if self.state == CLOSED:
+            return True
+        if self.state == HALF_OPEN and self._probes < self.half_open_calls:
+            self._probes += 1
+            return True
+        self.rejected += 1
+        return False
+
+    def record(self, ok: bool, duration: float):
+        """Учесть результат разрешенного запроса"""
+        slow = duration > self.slow_call_seconds
+        self.latency = duration if not self.latency else self.latency * 0.8 + duration * 0.2
+        if self.state == HALF_OPEN:
+            self._probes = max(self._probes - 1, 0)
+            if ok and not slow:
+                self._close()
+            else:
+                self._open()
+            return
+        if self.state == OPEN:
+            return  # запрос начался до отключения API
+
+        if len(self._calls) == self._calls.maxlen:
+            old_failed, old_slow = self._calls[0]
+            self._failures -= old_failed
+            self._slow -= old_slow
+        self._calls.append((not ok, slow))
+        self._failures += not ok
+        self._slow += slow
+        count = len(self._calls)
+        if count >= self.min_calls and (self._failures >= count * self.failure_ratio or
+                                        self._slow >= count * self.slow_ratio):
+            self._open()
+
+    def release(self):
+        """Вернуть разрешение без результата (запрос не отправлен или отменен)"""
+        if self.state == HALF_OPEN:
+            self._probes = max(self._probes - 1, 0)
+
+    def _open(self):
+        """Отключить API на open_seconds"""
+        self.state = OPEN
+        self._opened_at = time.monotonic()
+        self.trips += 1
+
+    def _close(self):
+        """Снова включить API с чистым окном"""
+        self.state = CLOSED
+        self._calls.clear()
+        self._failures = 0
+        self._slow = 0
+
+    def stats(self) -> Dict[str, object]:
+        """Состояние и счетчики для мониторинга"""
+        count = len(self._calls)
+        return {
+            'state': self.state,
+            'failure_percent': round(self._failures / count * 100) if count else 0,
+            'slow_percent': round(self._slow / count * 100) if count else 0,
+            'avg_latency_ms': round(self.latency * 1000),
+            'trips': self.trips,
+            'rejected': self.rejected
+        }
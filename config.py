@@ -4,14 +4,169 @@ from dotenv import load_dotenv
 # Загружаем переменные окружения из .env файла
 load_dotenv()
 
+
+def _split_keys(value):
+    """Разобрать список ключей, перечисленных через запятую"""
+    return [key.strip() for key in (value or '').split(',') if key.strip()]
+
+
 # Конфигурация бота
 BOT_TOKEN = os.getenv('TELEGRAM_BOT_TOKEN')
 OPENWEATHER_API_KEY = os.getenv('OPENWEATHER_API_KEY')
+NEWS_API_KEY = os.getenv('NEWS_API_KEY')
+CURRENCY_API_KEY = os.getenv('CURRENCY_API_KEY')
+
+# Несколько ключей одного сервиса через запятую (OPENWEATHER_API_KEYS=key1,key2)
+OPENWEATHER_API_KEYS = _split_keys(os.getenv('OPENWEATHER_API_KEYS') or OPENWEATHER_API_KEY)
+NEWS_API_KEYS = _split_keys(os.getenv('NEWS_API_KEYS') or NEWS_API_KEY)
+CURRENCY_API_KEYS = _split_keys(os.getenv('CURRENCY_API_KEYS') or CURRENCY_API_KEY)
+API_KEY_AUTH_COOLDOWN = 3600  # на сколько секунд исключать ключ после 401/403
+API_KEY_THROTTLE_COOLDOWN = 60  # на сколько секунд исключать ключ после 429
+
+# ID администраторов через запятую (им доступна команда /stats)
+ADMIN_IDS = {int(user_id) for user_id in os.getenv('ADMIN_IDS', '').split(',') if user_id.strip()}
+
+# Способ получения обновлений: polling или webhook
+UPDATE_MODE = os.getenv('UPDATE_MODE', 'polling')
+WEBHOOK_LISTEN = os.getenv('WEBHOOK_LISTEN', '0.0.0.0')
+WEBHOOK_PORT = int(os.getenv('WEBHOOK_PORT', '8443'))
+WEBHOOK_PATH = os.getenv('WEBHOOK_PATH', 'telegram')
+WEBHOOK_URL = os.getenv('WEBHOOK_URL')  # публичный адрес, например https://bot.example.com
+WEBHOOK_SECRET = os.getenv('WEBHOOK_SECRET')  # проверяется в заголовке X-Telegram-Bot-Api-Secret-Token
+
+# Параллельная обработка обновлений (порядок внутри чата сохраняется)
+MAX_CONCURRENT_UPDATES = 64
+
+# Ответы без отдельной заглушки "Получаю...": если данные готовы быстрее
+# этой задержки (секунд), отправляется только итоговое сообщение
+REPLY_PLACEHOLDER_DELAY = 0.3
+REPLY_PROGRESS_INDICATOR = os.getenv('REPLY_PROGRESS_INDICATOR', 'placeholder')  # placeholder или typing
+
+# Лимиты исходящих сообщений Telegram (очередь send_queue.py)
+TELEGRAM_GLOBAL_RATE = 30  # сообщений в секунду на бота
+TELEGRAM_CHAT_RATE = 1  # сообщений в секунду в личный чат
+TELEGRAM_CHAT_BURST = 3  # сколько сообщений подряд можно отправить в чат без паузы
+TELEGRAM_GROUP_RATE_PER_MINUTE = 20  # сообщений в минуту в группу
+TELEGRAM_MAX_RETRIES = 3  # повторов после RetryAfter
+TELEGRAM_MAX_CHAT_BUCKETS = 10000  # сколько чатов помнить для лимитов
 
 # API endpoints
 OPENWEATHER_BASE_URL = "http://api.openweathermap.org/data/2.5"
 WEATHER_ENDPOINT = "/weather"
 FORECAST_ENDPOINT = "/forecast"
+GROUP_ENDPOINT = "/group"  # погода для нескольких городов по ID
+
+# Настройки пула HTTP-соединений (общий для всех API)
+HTTP_POOL_LIMIT = 100  # всего одновременных соединений
+HTTP_POOL_LIMIT_PER_HOST = 20  # соединений на один хост
+HTTP_DNS_CACHE_TTL = 300  # секунд
+HTTP_KEEPALIVE_TIMEOUT = 30  # секунд
+
+# Таймауты запросов к внешним API, секунд
+HTTP_CONNECT_TIMEOUT = 3  # установка TCP соединения
+HTTP_READ_TIMEOUT = 5  # ожидание очередной порции ответа
+HTTP_TOTAL_TIMEOUT = 10  # весь запрос, включая ожидание соединения из пула
+
+# Circuit breaker: недоступный или медленный API временно отключается
+BREAKER_WINDOW = 20  # последних запросов в скользящем окне
+BREAKER_MIN_CALLS = 5  # пока запросов в окне меньше, API не отключается
+BREAKER_FAILURE_RATIO = 0.5  # доля ошибок (сеть, таймауты, 5xx) для отключения
+BREAKER_SLOW_CALL_SECONDS = 2.0  # ответ дольше считается медленным
+BREAKER_SLOW_RATIO = 0.8  # доля медленных ответов для отключения
+BREAKER_OPEN_SECONDS = 30  # через сколько секунд пробовать API снова
+BREAKER_HALF_OPEN_CALLS = 1  # одновременных пробных запросов
+
+# Лимиты запросов к внешним API (минутные и суточные, на один ключ)
+OPENWEATHER_RATE_PER_MINUTE = 60
+OPENWEATHER_DAILY_QUOTA = 30000
+NEWS_RATE_PER_MINUTE = 30
+NEWS_DAILY_QUOTA = 100
+CURRENCY_DAILY_QUOTA = 1000
+UPSTREAM_MAX_WAIT = 2.0  # сколько секунд запрос может ждать в очереди лимитера
+QUOTA_TIGHT_RATIO = 0.9  # после этой доли квоты данные отдаются из кэша, даже устаревшие
+
+# Кэш погоды
+WEATHER_CACHE_TTL = 600  # текущая погода, секунд
+FORECAST_CACHE_TTL = 3600  # прогноз на 5 дней, секунд
+WEATHER_CACHE_MAX_ENTRIES = 10000
+WEATHER_CITY_IDS_TTL = 7 * 86400  # сколько помнить ID города, секунд
+WEATHER_CITY_IDS_MAX_ENTRIES = 50000
+
+# Погода для нескольких городов в одном запросе
+WEATHER_GROUP_SIZE = 20  # максимум ID в одном запросе /group
+WEATHER_BATCH_CONCURRENCY = 5  # одновременных запросов для городов без ID
+MAX_CITIES_PER_REQUEST = 10
+
+# Справочник городов (синонимы и исправление опечаток)
+GAZETTEER_PATH = os.getenv('GAZETTEER_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cities.txt'))
+GAZETTEER_MIN_SCORE = 0.5  # минимальное сходство триграмм для подсказки похожих городов
+GAZETTEER_MIN_PREFIX = 3  # с какой длины недописанное название дополняется по справочнику
+GAZETTEER_SUGGESTIONS = 3  # сколько похожих городов предлагать
+
+# Погода по геопозиции: точки привязываются к ячейкам geohash,
+# чтобы соседние пользователи делили запросы к API и кэш
+GEO_CELL_PRECISION = 5  # 5 символов - ячейка около 5x5 км
+
+# Кэш новостей и курсов валют
+NEWS_CACHE_TTL = 300  # секунд
+NEWS_CACHE_MAX_ENTRIES = 1000
+NEWS_FEED_PAGE_SIZE = 20  # статей в одном запросе ленты категории
+NEWS_FEED_SIZE = 50  # сколько последних статей помнить в ленте
+NEWS_STORE_MAX_ARTICLES = 20000  # статей в памяти
+NEWS_DUPLICATE_DISTANCE = 5  # заголовки с отличием SimHash до стольких бит - одна новость
+
+# Полнотекстовый индекс статей для /search
+NEWS_INDEX_ENABLED = True
+NEWS_INDEX_DB_PATH = os.getenv('NEWS_INDEX_DB_PATH', 'news.db')
+NEWS_INDEX_MAX_ARTICLES = 1000000  # самые старые статьи сверх лимита удаляются
+NEWS_INDEX_MAX_AGE = 6 * 3600  # если свежее совпадение старше, поиск идет в News API, секунд
+CURRENCY_CACHE_TTL = 600  # секунд
+CURRENCY_CACHE_MAX_ENTRIES = 1000
+
+# Кэш готовых текстов сообщений (по ответу API и единицам измерения)
+RENDER_CACHE_SIZE = 4096
+
+# Таблица кросс-курсов валют
+RATE_TABLE_BASE = "USD"  # базовая валюта для построения таблицы
+RATE_TABLE_REFRESH_INTERVAL = 900  # период обновления, секунд
+RATE_TABLE_MAX_AGE = 3600  # после этого возраста курсы берутся из API
+
+# Отдача устаревших данных, пока идет обновление (stale-while-revalidate)
+STALE_WHILE_REVALIDATE = True
+CACHE_STALE_TTL = 86400  # сколько хранить истекшие записи, секунд
+
+# Постоянный кэш ответов API (переживает перезапуск бота)
+PERSISTENT_CACHE_ENABLED = True
+CACHE_DB_PATH = os.getenv('CACHE_DB_PATH', 'cache.db')
+CACHE_FLUSH_INTERVAL = 60  # период сохранения на диск, секунд
+CACHE_WARM_LOAD_LIMIT = 100000  # максимум записей, загружаемых при старте
+
+# Хранилище пользовательских данных (настройки и т.п.)
+USER_DB_PATH = os.getenv('USER_DB_PATH', 'bot.db')
+USER_SETTINGS_CACHE_SIZE = 100000  # настроек пользователей в памяти
+
+# Фоновое обновление популярных запросов
+PREFETCH_ENABLED = True
+PREFETCH_INTERVAL = 300  # период обновления, секунд
+PREFETCH_TOP_CITIES = 20  # сколько самых популярных городов обновлять
+PREFETCH_MAX_REQUESTS = 60  # бюджет запросов к API за один проход
+PREFETCH_CONCURRENCY = 5  # одновременных запросов при обновлении
+PREFETCH_POPULARITY_DECAY = 0.9  # затухание популярности после каждого прохода
+PREFETCH_MAX_TRACKED_CITIES = 10000
+
+# Подписки на ежедневные сводки
+DIGEST_DEFAULT_HOUR = 8  # час рассылки по умолчанию
+DIGEST_UTC_OFFSET = 3  # часовой пояс часа рассылки (UTC+3 - Москва)
+DIGEST_FETCH_CONCURRENCY = 5  # одновременных запросов к API при подготовке сводок
+DIGEST_SEND_CONCURRENCY = 50  # сообщений сводки в очереди отправки одновременно
+MAX_SUBSCRIPTIONS_PER_CHAT = 20
+
+# Уведомления о пересечении порогов
+ALERT_CHECK_INTERVAL = 300  # период проверки, секунд
+ALERT_RATES_BASE = "RUB"  # курсы пар считаются из курсов относительно этой валюты
+ALERT_RATE_HYSTERESIS = 0.005  # курс: доля порога, на которую нужно вернуться до нового уведомления
+ALERT_WEATHER_HYSTERESIS = {'temp': 1.0, 'wind': 1.5}  # погода: °C и м/с
+MAX_ALERTS_PER_CHAT = 20
 
 # Настройки по умолчанию
 DEFAULT_LANGUAGE = "ru"
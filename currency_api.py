@@ -1,20 +1,119 @@
-import aiohttp
-import asyncio
+import time
 from typing import Dict, Optional
 import config
+from http_client import HttpClient
+from cache import CachedFetcher
+from cache_store import CacheStore
+from rate_table import RateTable
+from api_keys import ApiKeyPool
+from json_utils import loads
+from models import Conversion, ExchangeRate, Rates
 
 class CurrencyAPI:
     """Класс для работы с API курсов валют"""
     
-    def __init__(self):
-        self.api_key = getattr(config, 'CURRENCY_API_KEY', None)
+    def __init__(self, http_client: Optional[HttpClient] = None, cache_store: Optional[CacheStore] = None):
+        self.http_client = http_client or HttpClient()
+        self.keys = ApiKeyPool(
+            "exchangerate-api", config.CURRENCY_API_KEYS, config.CURRENCY_DAILY_QUOTA,
+            auth_cooldown=config.API_KEY_AUTH_COOLDOWN,
+            throttle_cooldown=config.API_KEY_THROTTLE_COOLDOWN
+        )
         self.base_url = "https://api.exchangerate-api.com/v4"
         self.fallback_url = "https://api.exchangerate.host"
+        self.primary_breaker = self.http_client.breaker("exchangerate-api")
+        self.fallback_breaker = self.http_client.breaker("exchangerate.host")
+        self.cache = CachedFetcher(
+            max_entries=config.CURRENCY_CACHE_MAX_ENTRIES,
+            stale_ttl=config.CACHE_STALE_TTL,
+            stale_while_revalidate=config.STALE_WHILE_REVALIDATE,
+            name="currency",
+            store=cache_store
+        )
+        self.rate_table: Optional[RateTable] = None
     
-    async def get_exchange_rate(self, from_currency: str, to_currency: str) -> Optional[Dict]:
+    async def get_exchange_rate(self, from_currency: str, to_currency: str) -> Optional[ExchangeRate]:
         """Получить курс обмена валют"""
+        # Сначала пробуем локальную таблицу кросс-курсов
+        rate = self._get_rate_from_table(from_currency, to_currency)
+        if rate:
+            return rate
+        
+        key = ('rate', from_currency.upper(), to_currency.upper())
+        rate = await self.cache.get(
+            key, config.CURRENCY_CACHE_TTL,
+            lambda: self._fetch_exchange_rate(from_currency, to_currency)
+        )
+        if rate:
+            return rate
+        
+        # Оба API недоступны - используем устаревшую таблицу, если она есть
+        if self.rate_table is not None:
+            stale_rate = self.rate_table.rate(from_currency, to_currency)
+            if stale_rate is not None:
+                return ExchangeRate(
+                    rate=stale_rate,
+                    date=self.rate_table.date,
+                    stale_age=int(self.rate_table.age())
+                )
+        return None
+    
+    async def get_all_rates(self, base_currency: str = "RUB", refresh: bool = False) -> Optional[Rates]:
+        """Получить все курсы относительно базовой валюты"""
+        key = ('rates', base_currency.upper())
+        return await self.cache.get(
+            key, config.CURRENCY_CACHE_TTL,
+            lambda: self._fetch_all_rates(base_currency),
+            refresh=refresh
+        )
+    
+    async def refresh_rate_table(self, base_currency: Optional[str] = None) -> bool:
+        """Обновить таблицу кросс-курсов одним запросом get_all_rates"""
+        rates_data = await self.get_all_rates(base_currency or config.RATE_TABLE_BASE, refresh=True)
+        if not rates_data:
+            return False
+        
+        self.rate_table = RateTable(rates_data.base, rates_data.date, rates_data.rates)
+        return True
+    
+    def warm_rate_table(self, base_currency: Optional[str] = None) -> bool:
+        """Восстановить таблицу кросс-курсов из кэша без сетевых запросов"""
+        entry = self.cache.cache.get_entry(('rates', (base_currency or config.RATE_TABLE_BASE).upper()))
+        if entry is None:
+            return False
+        
+        rates_data, age, _ = entry
+        self.rate_table = RateTable(
+            rates_data.base, rates_data.date, rates_data.rates,
+            updated_at=time.monotonic() - age
+        )
+        return True
+    
+    def _get_fresh_rate_table(self) -> Optional[RateTable]:
+        """Получить таблицу кросс-курсов, если она не устарела"""
+        if self.rate_table is None or self.rate_table.is_stale(config.RATE_TABLE_MAX_AGE):
+            return None
+        return self.rate_table
+    
+    def _get_rate_from_table(self, from_currency: str, to_currency: str) -> Optional[ExchangeRate]:
+        """Получить курс из таблицы кросс-курсов без сетевых запросов"""
+        table = self._get_fresh_rate_table()
+        if table is None:
+            return None
+        
+        rate = table.rate(from_currency, to_currency)
+        if rate is None:
+            return None
+        return ExchangeRate(rate=rate, date=table.date, stale_age=None)
+    
+    async def _fetch_exchange_rate(self, from_currency: str, to_currency: str) -> Optional[ExchangeRate]:
+        """Запросить курс: сначала основной API, затем fallback.
+        
+        Отключенный circuit breaker API пропускается сразу, без ожидания
+        ошибки или таймаута и без траты ключа.
+        """
         # Пробуем основной API
-        if self.api_key:
+        if self.keys and self.primary_breaker.allow():
             rate = await self._get_rate_from_primary_api(from_currency, to_currency)
             if rate:
                 return rate
@@ -22,63 +121,73 @@ class CurrencyAPI:
         # Если основной API не работает, используем fallback
         return await self._get_rate_from_fallback_api(from_currency, to_currency)
     
-    async def get_all_rates(self, base_currency: str = "RUB") -> Optional[Dict]:
-        """Получить все курсы относительно базовой валюты"""
+    async def _fetch_all_rates(self, base_currency: str) -> Optional[Rates]:
+        """Запросить все курсы относительно базовой валюты"""
         url = f"{self.fallback_url}/latest/{base_currency.upper()}"
+        if not self.fallback_breaker.allow():
+            return None
         
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        return {
-                            'base': data['base'],
-                            'date': data['date'],
-                            'rates': data['rates']
-                        }
-                    else:
-                        return None
+            status, body = await self.http_client.fetch(url, breaker=self.fallback_breaker)
+            if status == 200:
+                data = loads(body)
+                return Rates(
+                    base=data['base'],
+                    date=data['date'],
+                    rates={currency: float(rate) for currency, rate in data['rates'].items()},
+                    stale_age=None
+                )
+            return None
         except Exception as e:
             print(f"Ошибка при получении курсов валют: {e}")
             return None
     
-    async def convert_currency(self, amount: float, from_currency: str, to_currency: str) -> Optional[Dict]:
+    async def convert_currency(self, amount: float, from_currency: str, to_currency: str) -> Optional[Conversion]:
         """Конвертировать сумму из одной валюты в другую"""
         rate_data = await self.get_exchange_rate(from_currency, to_currency)
         
         if rate_data:
-            converted_amount = amount * rate_data['rate']
-            return {
-                'from_currency': from_currency.upper(),
-                'to_currency': to_currency.upper(),
-                'amount': amount,
-                'converted_amount': round(converted_amount, 2),
-                'rate': rate_data['rate'],
-                'date': rate_data['date']
-            }
+            converted_amount = amount * rate_data.rate
+            return Conversion(
+                from_currency=from_currency.upper(),
+                to_currency=to_currency.upper(),
+                amount=amount,
+                converted_amount=round(converted_amount, 2),
+                rate=rate_data.rate,
+                date=rate_data.date,
+                stale_age=rate_data.stale_age
+            )
         return None
     
-    async def _get_rate_from_primary_api(self, from_currency: str, to_currency: str) -> Optional[Dict]:
-        """Получить курс из основного API"""
+    async def _get_rate_from_primary_api(self, from_currency: str, to_currency: str) -> Optional[ExchangeRate]:
+        """Получить курс из основного API (разрешение primary_breaker уже получено)"""
+        api_key = self.keys.acquire()
+        if api_key is None:
+            self.primary_breaker.release()
+            return None
+        
         try:
             url = f"{self.base_url}/latest/{from_currency.upper()}"
-            params = {'apikey': self.api_key}
+            params = {'apikey': api_key}
             
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, params=params) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        if to_currency.upper() in data['rates']:
-                            return {
-                                'rate': data['rates'][to_currency.upper()],
-                                'date': data['date']
-                            }
+            status, body = await self.http_client.fetch(url, params, self.primary_breaker)
+            self.keys.report(api_key, status)
+            if status == 200:
+                data = loads(body)
+                if to_currency.upper() in data['rates']:
+                    return ExchangeRate(
+                        rate=float(data['rates'][to_currency.upper()]),
+                        date=data['date'],
+                        stale_age=None
+                    )
             return None
         except Exception:
             return None
     
-    async def _get_rate_from_fallback_api(self, from_currency: str, to_currency: str) -> Optional[Dict]:
+    async def _get_rate_from_fallback_api(self, from_currency: str, to_currency: str) -> Optional[ExchangeRate]:
         """Получить курс из fallback API"""
+        if not self.fallback_breaker.allow():
+            return None
         try:
             url = f"{self.fallback_url}/convert"
             params = {
@@ -87,14 +196,10 @@ class CurrencyAPI:
                 'amount': 1
             }
             
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, params=params) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        return {
-                            'rate': data['result'],
-                            'date': data['date']
-                        }
+            status, body = await self.http_client.fetch(url, params, self.fallback_breaker)
+            if status == 200:
+                data = loads(body)
+                return ExchangeRate(rate=float(data['result']), date=data['date'], stale_age=None)
             return None
         except Exception as e:
             print(f"Ошибка при получении курса из fallback API: {e}")
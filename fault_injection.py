@@ -0,0 +1,165 @@
+"""Проверка circuit breaker на локальной заглушке внешних API с внесением сбоев.
+
+Поднимает заглушку OpenWeatherMap, exchangerate-api.com и
+exchangerate.host, направляет на нее WeatherAPI и CurrencyAPI и
+прогоняет сценарии: норма, основной API валют отвечает 503, основной
+API зависает дольше таймаута чтения, погода отвечает медленно, сбои
+прекратились. Для каждого этапа печатает долю успешных ответов, время
+ответа и состояние breaker каждого API.
+
+Пример:
+    python fault_injection.py --requests 30
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from typing import Dict, List
+from aiohttp import web
+import config
+from http_client import HttpClient
+from weather_api import WeatherAPI
+from currency_api import CurrencyAPI
+
+UPSTREAMS = ('weather', 'primary', 'fallback')
+
+
+class Fault:
+    """Сбой одного API: код ответа вместо данных и задержка ответа"""
+    __slots__ = ('status', 'delay')
+
+    def __init__(self, status: int = 200, delay: float = 0.0):
+        self.status = status
+        self.delay = delay
+
+
+class StubUpstream:
+    """Заглушка внешних API; сбои задаются для каждого API отдельно"""
+
+    def __init__(self):
+        self.faults: Dict[str, Fault] = {name: Fault() for name in UPSTREAMS}
+        self.requests: Dict[str, int] = {name: 0 for name in UPSTREAMS}
+        self.app = web.Application(middlewares=[self._inject])
+        self.app.router.add_get('/weather/weather', self._weather)
+        self.app.router.add_get('/primary/latest/{base}', self._latest)
+        self.app.router.add_get('/fallback/latest/{base}', self._latest)
+        self.app.router.add_get('/fallback/convert', self._convert)
+        self._runner = None
+
+    async def start(self, port: int) -> str:
+        self._runner = web.AppRunner(self.app)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, '127.0.0.1', port).start()
+        return f"http://127.0.0.1:{port}"
+
+    async def stop(self):
+        await self._runner.cleanup()
+
+    @web.middleware
+    async def _inject(self, request: web.Request, handler):
+        name = request.path.split('/')[1]
+        self.requests[name] += 1
+        fault = self.faults[name]
+        if fault.delay:
+            await asyncio.sleep(fault.delay)
+        if fault.status != 200:
+            return web.json_response({'error': 'injected fault'}, status=fault.status)
+        return await handler(request)
+
+    async def _weather(self, request: web.Request):
+        return web.json_response({
+            'id': 524901, 'name': request.query.get('q', 'Москва'), 'sys': {'country': 'RU'},
+            'weather': [{'description': 'ясно', 'icon': '01d'}],
+            'main': {'temp': 20, 'feels_like': 19, 'humidity': 50, 'pressure': 1013},
+            'wind': {'speed': 3.0}
+        })
+
+    async def _latest(self, request: web.Request):
+        return web.json_response({
+            'base': request.match_info['base'], 'date': '2024-01-01',
+            'rates': {'USD': 1.0, 'EUR': 0.92, 'RUB': 90.0}
+        })
+
+    async def _convert(self, request: web.Request):
+        return web.json_response({'result': 90.0, 'date': '2024-01-01'})
+
+
+async def run_phase(title: str, requests: int, weather_api: WeatherAPI, currency_api: CurrencyAPI,
+                    http_client: HttpClient, stub: StubUpstream):
+    """Сделать requests запросов погоды и курса (в обход кэша) и напечатать итог"""
+    before = dict(stub.requests)
+    timings: Dict[str, List[float]] = {'погода': [], 'курс': []}
+    successes = {name: 0 for name in timings}
+    for _ in range(requests):
+        for name, fetch in (('погода', lambda: weather_api._fetch_current_weather('Москва', 'ru', 'metric')),
+                            ('курс', lambda: currency_api._fetch_exchange_rate('USD', 'RUB'))):
+            started = time.perf_counter()
+            result = await fetch()
+            timings[name].append((time.perf_counter() - started) * 1000)
+            successes[name] += result is not None
+
+    print(f"\n== {title}")
+    for name, values in timings.items():
+        print(f"  {name:<7} успешно {successes[name]}/{requests}, "
+              f"медиана {statistics.median(values):.1f} мс, максимум {max(values):.1f} мс")
+    sent = {name: stub.requests[name] - before[name] for name in UPSTREAMS}
+    print(f"  дошло до заглушки: {sent}")
+    for name, breaker in http_client.breakers.items():
+        stats = breaker.stats()
+        print(f"  {name:<17} {stats['state']:<9} ошибок {stats['failure_percent']}%, "
+              f"медленных {stats['slow_percent']}%, отключений {stats['trips']}, отклонено {stats['rejected']}")
+
+
+def configure():
+    """Короткие таймауты и окно отключения, чтобы сценарии шли секунды, а не минуты"""
+    config.OPENWEATHER_API_KEYS = ['stub-weather-key']
+    config.CURRENCY_API_KEYS = ['stub-currency-key']
+    config.OPENWEATHER_RATE_PER_MINUTE = 100000
+    config.HTTP_CONNECT_TIMEOUT = 0.5
+    config.HTTP_READ_TIMEOUT = 0.5
+    config.HTTP_TOTAL_TIMEOUT = 1.0
+    config.BREAKER_SLOW_CALL_SECONDS = 0.2
+    config.BREAKER_OPEN_SECONDS = 1.0
+
+
+async def main(port: int, requests: int):
+    stub = StubUpstream()
+    base_url = await stub.start(port)
+    http_client = HttpClient()
+    weather_api = WeatherAPI(http_client)
+    weather_api.base_url = f"{base_url}/weather"
+    currency_api = CurrencyAPI(http_client)
+    currency_api.base_url = f"{base_url}/primary"
+    currency_api.fallback_url = f"{base_url}/fallback"
+
+    async def phase(title: str):
+        await run_phase(title, requests, weather_api, currency_api, http_client, stub)
+
+    try:
+        await phase("Норма")
+
+        stub.faults['primary'] = Fault(status=503)
+        await phase("Основной API валют отвечает 503: после отключения курс сразу берется из fallback")
+
+        stub.faults['primary'] = Fault(delay=config.HTTP_READ_TIMEOUT * 3)
+        await asyncio.sleep(config.BREAKER_OPEN_SECONDS)
+        await phase("Основной API валют зависает: пробный запрос упирается в таймаут, API снова отключается")
+
+        stub.faults['weather'] = Fault(delay=config.BREAKER_SLOW_CALL_SECONDS * 1.5)
+        await phase("Погода отвечает медленно: отключение по доле медленных ответов")
+
+        stub.faults = {name: Fault() for name in UPSTREAMS}
+        await asyncio.sleep(config.BREAKER_OPEN_SECONDS)
+        await phase("Сбои прекратились: пробные запросы включают API обратно")
+    finally:
+        await http_client.close()
+        await stub.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Проверка circuit breaker с внесением сбоев")
+    parser.add_argument('--port', type=int, default=8089, help="порт заглушки")
+    parser.add_argument('--requests', type=int, default=30, help="запросов каждого API на этап")
+    args = parser.parse_args()
+    configure()
+    asyncio.run(main(args.port, args.requests))
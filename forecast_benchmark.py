@@ -0,0 +1,113 @@
+"""Микробенчмарк разбора прогноза погоды: разбор JSON + форматирование.
+
+Сравнивает прежний путь (json.loads + выбор интервалов на 12:00 по dt_txt)
+с текущим (json_utils.loads + дневные сводки в WeatherAPI._format_forecast).
+Без --payload используется синтетический ответ /forecast (40 интервалов).
+
+Пример:
+    python forecast_benchmark.py --payload recorded/moscow.json --payload recorded/sochi.json
+"""
+import argparse
+import json
+import random
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, List
+from json_utils import BACKEND, loads
+from weather_api import WeatherAPI
+
+
+def make_payload(start: int) -> bytes:
+    """Синтетический ответ /forecast в формате OpenWeatherMap"""
+    items = []
+    for slot in range(40):
+        dt = start + slot * 3 * 3600
+        temp = round(random.uniform(-10, 25), 2)
+        item = {
+            'dt': dt,
+            'main': {
+                'temp': temp, 'feels_like': temp - 2, 'temp_min': temp - 1, 'temp_max': temp + 1,
+                'pressure': 1012, 'sea_level': 1012, 'grnd_level': 995, 'humidity': random.randint(40, 95),
+                'temp_kf': 0
+            },
+            'weather': [{'id': 500, 'main': 'Rain', 'description': 'небольшой дождь', 'icon': '10d'}],
+            'clouds': {'all': 75},
+            'wind': {'speed': 3.4, 'deg': 210, 'gust': 6.1},
+            'visibility': 10000,
+            'pop': 0.4,
+            'sys': {'pod': 'd'},
+            'dt_txt': datetime.fromtimestamp(dt, timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+        }
+        if random.random() < 0.3:
+            item['rain'] = {'3h': round(random.uniform(0.1, 3), 2)}
+        items.append(item)
+    return json.dumps({
+        'cod': '200', 'message': 0, 'cnt': len(items), 'list': items,
+        'city': {
+            'id': 524901, 'name': 'Москва', 'coord': {'lat': 55.7522, 'lon': 37.6156}, 'country': 'RU',
+            'population': 12000000, 'timezone': 10800, 'sunrise': start, 'sunset': start + 40000
+        }
+    }, ensure_ascii=False).encode('utf-8')
+
+
+def legacy_format(data: Dict) -> Dict:
+    """Прежнее форматирование: только интервалы на 12:00 по dt_txt"""
+    daily_forecasts = {}
+    for item in data['list']:
+        date = item['dt_txt'].split(' ')[0]
+        time_of_day = item['dt_txt'].split(' ')[1]
+        if time_of_day == "12:00:00" and len(daily_forecasts) < 5:
+            weather = item['weather'][0]
+            main = item['main']
+            daily_forecasts[date] = {
+                'date': date,
+                'description': weather['description'].capitalize(),
+                'temperature': round(main['temp']),
+                'humidity': main['humidity'],
+                'icon': weather['icon']
+            }
+    return {'city': data['city']['name'], 'country': data['city']['country'],
+            'forecasts': list(daily_forecasts.values())}
+
+
+def measure(name: str, payloads: List[bytes], parse: Callable[[bytes], Dict], rounds: int):
+    """Прогнать parse по всем ответам rounds раз и вывести время на один ответ"""
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for payload in payloads:
+            parse(payload)
+    elapsed = time.perf_counter() - started
+    per_payload = elapsed / (rounds * len(payloads)) * 1e6
+    print(f"{name:<40} {per_payload:8.1f} мкс/ответ")
+    return per_payload
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Микробенчмарк разбора прогноза погоды")
+    parser.add_argument('--payload', action='append', default=[], help="записанный ответ /forecast (можно несколько)")
+    parser.add_argument('--samples', type=int, default=20, help="синтетических ответов, если нет --payload")
+    parser.add_argument('--rounds', type=int, default=500, help="повторов по всем ответам")
+    args = parser.parse_args()
+
+    if args.payload:
+        payloads = []
+        for path in args.payload:
+            with open(path, 'rb') as payload_file:
+                payloads.append(payload_file.read())
+    else:
+        start = int(time.time()) // 10800 * 10800
+        payloads = [make_payload(start) for _ in range(args.samples)]
+
+    weather_api = WeatherAPI()
+    print(f"Ответов: {len(payloads)}, средний размер: {sum(map(len, payloads)) // len(payloads)} байт, "
+          f"JSON бэкенд: {BACKEND}")
+    legacy = measure("json.loads + 12:00 (прежний)", payloads,
+                     lambda payload: legacy_format(json.loads(payload)), args.rounds)
+    measure(f"{BACKEND}.loads", payloads, loads, args.rounds)
+    current = measure(f"{BACKEND}.loads + дневные сводки (текущий)", payloads,
+                      lambda payload: weather_api._format_forecast(loads(payload)), args.rounds)
+    print(f"Ускорение: {legacy / current:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
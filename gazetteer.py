@@ -0,0 +1,134 @@
+import mmap
+import os
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+def normalize_name(name: str) -> str:
+    """Нормализовать название города (регистр, пробелы, дефисы, ё/е)"""
+    return " ".join(name.replace('-', ' ').split()).lower().replace('ё', 'е')
+
+
+def _trigrams(name: str) -> set:
+    """Триграммы нормализованного названия (с границами слова)"""
+    padded = f"  {name} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+@dataclass(frozen=True)
+class City:
+    """Город из справочника"""
+    __slots__ = ('id', 'name', 'country', 'query')
+    id: int
+    name: str
+    country: str
+    query: str  # каноническое название для запроса к OpenWeatherMap
+
+
+class Gazetteer:
+    """Офлайн справочник городов: синонимы, поиск по префиксу и опечаткам.
+
+    Файл справочника отображается в память (mmap): в индексах хранятся только
+    нормализованные названия и смещения строк, сами записи читаются из файла
+    по требованию. Формат строки: "запрос|название|синоним,синоним".
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, 'rb')
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._offsets = array('L')  # смещение строки города в файле, индекс - ID города
+        self._names: List[str] = []  # все нормализованные названия, по алфавиту
+        self._name_city = array('L')  # ID города для каждого названия
+        self._name_grams = array('H')  # число триграмм в каждом названии
+        self._grams: Dict[str, array] = {}  # триграмма -> номера названий
+        self._build()
+
+    def _build(self):
+        """Построить индексы по файлу справочника"""
+        names = {}
+        offset = 0
+        for raw in iter(self._mmap.readline, b''):
+            line = raw.decode('utf-8').strip()
+            if line and not line.startswith('#'):
+                query, name, aliases = line.split('|')
+                city_id = len(self._offsets)
+                self._offsets.append(offset)
+                for alias in [name, query.split(',')[0], *aliases.split(',')]:
+                    alias = normalize_name(alias)
+                    if alias:
+                        names.setdefault(alias, city_id)
+            offset += len(raw)
+
+        for index, name in enumerate(sorted(names)):
+            self._names.append(name)
+            self._name_city.append(names[name])
+            grams = _trigrams(name)
+            self._name_grams.append(len(grams))
+            for gram in grams:
+                self._grams.setdefault(gram, array('L')).append(index)
+
+    def __len__(self) -> int:
+        return len(self._offsets)
+
+    def city(self, city_id: int) -> City:
+        """Прочитать запись города из файла"""
+        start = self._offsets[city_id]
+        end = self._mmap.find(b'\n', start)
+        line = self._mmap[start:end if end >= 0 else len(self._mmap)]
+        query, name, _ = line.decode('utf-8').strip().split('|')
+        return City(city_id, name, query.rsplit(',', 1)[-1], query)
+
+    def resolve(self, name: str) -> Optional[City]:
+        """Найти город по точному названию или синониму"""
+        name = normalize_name(name)
+        index = bisect_left(self._names, name)
+        if index < len(self._names) and self._names[index] == name:
+            return self.city(self._name_city[index])
+        return None
+
+    def complete(self, prefix: str, limit: int = 5) -> List[City]:
+        """Города, название которых начинается с prefix"""
+        prefix = normalize_name(prefix)
+        cities: List[City] = []
+        seen = set()
+        index = bisect_left(self._names, prefix)
+        while index < len(self._names) and self._names[index].startswith(prefix) and len(cities) < limit:
+            city_id = self._name_city[index]
+            if city_id not in seen:
+                seen.add(city_id)
+                cities.append(self.city(city_id))
+            index += 1
+        return cities
+
+    def suggest(self, name: str, limit: int = 3, min_score: float = 0.4) -> List[tuple]:
+        """Похожие города по триграммам: список (город, сходство от 0 до 1)"""
+        grams = _trigrams(normalize_name(name))
+        shared = Counter()
+        for gram in grams:
+            shared.update(self._grams.get(gram, ()))
+
+        best: Dict[int, float] = {}
+        for index, count in shared.items():
+            # Коэффициент Дайса по множествам триграмм
+            score = 2 * count / (len(grams) + self._name_grams[index])
+            city_id = self._name_city[index]
+            if score >= min_score and score > best.get(city_id, 0.0):
+                best[city_id] = score
+
+        ranked = sorted(best.items(), key=lambda item: item[1], reverse=True)[:limit]
+        return [(self.city(city_id), round(score, 3)) for city_id, score in ranked]
+
+    def close(self):
+        """Закрыть файл справочника"""
+        self._mmap.close()
+        self._file.close()
+
+
+def load_gazetteer(path: str) -> Optional[Gazetteer]:
+    """Загрузить справочник городов (None, если файла нет)"""
+    if not path or not os.path.exists(path):
+        return None
+    return Gazetteer(path)
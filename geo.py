@@ -0,0 +1,69 @@
+from typing import Tuple
+
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+_DECODE = {char: index for index, char in enumerate(_BASE32)}
+
+
+def geohash_encode(lat: float, lon: float, precision: int = 5) -> str:
+    """Geohash ячейки, в которую попадает точка (precision символов)"""
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    value = 0
+    even = True  # биты чередуются: долгота, широта, долгота...
+    while len(chars) < precision:
+        coord, bounds = (lon, lon_range) if even else (lat, lat_range)
+        middle = (bounds[0] + bounds[1]) / 2
+        value <<= 1
+        if coord >= middle:
+            value |= 1
+            bounds[0] = middle
+        else:
+            bounds[1] = middle
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(_BASE32[value])
+            bits = 0
+            value = 0
+    return "".join(chars)
+
+
+def geohash_bounds(geohash: str) -> Tuple[float, float, float, float]:
+    """Границы ячейки: (мин. широта, макс. широта, мин. долгота, макс. долгота)"""
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    even = True
+    for char in geohash:
+        value = _DECODE[char]
+        for shift in range(4, -1, -1):
+            bounds = lon_range if even else lat_range
+            middle = (bounds[0] + bounds[1]) / 2
+            if value >> shift & 1:
+                bounds[0] = middle
+            else:
+                bounds[1] = middle
+            even = not even
+    return lat_range[0], lat_range[1], lon_range[0], lon_range[1]
+
+
+def geohash_center(geohash: str) -> Tuple[float, float]:
+    """Центр ячейки (широта, долгота), округленный до 4 знаков"""
+    min_lat, max_lat, min_lon, max_lon = geohash_bounds(geohash)
+    return round((min_lat + max_lat) / 2, 4), round((min_lon + max_lon) / 2, 4)
+
+
+def snap_to_grid(lat: float, lon: float, precision: int = 5) -> Tuple[str, float, float]:
+    """Привязать точку к сетке: (geohash ячейки, широта и долгота ее центра).
+
+    Соседние точки попадают в одну ячейку и делят запрос к API и запись кэша.
+    При precision=5 ячейка около 5x5 км, при 6 - около 1.2x0.6 км.
+    """
+    geohash = geohash_encode(lat, lon, precision)
+    return (geohash, *geohash_center(geohash))
+
+
+def is_valid_geohash(geohash: str) -> bool:
+    """Корректная ли строка geohash"""
+    return bool(geohash) and all(char in _DECODE for char in geohash)
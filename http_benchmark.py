@@ -0,0 +1,120 @@
+"""Бенчмарк HTTP клиента на локальной заглушке внешнего API.
+
+Поднимает заглушку с ответом как у OpenWeatherMap и делает одно и то же
+число запросов двумя способами: новая aiohttp.ClientSession на каждый
+запрос (как было до общего пула) и общий HttpClient с пулом соединений
+и keep-alive. Для каждого способа печатает запросы в секунду, медиану и
+95-й перцентиль времени ответа и число открытых TCP соединений.
+
+Пример:
+    python http_benchmark.py --requests 2000 --concurrency 20
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from typing import List
+import aiohttp
+from aiohttp import web
+from http_client import HttpClient
+
+RESPONSE = {
+    'id': 524901, 'name': 'Москва', 'sys': {'country': 'RU'},
+    'weather': [{'description': 'ясно', 'icon': '01d'}],
+    'main': {'temp': 20, 'feels_like': 19, 'humidity': 50, 'pressure': 1013},
+    'wind': {'speed': 3.0}
+}
+
+
+class StubServer:
+    """Заглушка API: отвечает после задержки и считает соединения клиентов"""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.peers = set()  # адрес и порт клиента: одно значение на TCP соединение
+        self.app = web.Application()
+        self.app.router.add_get('/weather', self._weather)
+        self._runner = None
+
+    @property
+    def connections(self) -> int:
+        return len(self.peers)
+
+    async def start(self, port: int) -> str:
+        self._runner = web.AppRunner(self.app)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, '127.0.0.1', port).start()
+        return f"http://127.0.0.1:{self._runner.addresses[0][1]}/weather"
+
+    async def stop(self):
+        await self._runner.cleanup()
+
+    async def _weather(self, request: web.Request):
+        self.peers.add(request.transport.get_extra_info('peername'))
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        return web.json_response(RESPONSE)
+
+
+async def session_per_request(url: str, params: dict):
+    """Прежний способ: своя сессия и свое соединение на каждый запрос"""
+    async with aiohttp.ClientSession() as session:
+        async with session.get(url, params=params) as response:
+            await response.read()
+
+
+async def run(title: str, requests: int, concurrency: int, fetch, stub: StubServer):
+    """Сделать requests запросов не больше concurrency одновременно и напечатать итог"""
+    semaphore = asyncio.Semaphore(concurrency)
+    timings: List[float] = []
+
+    async def one(number: int):
+        async with semaphore:
+            started = time.perf_counter()
+            await fetch(number)
+            timings.append((time.perf_counter() - started) * 1000)
+
+    connections = stub.connections
+    started = time.perf_counter()
+    await asyncio.gather(*(one(number) for number in range(requests)))
+    elapsed = time.perf_counter() - started
+    timings.sort()
+    print(f"{title:<26} {requests / elapsed:>10,.0f} {statistics.median(timings):>12.2f} "
+          f"{timings[int(len(timings) * 0.95)]:>8.2f} {stub.connections - connections:>11}")
+    return requests / elapsed
+
+
+async def main(port: int, requests: int, concurrency: int, delay: float):
+    stub = StubServer(delay)
+    url = await stub.start(port)
+    http_client = HttpClient()
+
+    async def per_request(number: int):
+        await session_per_request(url, {'q': 'Москва', 'n': number})
+
+    async def shared(number: int):
+        await http_client.fetch(url, {'q': 'Москва', 'n': number})
+
+    try:
+        # Прогрев: импорт модулей, первое соединение пула
+        await per_request(0)
+        await shared(0)
+
+        print(f"Запросов: {requests}, одновременно: {concurrency}, задержка заглушки: {delay * 1000:.0f} мс")
+        print(f"{'Способ':<26} {'запросов/с':>10} {'медиана, мс':>12} {'p95, мс':>8} {'соединений':>11}")
+        before = await run("сессия на каждый запрос", requests, concurrency, per_request, stub)
+        after = await run("общий пул HttpClient", requests, concurrency, shared, stub)
+        print(f"Ускорение: {after / before:.1f}x")
+    finally:
+        await http_client.close()
+        await stub.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Бенчмарк HTTP клиента на локальной заглушке")
+    parser.add_argument('--port', type=int, default=0, help="порт заглушки (0 - любой свободный)")
+    parser.add_argument('--requests', type=int, default=2000, help="число запросов каждым способом")
+    parser.add_argument('--concurrency', type=int, default=20, help="одновременных запросов")
+    parser.add_argument('--delay', type=float, default=0.0, help="задержка ответа заглушки, секунд")
+    args = parser.parse_args()
+    asyncio.run(main(args.port, args.requests, args.concurrency, args.delay))
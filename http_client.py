@@ -0,0 +1,79 @@
+import aiohttp
+import asyncio
+import time
+from typing import Dict, Optional, Tuple
+import config
+from circuit_breaker import CircuitBreaker
+
+class HttpClient:
+    """Общий пул HTTP-соединений для всех API клиентов"""
+
+    def __init__(self):
+        self._session: Optional[aiohttp.ClientSession] = None
+        self.breakers: Dict[str, CircuitBreaker] = {}
+
+    def get_session(self) -> aiohttp.ClientSession:
+        """Получить общую сессию (создается при первом обращении)"""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=config.HTTP_POOL_LIMIT,
+                limit_per_host=config.HTTP_POOL_LIMIT_PER_HOST,
+                ttl_dns_cache=config.HTTP_DNS_CACHE_TTL,
+                keepalive_timeout=config.HTTP_KEEPALIVE_TIMEOUT
+            )
+            timeout = aiohttp.ClientTimeout(
+                total=config.HTTP_TOTAL_TIMEOUT,
+                sock_connect=config.HTTP_CONNECT_TIMEOUT,
+                sock_read=config.HTTP_READ_TIMEOUT
+            )
+            self._session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+        return self._session
+
+    def breaker(self, name: str) -> CircuitBreaker:
+        """Circuit breaker внешнего API (один на имя, настройки из config)"""
+        breaker = self.breakers.get(name)
+        if breaker is None:
+            breaker = self.breakers[name] = CircuitBreaker(
+                name,
+                window=config.BREAKER_WINDOW,
+                min_calls=config.BREAKER_MIN_CALLS,
+                failure_ratio=config.BREAKER_FAILURE_RATIO,
+                slow_call_seconds=config.BREAKER_SLOW_CALL_SECONDS,
+                slow_ratio=config.BREAKER_SLOW_RATIO,
+                open_seconds=config.BREAKER_OPEN_SECONDS,
+                half_open_calls=config.BREAKER_HALF_OPEN_CALLS
+            )
+        return breaker
+
+    async def fetch(self, url: str, params: Optional[Dict] = None,
+                    breaker: Optional[CircuitBreaker] = None) -> Tuple[int, bytes]:
+        """GET запрос: статус и тело ответа.
+
+        Запрос должен быть заранее разрешен breaker.allow(); ошибки, ответы
+        5xx и время ответа учитываются в breaker.
+        """
+        started = time.monotonic()
+        try:
+            async with self.get_session().get(url, params=params) as response:
+                body = await response.read()
+        except asyncio.CancelledError:
+            if breaker is not None:
+                breaker.release()
+            raise
+        except Exception:
+            if breaker is not None:
+                breaker.record(False, time.monotonic() - started)
+            raise
+        if breaker is not None:
+            breaker.record(response.status < 500, time.monotonic() - started)
+        return response.status, body
+
+    async def start(self):
+        """Открыть сессию при запуске приложения"""
+        self.get_session()
+
+    async def close(self):
+        """Закрыть сессию и все соединения пула"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
@@ -0,0 +1,32 @@
+"""Разбор JSON ответов API с быстрым бэкендом, если он установлен.
+
+Порядок выбора: orjson, msgspec, стандартный json. Дополнительные
+пакеты не обязательны: без них используется json из стандартной библиотеки.
+"""
+import json
+from typing import Any, Union
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+if orjson is not None:
+    BACKEND = "orjson"
+    _loads = orjson.loads
+elif msgspec is not None:
+    BACKEND = "msgspec"
+    _loads = msgspec.json.Decoder().decode
+else:
+    BACKEND = "json"
+    _loads = json.loads
+
+
+def loads(data: Union[bytes, str]) -> Any:
+    """Разобрать JSON из байтов ответа (без промежуточного декодирования в str)"""
+    return _loads(data)
@@ -0,0 +1,173 @@
+"""Типизированные ответы API клиентов.
+
+Неизменяемые dataclass со __slots__: записи кэша занимают меньше памяти,
+чем словари, и их можно отдавать разным пользователям без копирования.
+Конструкторы from_* разбирают исходный JSON внешних API и проверяют,
+что нужные поля на месте (KeyError/TypeError/ValueError, если нет).
+"""
+from dataclasses import dataclass, fields, is_dataclass
+from typing import Any, Dict, Optional, Tuple
+
+# Страна, иконка, описание и источник повторяются в тысячах записей кэша,
+# поэтому такие строки хранятся в одном экземпляре
+_strings: Dict[str, str] = {}
+
+
+def _intern(value: str) -> str:
+    """Один объект на каждую часто повторяющуюся строку"""
+    return _strings.setdefault(value, value)
+
+
+@dataclass(frozen=True)
+class CurrentWeather:
+    """Текущая погода в городе"""
+    __slots__ = ('city_id', 'city', 'country', 'description', 'temperature', 'feels_like',
+                 'humidity', 'pressure', 'wind_speed', 'icon', 'stale_age')
+    city_id: Optional[int]
+    city: str
+    country: str
+    description: str
+    temperature: int
+    feels_like: int
+    humidity: int
+    pressure: int
+    wind_speed: float
+    icon: str
+    stale_age: Optional[int]  # возраст устаревшего ответа из кэша, секунд
+
+    @classmethod
+    def from_owm(cls, data: Dict) -> "CurrentWeather":
+        """Разобрать ответ OpenWeatherMap /weather (или элемент /group)"""
+        weather = data['weather'][0]
+        main = data['main']
+        return cls(
+            city_id=data.get('id'),
+            city=data['name'],
+            country=_intern(data['sys']['country']),
+            description=_intern(weather['description'].capitalize()),
+            temperature=round(main['temp']),
+            feels_like=round(main['feels_like']),
+            humidity=int(main['humidity']),
+            pressure=int(main['pressure']),
+            wind_speed=float((data.get('wind') or {}).get('speed', 0)),
+            icon=_intern(weather['icon']),
+            stale_age=None
+        )
+
+
+@dataclass(frozen=True)
+class DailyForecast:
+    """Прогноз на один день"""
+    __slots__ = ('date', 'description', 'temperature', 'temp_min', 'temp_max', 'temp_mean',
+                 'precipitation', 'humidity', 'icon')
+    date: str
+    description: str
+    temperature: int
+    temp_min: int
+    temp_max: int
+    temp_mean: float
+    precipitation: float
+    humidity: int
+    icon: str
+
+
+@dataclass(frozen=True)
+class Forecast:
+    """Прогноз погоды по дням"""
+    __slots__ = ('city', 'country', 'forecasts', 'stale_age')
+    city: str
+    country: str
+    forecasts: Tuple[DailyForecast, ...]
+    stale_age: Optional[int]
+
+
+@dataclass(frozen=True)
+class Article:
+    """Новость"""
+    __slots__ = ('title', 'description', 'url', 'published_at', 'source', 'stale_age')
+    title: str
+    description: str
+    url: str
+    published_at: str
+    source: str
+    stale_age: Optional[int]
+
+    @classmethod
+    def from_newsapi(cls, article: Dict) -> "Article":
+        """Разобрать статью из ответа News API"""
+        description = article['description']
+        return cls(
+            title=article['title'],
+            description=description[:200] + "..." if len(description) > 200 else description,
+            url=article.get('url') or '',
+            published_at=article.get('publishedAt') or '',
+            source=_intern((article.get('source') or {}).get('name') or 'Неизвестно'),
+            stale_age=None
+        )
+
+
+@dataclass(frozen=True)
+class ExchangeRate:
+    """Курс одной валюты к другой"""
+    __slots__ = ('rate', 'date', 'stale_age')
+    rate: float
+    date: str
+    stale_age: Optional[int]
+
+
+@dataclass(frozen=True, eq=False)
+class Rates:
+    """Курсы всех валют относительно базовой.
+
+    Сравнение и хэш - по объекту: словарь курсов не хэшируется, а один
+    ответ API в кэше - это один объект.
+    """
+    __slots__ = ('base', 'date', 'rates', 'stale_age')
+    base: str
+    date: str
+    rates: Dict[str, float]
+    stale_age: Optional[int]
+
+
+@dataclass(frozen=True)
+class Conversion:
+    """Результат конвертации суммы"""
+    __slots__ = ('from_currency', 'to_currency', 'amount', 'converted_amount', 'rate', 'date', 'stale_age')
+    from_currency: str
+    to_currency: str
+    amount: float
+    converted_amount: float
+    rate: float
+    date: str
+    stale_age: Optional[int]
+
+
+_MODELS = {model.__name__: model for model in (
+    CurrentWeather, DailyForecast, Forecast, Article, ExchangeRate, Rates, Conversion
+)}
+
+
+def to_primitive(value: Any) -> Any:
+    """Преобразовать модель (или список моделей) в JSON-совместимые данные"""
+    if is_dataclass(value):
+        data = {'__model__': type(value).__name__}
+        for field in fields(value):
+            data[field.name] = to_primitive(getattr(value, field.name))
+        return data
+    if isinstance(value, (list, tuple)):
+        return [to_primitive(item) for item in value]
+    return value
+
+
+def from_primitive(value: Any) -> Any:
+    """Восстановить модель из данных to_primitive (ValueError для других данных)"""
+    if isinstance(value, list):
+        return [from_primitive(item) for item in value]
+    if not isinstance(value, dict) or value.get('__model__') not in _MODELS:
+        raise ValueError("Не модель ответа API")
+
+    model = _MODELS[value['__model__']]
+    kwargs = {field.name: value[field.name] for field in fields(model)}
+    if model is Forecast:
+        kwargs['forecasts'] = tuple(from_primitive(item) for item in kwargs['forecasts'])
+    return model(**kwargs)
@@ -0,0 +1,87 @@
+"""Бенчмарк моделей ответов: память и время разбора на 100 тыс. записей кэша.
+
+Сравнивает словари (прежний формат ответов) с моделями из models.py
+на одинаковых синтетических ответах OpenWeatherMap /weather.
+
+Пример:
+    python models_benchmark.py --entries 100000
+"""
+import argparse
+import gc
+import random
+import time
+import tracemalloc
+from typing import Callable, Dict, List
+from models import CurrentWeather
+
+DESCRIPTIONS = ["ясно", "облачно с прояснениями", "пасмурно", "небольшой дождь", "снег", "туман"]
+ICONS = ["01d", "02d", "03d", "04d", "10d", "13d", "50d"]
+COUNTRIES = ["RU", "BY", "KZ", "UZ", "GE", "AM", "TR", "DE"]
+
+
+def make_response(city_id: int) -> Dict:
+    """Синтетический разобранный ответ /weather"""
+    return {
+        'id': city_id,
+        'name': f"Город {city_id}",
+        'sys': {'country': random.choice(COUNTRIES)},
+        'weather': [{'description': random.choice(DESCRIPTIONS), 'icon': random.choice(ICONS)}],
+        'main': {
+            'temp': random.uniform(-30, 35), 'feels_like': random.uniform(-35, 35),
+            'humidity': random.randint(10, 100), 'pressure': random.randint(980, 1040)
+        },
+        'wind': {'speed': round(random.uniform(0, 20), 1)}
+    }
+
+
+def legacy_format(data: Dict) -> Dict:
+    """Прежнее форматирование ответа в словарь"""
+    weather = data['weather'][0]
+    main = data['main']
+    wind = data.get('wind', {})
+    return {
+        'city_id': data.get('id'),
+        'city': data['name'],
+        'country': data['sys']['country'],
+        'description': weather['description'].capitalize(),
+        'temperature': round(main['temp']),
+        'feels_like': round(main['feels_like']),
+        'humidity': main['humidity'],
+        'pressure': main['pressure'],
+        'wind_speed': wind.get('speed', 0),
+        'icon': weather['icon']
+    }
+
+
+def measure(name: str, responses: List[Dict], decode: Callable[[Dict], object]) -> List[object]:
+    """Разобрать все ответы, вывести время на запись и занятую память"""
+    gc.collect()
+    started = time.perf_counter()
+    entries = [decode(response) for response in responses]
+    elapsed = time.perf_counter() - started
+    del entries
+
+    # Память меряется отдельным проходом: tracemalloc сильно замедляет разбор
+    gc.collect()
+    tracemalloc.start()
+    entries = [decode(response) for response in responses]
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{name:<28} {elapsed / len(responses) * 1e6:6.2f} мкс/запись, "
+          f"{memory / len(responses):7.1f} байт/запись, всего {memory / 2 ** 20:6.1f} МиБ")
+    return entries
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк моделей ответов API")
+    parser.add_argument('--entries', type=int, default=100000, help="число записей кэша")
+    args = parser.parse_args()
+
+    responses = [make_response(city_id) for city_id in range(args.entries)]
+    print(f"Записей: {args.entries}")
+    measure("словари (прежний формат)", responses, legacy_format)
+    measure("CurrentWeather (__slots__)", responses, CurrentWeather.from_owm)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,81 +1,173 @@
-import aiohttp
 import asyncio
-from typing import Dict, Optional, List
+import time
+from typing import Optional, List
 import config
+from http_client import HttpClient
+from cache import CachedFetcher
+from cache_store import CacheStore
+from rate_limiter import UpstreamLimiter
+from api_keys import ApiKeyPool
+from json_utils import loads
+from models import Article
+from article_store import ArticleStore
+from news_index import NewsIndex
 
 class NewsAPI:
     """Класс для работы с News API"""
     
-    def __init__(self):
-        self.api_key = getattr(config, 'NEWS_API_KEY', None)
+    def __init__(self, http_client: Optional[HttpClient] = None, cache_store: Optional[CacheStore] = None,
+                 index: Optional[NewsIndex] = None):
+        self.http_client = http_client or HttpClient()
         self.base_url = "https://newsapi.org/v2"
+        self.breaker = self.http_client.breaker("newsapi")
+        self.cache = CachedFetcher(
+            max_entries=config.NEWS_CACHE_MAX_ENTRIES,
+            stale_ttl=config.CACHE_STALE_TTL,
+            stale_while_revalidate=config.STALE_WHILE_REVALIDATE,
+            name="news",
+            store=cache_store
+        )
+        self.keys = ApiKeyPool(
+            "newsapi", config.NEWS_API_KEYS, config.NEWS_DAILY_QUOTA,
+            auth_cooldown=config.API_KEY_AUTH_COOLDOWN,
+            throttle_cooldown=config.API_KEY_THROTTLE_COOLDOWN
+        )
+        self.index = index
+        self.store = ArticleStore(
+            max_articles=config.NEWS_STORE_MAX_ARTICLES,
+            feed_size=config.NEWS_FEED_SIZE,
+            max_distance=config.NEWS_DUPLICATE_DISTANCE,
+            on_added=index.add if index is not None else None
+        )
+        # Общие лимиты сервиса растут с числом ключей
+        key_count = max(len(self.keys), 1)
+        self.limiter = UpstreamLimiter(
+            "newsapi",
+            per_minute=config.NEWS_RATE_PER_MINUTE * key_count,
+            per_day=config.NEWS_DAILY_QUOTA * key_count,
+            max_wait=config.UPSTREAM_MAX_WAIT,
+            tight_ratio=config.QUOTA_TIGHT_RATIO
+        )
     
-    async def get_top_headlines(self, country: str = "ru", category: str = "general", limit: int = 5) -> Optional[List[Dict]]:
-        """Получить топ новостей по стране и категории"""
-        if not self.api_key:
+    async def get_top_headlines(self, country: str = "ru", category: str = "general", limit: int = 5,
+                                refresh: bool = False) -> Optional[List[Article]]:
+        """Получить топ новостей по стране и категории.
+        
+        Кэшируется вся лента категории (из хранилища статей), поэтому
+        разные limit используют одну запись кэша и один запрос к API.
+        """
+        key = ('headlines', country, category)
+        articles = await self.cache.get(
+            key, config.NEWS_CACHE_TTL,
+            lambda: self._fetch_top_headlines(country, category),
+            refresh=refresh,
+            prefer_stale=self.limiter.is_tight()
+        )
+        return articles[:limit] if articles else articles
+    
+    async def search_news(self, query: str, limit: int = 5) -> Optional[List[Article]]:
+        """Поиск новостей по запросу.
+        
+        Сначала ищет в локальном индексе статей; в News API идет, только
+        если совпадений нет или самое свежее из них добавлено в индекс
+        давно. Найденное в API попадает в индекс, а при ошибке API
+        возвращаются локальные результаты, какими бы старыми они ни были.
+        """
+        local, indexed_at = [], None
+        if self.index is not None:
+            local, indexed_at = await asyncio.to_thread(self.index.search, query, limit)
+        if indexed_at is not None and time.time() - indexed_at < config.NEWS_INDEX_MAX_AGE:
+            return local
+        
+        key = ('search', " ".join(query.lower().split()), limit)
+        articles = await self.cache.get(
+            key, config.NEWS_CACHE_TTL,
+            lambda: self._fetch_search_news(query, limit),
+            prefer_stale=self.limiter.is_tight()
+        )
+        return articles or local or None
+    
+    async def _fetch_top_headlines(self, country: str, category: str) -> Optional[List[Article]]:
+        """Запросить топ новостей у News API и обновить ленту категории"""
+        if not self.keys:
+            return None
+        api_key = await self._reserve_key()
+        if api_key is None:
             return None
             
         url = f"{self.base_url}/top-headlines"
         params = {
             'country': country,
             'category': category,
-            'apiKey': self.api_key,
-            'pageSize': limit
+            'apiKey': api_key,
+            'pageSize': config.NEWS_FEED_PAGE_SIZE
         }
         
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, params=params) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        return self._format_news(data.get('articles', []))
-                    else:
-                        return None
+            status, body = await self.http_client.fetch(url, params, self.breaker)
+            self.keys.report(api_key, status)
+            if status == 200:
+                data = loads(body)
+                self.store.ingest_feed((country, category), data.get('articles', []))
+                return self.store.feed((country, category)) or None
+            if status == 429:
+                self.limiter.report_throttled()
+            return None
         except Exception as e:
             print(f"Ошибка при получении новостей: {e}")
             return None
     
-    async def search_news(self, query: str, limit: int = 5) -> Optional[List[Dict]]:
-        """Поиск новостей по запросу"""
-        if not self.api_key:
+    async def _fetch_search_news(self, query: str, limit: int) -> Optional[List[Article]]:
+        """Запросить поиск новостей у News API"""
+        if not self.keys:
+            return None
+        api_key = await self._reserve_key()
+        if api_key is None:
             return None
             
         url = f"{self.base_url}/everything"
         params = {
             'q': query,
-            'apiKey': self.api_key,
+            'apiKey': api_key,
             'pageSize': limit,
             'sortBy': 'publishedAt',
             'language': 'ru'
         }
         
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, params=params) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        return self._format_news(data.get('articles', []))
-                    else:
-                        return None
+            status, body = await self.http_client.fetch(url, params, self.breaker)
+            self.keys.report(api_key, status)
+            if status == 200:
+                data = loads(body)
+                return self.store.ingest(data.get('articles', []))
+            if status == 429:
+                self.limiter.report_throttled()
+            return None
         except Exception as e:
             print(f"Ошибка при поиске новостей: {e}")
             return None
     
-    def _format_news(self, articles: List[Dict]) -> List[Dict]:
-        """Форматирование новостей"""
-        formatted_news = []
+    async def _reserve_key(self) -> Optional[str]:
+        """Разрешение breaker, токен лимитера и ключ для одного запроса.
         
-        for article in articles:
-            if article.get('title') and article.get('description'):
-                formatted_news.append({
-                    'title': article['title'],
-                    'description': article['description'][:200] + "..." if len(article['description']) > 200 else article['description'],
-                    'url': article.get('url', ''),
-                    'published_at': article.get('publishedAt', ''),
-                    'source': article.get('source', {}).get('name', 'Неизвестно')
-                })
-        
-        return formatted_news
+        Без рабочих ключей (все получили 401/429) и при отключенном API
+        (и занятом пробном запросе) запрос отклоняется до траты токена и
+        квоты. Если ключ исключили, пока запрос ждал токена, токен
+        возвращается лимитеру; без токена или ключа возвращается и
+        разрешение breaker.
+        """
+        if not self.keys.available() or not self.breaker.allow():
+            return None
+        api_key = None
+        try:
+            if await self.limiter.acquire():
+                api_key = self.keys.acquire()
+                if api_key is None:
+                    self.limiter.refund()
+        finally:
+            if api_key is None:
+                self.breaker.release()
+        return api_key
     
     def get_available_categories(self) -> List[str]:
         """Получить доступные категории новостей"""
@@ -0,0 +1,152 @@
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+from models import Article
+from stemmer import stem_words
+
+
+def _signed(key: int) -> int:
+    """64-битный хэш без знака -> INTEGER SQLite"""
+    return key - (1 << 64) if key >> 63 else key
+
+
+def match_query(query: str) -> Optional[str]:
+    """Запрос FTS5 из текста пользователя: все основы слов должны встретиться"""
+    terms = dict.fromkeys(stem_words(query))
+    if not terms:
+        return None
+    return " ".join('"' + term.replace('"', '""') + '"' for term in terms)
+
+
+class NewsIndex:
+    """Полнотекстовый индекс статей в SQLite FTS5.
+
+    В индекс попадают все статьи, которые бот получил от News API (ленты
+    категорий и результаты поиска). Текст заголовка и описания хранится
+    в виде основ слов (stemmer), поэтому запрос "выборах" находит
+    "выборы". Статьи нумеруются в порядке добавления, и поиск идет по
+    убыванию номера: FTS5 отдает первые limit совпадений без сортировки
+    всех найденных, поэтому даже частые слова ищутся за миллисекунды.
+    Если SQLite собран без FTS5, индекс отключается и поиск всегда идет
+    в API. Соединение используется из разных потоков по очереди (под
+    _lock): NewsAPI ищет в потоке asyncio.to_thread, чтобы запрос FTS5
+    не останавливал event loop.
+    """
+
+    def __init__(self, path: str, max_articles: int):
+        self.max_articles = max_articles
+        self.added = 0
+        self.searches = 0
+        self.hits = 0
+        self.enabled = True
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS news_articles ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " url_hash INTEGER NOT NULL UNIQUE,"
+            " indexed_at REAL NOT NULL,"
+            " title TEXT NOT NULL,"
+            " description TEXT NOT NULL,"
+            " url TEXT NOT NULL,"
+            " published_at TEXT NOT NULL,"
+            " source TEXT NOT NULL,"
+            " terms TEXT NOT NULL"
+            ")"
+        )
+        try:
+            # Внешнее содержимое: основы слов хранятся один раз, в news_articles;
+            # запросы - это наборы слов без фраз, поэтому позиции слов не нужны
+            self._conn.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS news_fts USING fts5("
+                " terms, content='news_articles', content_rowid='id',"
+                " tokenize='unicode61 remove_diacritics 0', detail=none, columnsize=0"
+                ")"
+            )
+        except sqlite3.OperationalError as e:
+            print(f"Полнотекстовый поиск недоступен (нет FTS5): {e}")
+            self.enabled = False
+        self._conn.commit()
+        self._first_id, self._last_id = self._conn.execute(
+            "SELECT COALESCE(MIN(id), 1), COALESCE(MAX(id), 0) FROM news_articles"
+        ).fetchone()
+
+    def __len__(self) -> int:
+        return self._last_id - self._first_id + 1
+
+    def add(self, articles: Iterable[Tuple[int, Article]]) -> int:
+        """Добавить статьи (хэш URL, статья); вернуть число новых"""
+        if not self.enabled:
+            return 0
+        now = time.time()
+        added = 0
+        with self._lock, self._conn:
+            for key, article in articles:
+                terms = " ".join(stem_words(f"{article.title} {article.description}"))
+                cursor = self._conn.execute(
+                    "INSERT OR IGNORE INTO news_articles"
+                    " (url_hash, indexed_at, title, description, url, published_at, source, terms)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (_signed(key), now, article.title, article.description, article.url,
+                     article.published_at, article.source, terms)
+                )
+                if cursor.rowcount:
+                    self._conn.execute(
+                        "INSERT INTO news_fts (rowid, terms) VALUES (?, ?)", (cursor.lastrowid, terms)
+                    )
+                    self._last_id = cursor.lastrowid
+                    added += 1
+            if added and len(self) > self.max_articles * 1.01:
+                self._trim()
+        self.added += added
+        return added
+
+    def _trim(self):
+        """Удалить самые старые статьи сверх max_articles (вызывается в транзакции)"""
+        first_id = self._last_id - self.max_articles + 1
+        self._conn.execute(
+            "INSERT INTO news_fts (news_fts, rowid, terms)"
+            " SELECT 'delete', id, terms FROM news_articles WHERE id < ?",
+            (first_id,)
+        )
+        self._conn.execute("DELETE FROM news_articles WHERE id < ?", (first_id,))
+        self._first_id = first_id
+
+    def search(self, query: str, limit: int) -> Tuple[List[Article], Optional[float]]:
+        """Последние добавленные статьи со всеми словами запроса и время
+        добавления самой свежей из них (None, если ничего не найдено)"""
+        match = match_query(query)
+        if not self.enabled or match is None:
+            return [], None
+        with self._lock:
+            self.searches += 1
+            rows = self._conn.execute(
+                "SELECT a.title, a.description, a.url, a.published_at, a.source, a.indexed_at"
+                " FROM news_fts JOIN news_articles a ON a.id = news_fts.rowid"
+                " WHERE news_fts MATCH ? ORDER BY news_fts.rowid DESC LIMIT ?",
+                (match, limit)
+            ).fetchall()
+            if rows:
+                self.hits += 1
+        if not rows:
+            return [], None
+        articles = [Article(title, description, url, published_at, source, None)
+                    for title, description, url, published_at, source, _ in rows]
+        return articles, rows[0][5]
+
+    def stats(self) -> Dict[str, int]:
+        """Статистика индекса"""
+        return {
+            'enabled': int(self.enabled),
+            'articles': max(len(self), 0),
+            'added': self.added,
+            'searches': self.searches,
+            'hits': self.hits
+        }
+
+    def close(self):
+        """Закрыть индекс"""
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,90 @@
+import asyncio
+import logging
+from typing import Dict, List, Optional, Tuple
+import config
+
+logger = logging.getLogger(__name__)
+
+class PrefetchScheduler:
+    """Фоновое обновление кэша для популярных запросов"""
+
+    def __init__(self, weather_api, currency_api, news_api):
+        self.weather_api = weather_api
+        self.currency_api = currency_api
+        self.news_api = news_api
+        self.city_popularity: Dict[Tuple[str, str, str], float] = {}
+        self.runs = 0
+        self.refreshed = 0
+        self.failed = 0
+
+    def record_city(self, city: str, language: Optional[str] = None, units: Optional[str] = None):
+        """Учесть запрос погоды для города с настройками пользователя"""
+        key = (
+            self.weather_api.city_key(city),
+            language or config.DEFAULT_LANGUAGE,
+            units or config.DEFAULT_UNITS
+        )
+        self.city_popularity[key] = self.city_popularity.get(key, 0.0) + 1.0
+
+        # Не даем счетчику расти бесконечно: оставляем только самые популярные города
+        if len(self.city_popularity) > config.PREFETCH_MAX_TRACKED_CITIES:
+            keep = self.top_cities(config.PREFETCH_MAX_TRACKED_CITIES // 2)
+            self.city_popularity = {key: self.city_popularity[key] for key in keep}
+
+    def top_cities(self, limit: int) -> List[Tuple[str, str, str]]:
+        """Самые популярные запросы (город, язык, единицы)"""
+        ranked = sorted(self.city_popularity.items(), key=lambda item: item[1], reverse=True)
+        return [key for key, _ in ranked[:limit]]
+
+    async def run(self, context=None):
+        """Обновить кэш для популярных городов, курсов валют и категорий новостей"""
+        self.runs += 1
+
+        # Когда суточная квота на исходе, не тратим ее на фоновые запросы
+        jobs = []
+        weather_cities = [] if self.weather_api.limiter.is_tight() else self.top_cities(config.PREFETCH_TOP_CITIES)
+        for city, language, units in weather_cities:
+            jobs.append(lambda city=city, language=language, units=units:
+                        self.weather_api.get_current_weather(city, language, units, refresh=True))
+            jobs.append(lambda city=city, language=language, units=units:
+                        self.weather_api.get_forecast(city, language, units, refresh=True))
+        jobs.append(lambda: self.currency_api.get_all_rates("RUB", refresh=True))
+        news_categories = [] if self.news_api.limiter.is_tight() else self.news_api.get_available_categories()
+        for category in news_categories:
+            jobs.append(lambda category=category: self.news_api.get_top_headlines(
+                country="ru", category=category, limit=5, refresh=True
+            ))
+
+        # Ограничиваем число запросов за один проход
+        jobs = jobs[:config.PREFETCH_MAX_REQUESTS]
+        semaphore = asyncio.Semaphore(config.PREFETCH_CONCURRENCY)
+
+        async def refresh(job):
+            async with semaphore:
+                try:
+                    result = await job()
+                except Exception as e:
+                    logger.warning(f"Ошибка фонового обновления: {e}")
+                    result = None
+            if result:
+                self.refreshed += 1
+            else:
+                self.failed += 1
+
+        await asyncio.gather(*(refresh(job) for job in jobs))
+
+        # Старые запросы постепенно теряют вес
+        self.city_popularity = {
+            key: score * config.PREFETCH_POPULARITY_DECAY
+            for key, score in self.city_popularity.items()
+            if score * config.PREFETCH_POPULARITY_DECAY >= 0.1
+        }
+
+    def stats(self) -> Dict[str, int]:
+        """Статистика фонового обновления"""
+        return {
+            'tracked_cities': len(self.city_popularity),
+            'runs': self.runs,
+            'refreshed': self.refreshed,
+            'failed': self.failed
+        }
@@ -0,0 +1,88 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+from telegram import CallbackQuery, Message
+from telegram.constants import ChatAction
+
+# Готовый ответ: текст и дополнительные аргументы reply_text/edit_text
+Reply = Tuple[str, Dict[str, Any]]
+
+
+class ProgressiveReplier:
+    """Ответ одним сообщением вместо заглушки "Получаю..." и второго сообщения.
+
+    Данные запрашиваются сразу. Если они готовы за placeholder_delay
+    секунд (попадание в кэш, быстрый API), пользователь получает только
+    итоговое сообщение. Иначе показывается индикатор прогресса: заглушка,
+    которая потом правится в итоговое сообщение, или действие "печатает"
+    (indicator='typing'). Считает вызовы Telegram API на одно действие
+    пользователя.
+    """
+
+    def __init__(self, placeholder_delay: float, indicator: str = 'placeholder'):
+        self.placeholder_delay = placeholder_delay
+        self.indicator = indicator
+        self.interactions = 0
+        self.telegram_calls = 0
+        self.instant = 0
+        self.progress_shown = 0
+
+    async def reply(self, message: Message, placeholder: str, produce: Awaitable[Reply]) -> None:
+        """Ответить на сообщение пользователя"""
+        async def show_progress() -> Optional[Message]:
+            if self.indicator == 'typing':
+                await message.chat.send_action(ChatAction.TYPING)
+                return None
+            return await message.reply_text(placeholder)
+
+        async def finish(progress: Optional[Message], text: str, kwargs: Dict[str, Any]) -> None:
+            if progress is None:
+                await message.reply_text(text, **kwargs)
+            else:
+                await progress.edit_text(text, **kwargs)
+
+        await self._deliver(produce, show_progress, finish)
+
+    async def edit(self, query: CallbackQuery, placeholder: str, produce: Awaitable[Reply]) -> None:
+        """Заменить сообщение с кнопками, на которое нажал пользователь"""
+        async def show_progress() -> None:
+            await query.edit_message_text(placeholder)
+
+        async def finish(progress: None, text: str, kwargs: Dict[str, Any]) -> None:
+            await query.edit_message_text(text, **kwargs)
+
+        await self._deliver(produce, show_progress, finish)
+
+    async def _deliver(self, produce: Awaitable[Reply],
+                       show_progress: Callable[[], Awaitable[Any]],
+                       finish: Callable[[Any, str, Dict[str, Any]], Awaitable[None]]) -> None:
+        """Дождаться ответа, при задержке показав прогресс, и отправить его"""
+        task = asyncio.ensure_future(produce)
+        calls = 0
+        try:
+            done, _ = await asyncio.wait({task}, timeout=self.placeholder_delay)
+            progress = None
+            if done:
+                self.instant += 1
+            else:
+                self.progress_shown += 1
+                calls += 1
+                progress = await show_progress()
+            text, kwargs = await task
+            calls += 1
+            await finish(progress, text, kwargs)
+        finally:
+            if not task.done():
+                task.cancel()
+            self.interactions += 1
+            self.telegram_calls += calls
+
+    def stats(self) -> Dict[str, float]:
+        """Вызовы Telegram API на одно действие пользователя (раньше всегда 2)"""
+        return {
+            'interactions': self.interactions,
+            'instant': self.instant,
+            'progress_shown': self.progress_shown,
+            'telegram_calls': self.telegram_calls,
+            'calls_per_interaction': round(self.telegram_calls / self.interactions, 2) if self.interactions else 0.0,
+            'saved_calls': self.interactions * 2 - self.telegram_calls
+        }
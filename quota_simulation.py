@@ -0,0 +1,204 @@
+"""Симуляция суток трафика через лимитер внешнего API.
+
+Прогоняет через UpstreamLimiter (TokenBucket + DailyQuota) с настройками
+из config сутки запросов с дневным профилем нагрузки и всплесками
+в 08:00 и 13:00 и первый час следующих суток.
+Время виртуальное: event loop не ждет, а сразу переводит часы к
+следующему таймеру, поэтому сутки считаются за секунды, а ожидание
+токенов и таймауты очереди работают как в боте.
+
+Печатает по часам: сколько запросов пришло, сколько пропущено к API и
+сколько отклонено минутным лимитом и суточной квотой. Итог показывает,
+что суточная квота не превышена и в полночь сбрасывается, а по
+всплескам - что к API уходит не больше запаса токенов сразу и дальше
+ровно rate запросов в секунду.
+
+Пример:
+    python quota_simulation.py --upstream weather --requests 50000
+"""
+import argparse
+import asyncio
+import bisect
+import random
+import selectors
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Tuple
+import config
+import rate_limiter
+from rate_limiter import UpstreamLimiter
+
+DAY = 24 * 3600
+# Доля суточного трафика по часам UTC: ночью мало, пики утром и вечером
+HOURLY_PROFILE = (1.0, 0.6, 0.4, 0.3, 0.3, 0.5, 1.2, 2.5, 3.5, 3.0, 2.5, 2.5,
+                  2.8, 2.6, 2.4, 2.4, 2.6, 3.0, 3.5, 3.8, 3.6, 3.0, 2.2, 1.5)
+UPSTREAMS = {
+    'weather': ("openweathermap", config.OPENWEATHER_RATE_PER_MINUTE, config.OPENWEATHER_DAILY_QUOTA),
+    'news': ("newsapi", config.NEWS_RATE_PER_MINUTE, config.NEWS_DAILY_QUOTA),
+}
+
+
+class VirtualClock:
+    """Виртуальные часы: секунды от полуночи UTC первого дня симуляции"""
+
+    def __init__(self, start: datetime):
+        self.start = start
+        self.now = 0.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def today(self):
+        return (self.start + timedelta(seconds=self.now)).date()
+
+
+class VirtualSelector(selectors.DefaultSelector):
+    """Вместо ожидания событий переводит часы к ближайшему таймеру loop"""
+
+    def __init__(self, clock: VirtualClock):
+        super().__init__()
+        self.clock = clock
+
+    def select(self, timeout=None):
+        if timeout is not None and timeout > 0:
+            self.clock.now += timeout
+            timeout = 0
+        return super().select(timeout)
+
+
+class VirtualLoop(asyncio.SelectorEventLoop):
+    """Event loop, в котором время идет по VirtualClock"""
+
+    def __init__(self, clock: VirtualClock):
+        super().__init__(VirtualSelector(clock))
+        self.clock = clock
+
+    def time(self) -> float:
+        return self.clock.now
+
+
+def make_arrivals(requests: int, hours: int, bursts: List[Tuple[float, int, float]],
+                  rng: random.Random) -> List[float]:
+    """Моменты прихода запросов: дневной профиль по часам плюс всплески"""
+    total_weight = sum(HOURLY_PROFILE)
+    arrivals = []
+    for hour in range(hours):
+        count = round(requests * HOURLY_PROFILE[hour % 24] / total_weight)
+        arrivals.extend(hour * 3600 + rng.random() * 3600 for _ in range(count))
+    for start, count, length in bursts:
+        arrivals.extend(start + rng.random() * length for _ in range(count))
+    arrivals.sort()
+    return arrivals
+
+
+def max_in_window(times: List[float], window: float) -> int:
+    """Наибольшее число событий в любом окне длиной window секунд"""
+    best = 0
+    left = 0
+    for right, moment in enumerate(times):
+        while moment - times[left] >= window:
+            left += 1
+        best = max(best, right - left + 1)
+    return best
+
+
+async def simulate(limiter: UpstreamLimiter, arrivals: List[float], clock: VirtualClock):
+    """Отправить каждый запрос в лимитер в момент его прихода"""
+    loop = asyncio.get_running_loop()
+    results: List[Tuple[float, float, str]] = []  # (пришел, решение, итог)
+    tasks = []
+
+    async def request(arrived: float):
+        denied_quota = limiter.denied_quota
+        allowed = await limiter.acquire()
+        if allowed:
+            outcome = 'allowed'
+        elif limiter.denied_quota > denied_quota:
+            outcome = 'quota'
+        else:
+            outcome = 'rate'
+        results.append((arrived, clock.now, outcome))
+
+    for arrived in arrivals:
+        loop.call_at(arrived, lambda arrived=arrived: tasks.append(loop.create_task(request(arrived))))
+    await asyncio.sleep(arrivals[-1] + limiter.max_wait + 1)
+    await asyncio.gather(*tasks)
+    results.sort()
+    return results
+
+
+def report(per_minute: int, per_day: int, results, bursts, clock: VirtualClock):
+    allowed_times = sorted(decided for _, decided, outcome in results if outcome == 'allowed')
+    by_hour: Dict[int, Counter] = {}
+    for arrived, decided, outcome in results:
+        by_hour.setdefault(int(arrived // 3600), Counter())[outcome] += 1
+
+    print(f"{'Час UTC':<9} {'запросов':>9} {'пропущено':>10} {'отказ/мин':>10} {'отказ/сутки':>12} "
+          f"{'макс. за минуту':>16}")
+    for hour in sorted(by_hour):
+        counts = by_hour[hour]
+        start = bisect.bisect_left(allowed_times, hour * 3600)
+        end = bisect.bisect_left(allowed_times, (hour + 1) * 3600)
+        label = f"{hour % 24:02d}" + (" +1д" if hour >= 24 else "")
+        print(f"{label:<9} {sum(counts.values()):>9} {counts['allowed']:>10} {counts['rate']:>10} "
+              f"{counts['quota']:>12} {max_in_window(allowed_times[start:end], 60):>16}")
+
+    print()
+    for day in range(int(allowed_times[-1] // DAY) + 1):
+        start = bisect.bisect_left(allowed_times, day * DAY)
+        end = bisect.bisect_left(allowed_times, (day + 1) * DAY)
+        arrived = sum(1 for moment, _, _ in results if day * DAY <= moment < (day + 1) * DAY)
+        date = (clock.start + timedelta(days=day)).date()
+        verdict = "квота соблюдена" if end - start <= per_day else "КВОТА ПРЕВЫШЕНА"
+        print(f"{date}: пришло {arrived}, пропущено к API {end - start} из {per_day} - {verdict}")
+    quota_hit = [decided for _, decided, outcome in results if outcome == 'quota']
+    if quota_hit:
+        moment = clock.start + timedelta(seconds=quota_hit[0])
+        print(f"Квота исчерпана в {moment:%H:%M:%S}, дальше запросы обслуживаются из кэша до полуночи")
+
+    print(f"\nМинутный лимит {per_minute}: запас {per_minute} токенов, затем {per_minute / 60:g} в секунду")
+    print(f"Больше всего пропущено за минуту: {max_in_window(allowed_times, 60)}, "
+          f"за секунду: {max_in_window(allowed_times, 1)}")
+    for start, _, length in bursts:
+        inside = [(decided, outcome) for arrived, decided, outcome in results if start <= arrived < start + length]
+        passed = sorted(decided for decided, outcome in inside if outcome == 'allowed')
+        first_second = sum(1 for decided in passed if decided < start + 1)
+        paced = max_in_window([decided for decided in passed if decided >= start + 1], 1) if passed else 0
+        label = (clock.start + timedelta(seconds=start)).strftime('%H:%M')
+        print(f"Всплеск {label}: {len(inside)} запросов за {length:g} с, пропущено {len(passed)} "
+              f"(в первую секунду {first_second}, дальше не больше {paced} в секунду), "
+              f"отклонено {len(inside) - len(passed)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Симуляция суток трафика через лимитер внешнего API")
+    parser.add_argument('--upstream', choices=sorted(UPSTREAMS), default='weather', help="какой API симулировать")
+    parser.add_argument('--requests', type=int, default=50000, help="запросов к API за сутки без учета всплесков")
+    parser.add_argument('--burst', type=int, default=500, help="запросов в каждом всплеске")
+    parser.add_argument('--burst-seconds', type=float, default=5.0, help="длительность всплеска, секунд")
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    clock = VirtualClock(datetime(2024, 1, 1, tzinfo=timezone.utc))
+    # Лимитер берет время и дату из виртуальных часов
+    rate_limiter.time = clock
+    rate_limiter.DailyQuota._today = staticmethod(clock.today)
+
+    name, per_minute, per_day = UPSTREAMS[args.upstream]
+    bursts = [(hour * 3600, args.burst, args.burst_seconds) for hour in (8, 13)]
+    arrivals = make_arrivals(args.requests, 25, bursts, random.Random(args.seed))
+
+    loop = VirtualLoop(clock)
+    try:
+        limiter = UpstreamLimiter(name, per_minute=per_minute, per_day=per_day,
+                                  max_wait=config.UPSTREAM_MAX_WAIT, tight_ratio=config.QUOTA_TIGHT_RATIO)
+        print(f"Лимитер {name}: {per_minute} в минуту, {per_day} в сутки, "
+              f"ожидание токена до {config.UPSTREAM_MAX_WAIT:g} с; запросов {len(arrivals)} за 25 ч")
+        results = loop.run_until_complete(simulate(limiter, arrivals, clock))
+    finally:
+        loop.close()
+    report(per_minute, per_day, results, bursts, clock)
+
+
+if __name__ == "__main__":
+    main()
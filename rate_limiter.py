@@ -0,0 +1,165 @@
+import asyncio
+import time
+from datetime import datetime, timezone
+from typing import Dict
+
+class TokenBucket:
+    """Асинхронный token bucket: rate токенов в секунду, не больше capacity"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def try_acquire(self, tokens: float = 1) -> bool:
+        """Взять токены без ожидания"""
+        self._refill()
+        if self.tokens >= tokens:
+            self.tokens -= tokens
+            return True
+        return False
+
+    def time_until_available(self, tokens: float = 1) -> float:
+        """Через сколько секунд будут доступны токены"""
+        self._refill()
+        if self.tokens >= tokens:
+            return 0.0
+        return (tokens - self.tokens) / self.rate
+
+    async def acquire(self, max_wait: float, tokens: float = 1) -> bool:
+        """Взять токены, подождав не дольше max_wait секунд.
+
+        Ожидающие обслуживаются строго по очереди (asyncio.Lock - FIFO),
+        время в очереди тоже входит в max_wait.
+        """
+        deadline = time.monotonic() + max_wait
+        try:
+            await asyncio.wait_for(self._lock.acquire(), timeout=max_wait)
+        except asyncio.TimeoutError:
+            return False
+        try:
+            wait = self.time_until_available(tokens)
+            if wait > deadline - time.monotonic():
+                return False
+            if wait > 0:
+                await asyncio.sleep(wait)
+                self._refill()
+            self.tokens -= tokens
+            return True
+        finally:
+            self._lock.release()
+
+    def release(self, tokens: float = 1):
+        """Вернуть взятые, но не потраченные токены"""
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens + tokens)
+
+    def drain(self):
+        """Обнулить токены (например, после ответа 429)"""
+        self._refill()
+        self.tokens = 0.0
+
+    def penalize(self, seconds: float):
+        """Не выдавать токены ближайшие seconds секунд (Retry-After из ответа 429)"""
+        self._refill()
+        self.tokens = min(self.tokens, -seconds * self.rate)
+
+
+class DailyQuota:
+    """Суточная квота запросов (сбрасывается в полночь UTC)"""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.used = 0
+        self.day = self._today()
+
+    @staticmethod
+    def _today():
+        return datetime.now(timezone.utc).date()
+
+    def _roll(self):
+        today = self._today()
+        if today != self.day:
+            self.day = today
+            self.used = 0
+
+    def remaining(self) -> int:
+        """Сколько запросов осталось на сегодня"""
+        self._roll()
+        return max(self.limit - self.used, 0)
+
+    def usage(self) -> float:
+        """Доля израсходованной квоты"""
+        self._roll()
+        return self.used / self.limit if self.limit else 1.0
+
+    def try_consume(self) -> bool:
+        """Израсходовать один запрос из квоты"""
+        self._roll()
+        if self.used >= self.limit:
+            return False
+        self.used += 1
+        return True
+
+
+class UpstreamLimiter:
+    """Ограничение запросов к одному внешнему API: в минуту и в сутки"""
+
+    def __init__(self, name: str, per_minute: int, per_day: int, max_wait: float = 0,
+                 tight_ratio: float = 0.9):
+        self.name = name
+        self.bucket = TokenBucket(rate=per_minute / 60, capacity=per_minute)
+        self.quota = DailyQuota(per_day)
+        self.max_wait = max_wait
+        self.tight_ratio = tight_ratio
+        self.allowed = 0
+        self.denied_rate = 0
+        self.denied_quota = 0
+        self.throttled = 0
+
+    async def acquire(self) -> bool:
+        """Разрешить запрос к API (False - лимит исчерпан, нужно обойтись кэшем)"""
+        if not self.quota.remaining():
+            self.denied_quota += 1
+            return False
+        if not await self.bucket.acquire(self.max_wait):
+            self.denied_rate += 1
+            return False
+        if not self.quota.try_consume():
+            self.denied_quota += 1
+            return False
+        self.allowed += 1
+        return True
+
+    def refund(self):
+        """Вернуть разрешение, по которому запрос так и не был отправлен"""
+        self.bucket.release()
+        self.quota.used = max(self.quota.used - 1, 0)
+        self.allowed -= 1
+
+    def is_tight(self) -> bool:
+        """Квота почти израсходована - стоит обходиться кэшем"""
+        return self.quota.usage() >= self.tight_ratio
+
+    def report_throttled(self):
+        """API ответил 429: не отправляем запросы, пока не накопятся токены"""
+        self.throttled += 1
+        self.bucket.drain()
+
+    def stats(self) -> Dict[str, float]:
+        """Счетчики лимитера"""
+        return {
+            'allowed': self.allowed,
+            'denied_rate': self.denied_rate,
+            'denied_quota': self.denied_quota,
+            'throttled': self.throttled,
+            'quota_used': self.quota.used,
+            'quota_remaining': self.quota.remaining()
+        }
@@ -0,0 +1,47 @@
+import time
+from array import array
+from typing import Dict, Optional
+
+class RateTable:
+    """Матрица кросс-курсов, построенная из одного ответа get_all_rates.
+
+    Курсы хранятся в плоском массиве double размером n*n, поэтому
+    конвертация любой пары валют - это поиск по индексу без сетевых запросов.
+    """
+
+    def __init__(self, base: str, date: str, rates: Dict[str, float], updated_at: Optional[float] = None):
+        self.base = base
+        self.date = date
+        self.updated_at = time.monotonic() if updated_at is None else updated_at
+
+        # Курс базовой валюты к самой себе в ответе может отсутствовать
+        rates = dict(rates)
+        rates.setdefault(base, 1.0)
+
+        self.currencies = sorted(code for code, rate in rates.items() if rate)
+        self.index = {code: i for i, code in enumerate(self.currencies)}
+
+        # rates[X] - сколько единиц X дают за 1 base, поэтому A->B = rates[B] / rates[A]
+        per_base = [float(rates[code]) for code in self.currencies]
+        self.matrix = array('d', (to_rate / from_rate for from_rate in per_base for to_rate in per_base))
+
+    @property
+    def size(self) -> int:
+        """Количество валют в таблице"""
+        return len(self.currencies)
+
+    def age(self) -> float:
+        """Возраст таблицы в секундах"""
+        return time.monotonic() - self.updated_at
+
+    def is_stale(self, max_age: float) -> bool:
+        """Устарела ли таблица"""
+        return self.age() > max_age
+
+    def rate(self, from_currency: str, to_currency: str) -> Optional[float]:
+        """Курс from_currency -> to_currency (None, если валюты нет в таблице)"""
+        i = self.index.get(from_currency.upper())
+        j = self.index.get(to_currency.upper())
+        if i is None or j is None:
+            return None
+        return self.matrix[i * len(self.currencies) + j]
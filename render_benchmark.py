@@ -0,0 +1,75 @@
+"""Бенчмарк форматирования сообщений: прежняя сборка строк против rendering.py.
+
+Сравнивает сборку сообщения через += (как было в обработчиках),
+шаблоны без кэша и шаблоны с lru_cache, когда один и тот же ответ из
+кэша API показывают многим пользователям.
+
+Пример:
+    python render_benchmark.py --cities 50 --renders 200000
+"""
+import argparse
+import random
+import time
+from typing import Callable, List
+import rendering
+from models import CurrentWeather
+from weather_api import WEATHER_EMOJI
+
+DESCRIPTIONS = ["Ясно", "Облачно с прояснениями", "Пасмурно", "Небольшой дождь", "Снег", "Туман"]
+
+
+def make_weather(city_id: int) -> CurrentWeather:
+    """Синтетическая текущая погода"""
+    return CurrentWeather(
+        city_id=city_id, city=f"Город {city_id}", country="RU",
+        description=random.choice(DESCRIPTIONS), temperature=random.randint(-30, 35),
+        feels_like=random.randint(-35, 35), humidity=random.randint(10, 100),
+        pressure=random.randint(980, 1040), wind_speed=round(random.uniform(0, 20), 1),
+        icon=random.choice(list(WEATHER_EMOJI)), stale_age=None
+    )
+
+
+def legacy_render(weather: CurrentWeather, units: str) -> str:
+    """Прежнее форматирование погоды в обработчике"""
+    temp_unit = "°C" if units == "metric" else "°F"
+    wind_unit = "м/с" if units == "metric" else "миль/ч"
+    emoji = WEATHER_EMOJI.get(weather.icon, '🌤️')
+    message = f"{emoji} **Погода в {weather.city}, {weather.country}**\n\n"
+    message += f"🌡️ Температура: {weather.temperature}{temp_unit}\n"
+    message += f"🌡️ Ощущается как: {weather.feels_like}{temp_unit}\n"
+    message += f"☁️ Описание: {weather.description}\n"
+    message += f"💧 Влажность: {weather.humidity}%\n"
+    message += f"🌪️ Ветер: {weather.wind_speed} {wind_unit}\n"
+    message += f"📊 Давление: {weather.pressure} гПа"
+    return message
+
+
+def measure(name: str, requests: List[CurrentWeather], render: Callable[[CurrentWeather, str], str]):
+    """Отрисовать все запросы и вывести число сообщений в секунду"""
+    started = time.perf_counter()
+    for weather in requests:
+        render(weather, "metric")
+    elapsed = time.perf_counter() - started
+    print(f"{name:<24} {len(requests) / elapsed:12,.0f} сообщений/с")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк форматирования сообщений")
+    parser.add_argument('--cities', type=int, default=50, help="число разных ответов в кэше API")
+    parser.add_argument('--renders', type=int, default=200000, help="число показов сообщений")
+    args = parser.parse_args()
+
+    cities = [make_weather(city_id) for city_id in range(args.cities)]
+    requests = [random.choice(cities) for _ in range(args.renders)]
+    assert legacy_render(cities[0], "metric") == rendering.render_weather(cities[0], "metric")
+
+    print(f"Ответов в кэше: {args.cities}, показов: {args.renders}")
+    measure("+= (прежний способ)", requests, legacy_render)
+    measure("шаблон без кэша", requests, rendering.render_weather.__wrapped__)
+    rendering.render_weather.cache_clear()
+    measure("шаблон с lru_cache", requests, rendering.render_weather)
+    print(f"Кэш сообщений: {rendering.render_cache_stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,316 @@
+"""Тексты и клавиатуры расширенного бота.
+
+Клавиатуры не меняются, поэтому создаются один раз при импорте. Ответы
+API - неизменяемые модели, поэтому готовый текст кэшируется по самой
+модели и единицам измерения: пока в кэше API тот же ответ, повторный
+показ не форматирует сообщение заново. Язык отдельно не учитывается:
+ответы на разных языках - это разные модели.
+"""
+from functools import lru_cache
+from typing import Any, Dict, Sequence, Tuple
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+from cache import get_stale_age
+from models import Article, Conversion, CurrentWeather, Forecast, Rates
+from weather_api import WEATHER_EMOJI
+import config
+
+# Единицы температуры и скорости ветра
+UNIT_LABELS = {
+    'metric': ("°C", "м/с"),
+    'imperial': ("°F", "миль/ч")
+}
+
+# === ТЕКСТЫ ===
+WELCOME_TEXT = """
+🤖 **Добро пожаловать в Advanced Weather Bot!**
+
+Этот бот поможет вам:
+• 🌤️ Узнать погоду в любом городе
+• 📰 Читать последние новости
+• 💱 Следить за курсами валют
+• ⚙️ Настраивать параметры
+
+Выберите нужную функцию:
+""".strip()
+
+HELP_TEXT = """
+📚 **Справка по использованию бота:**
+
+**🌤️ Погода:**
+• `/weather <город>` - текущая погода
+• `/weather <город>, <город>, ...` - погода в нескольких городах
+• 📍 Геопозиция - погода в месте, где вы находитесь
+• `/forecast <город>` - прогноз на 5 дней
+
+**📰 Новости:**
+• `/news` - топ новости России
+• `/news <категория>` - новости по категории
+• `/search <запрос>` - поиск новостей
+
+**💱 Валюты:**
+• `/currency` - курсы валют
+• `/convert <сумма> <из> <в>` - конвертер
+
+**🔔 Подписки:**
+• `/subscribe weather <город>` - утренняя погода
+• `/subscribe currency <из> <в>` - утренний курс
+• `/subscribe news <категория>` - утренние новости
+• `/subscriptions` - мои подписки, `/unsubscribe` - отписаться
+
+**🔔 Уведомления:**
+• `/alert USD/RUB > 100` - курс пересек порог
+• `/alert wind <город> > 15` - ветер сильнее 15 м/с
+• `/alert temp <город> < -20` - температура ниже -20°C
+• `/alerts` - мои уведомления, `/unalert <номер>` - удалить
+
+**⚙️ Настройки:**
+• `/settings` - настройки бота
+
+💡 **Совет:** Просто напишите название города для получения погоды!
+""".strip()
+
+MAIN_MENU_TEXT = "🤖 **Главное меню**\n\nВыберите нужную функцию:"
+WEATHER_MENU_TEXT = "🌤️ **Меню погоды**\n\nВыберите, что хотите узнать:"
+NEWS_MENU_TEXT = "📰 **Меню новостей**\n\nВыберите категорию новостей:"
+CURRENCY_MENU_TEXT = "💱 **Меню валют**\n\nВыберите функцию:"
+SETTINGS_MENU_TEXT = "⚙️ **Настройки бота**\n\nВыберите язык и единицы измерения:"
+CONVERTER_HELP_TEXT = """
+🔄 **Конвертер валют**
+
+Используйте команду:
+`/convert <сумма> <из> <в>`
+
+Примеры:
+• `/convert 100 USD RUB`
+• `/convert 50 EUR USD`
+• `/convert 1000 RUB EUR`
+
+🔙 Нажмите кнопку для возврата:
+""".strip()
+
+# === ШАБЛОНЫ ===
+WEATHER_TEMPLATE = """
+{emoji} **Погода в {w.city}, {w.country}**
+
+🌡️ Температура: {w.temperature}{temp_unit}
+🌡️ Ощущается как: {w.feels_like}{temp_unit}
+☁️ Описание: {w.description}
+💧 Влажность: {w.humidity}%
+🌪️ Ветер: {w.wind_speed} {wind_unit}
+📊 Давление: {w.pressure} гПа
+""".strip()
+
+WEATHER_LINE_TEMPLATE = (
+    "{emoji} **{w.city}, {w.country}**: {w.temperature}{temp_unit}, {w.description}, "
+    "🌪️ {w.wind_speed} {wind_unit}{stale}"
+)
+
+FORECAST_HEADER_TEMPLATE = "📅 **Прогноз погоды в {f.city}, {f.country}**"
+
+FORECAST_DAY_TEMPLATE = (
+    "{emoji} **{d.date}**\n"
+    "🌡️ {d.temperature}{temp_unit} ({d.temp_min}…{d.temp_max}) | 💧 {d.humidity}%\n"
+    "{precipitation}"
+    "☁️ {d.description}"
+)
+
+NEWS_ITEM_TEMPLATE = "**{index}. {a.title}**\n📝 {a.description}\n📰 Источник: {a.source}\n{link}"
+
+RATES_HEADER_TEMPLATE = "💱 **Курсы валют относительно {r.base}**\n📅 Дата: {r.date}\n"
+
+CONVERSION_TEMPLATE = """
+🔄 **Конвертация валют**
+
+💰 **{c.amount} {from_symbol}{c.from_currency}** = **{c.converted_amount} {to_symbol}{c.to_currency}**
+
+📊 Курс: 1 {c.from_currency} = {c.rate:.4f} {c.to_currency}
+📅 Дата: {c.date}
+""".strip()
+
+
+DIGEST_HEADER = "☀️ **Утренняя сводка**"
+
+ALERT_TEMPLATE = "🔔 {subject}: {direction} {threshold}{unit}\nСейчас: {value}{unit}"
+ALERT_DIRECTIONS = {'>': "выше", '<': "ниже"}
+ALERT_UNITS = {'rate': "", 'temp': "°C", 'wind': " м/с"}
+ALERT_METRIC_LABELS = {'temp': "🌡️ Температура,", 'wind': "🌪️ Ветер,"}
+
+# === КЛАВИАТУРЫ ===
+def _keyboard(*rows: Sequence[Tuple[str, str]]) -> InlineKeyboardMarkup:
+    """Клавиатура из строк кнопок (текст, callback_data)"""
+    return InlineKeyboardMarkup([
+        [InlineKeyboardButton(text, callback_data=data) for text, data in row]
+        for row in rows
+    ])
+
+
+MAIN_MENU_KEYBOARD = _keyboard(
+    [("🌤️ Погода", "weather_menu")],
+    [("📰 Новости", "news_menu")],
+    [("💱 Курсы валют", "currency_menu")],
+    [("⚙️ Настройки", "settings")],
+    [("❓ Помощь", "help")]
+)
+WEATHER_MENU_KEYBOARD = _keyboard(
+    [("🌤️ Погода сейчас", "weather_current")],
+    [("📅 Прогноз на 5 дней", "weather_forecast")],
+    [("🔙 Назад", "back_to_main")]
+)
+CURRENCY_MENU_KEYBOARD = _keyboard(
+    [("💱 Курсы валют", "currency_rates")],
+    [("🔄 Конвертер", "currency_converter")],
+    [("🔙 Назад", "back_to_main")]
+)
+SETTINGS_MENU_KEYBOARD = _keyboard(
+    [("🇷🇺 Русский", "settings_lang_ru")],
+    [("🇺🇸 English", "settings_lang_en")],
+    [("🌡️ Цельсий", "settings_units_metric")],
+    [("🌡️ Фаренгейт", "settings_units_imperial")],
+    [("🔙 Назад", "back_to_main")]
+)
+BACK_TO_MAIN_KEYBOARD = _keyboard([("🔙 Назад", "back_to_main")])
+BACK_TO_NEWS_CATEGORIES_KEYBOARD = _keyboard([("🔙 Назад к категориям", "news_menu")])
+BACK_TO_NEWS_KEYBOARD = _keyboard([("🔙 Назад", "news_menu")])
+BACK_TO_CURRENCY_KEYBOARD = _keyboard([("🔙 Назад", "currency_menu")])
+
+
+@lru_cache(maxsize=None)
+def news_menu_keyboard(categories: Tuple[str, ...]) -> InlineKeyboardMarkup:
+    """Клавиатура категорий новостей (по 2 в ряд)"""
+    rows = [
+        [(category.title(), f"news_category_{category}") for category in categories[i:i + 2]]
+        for i in range(0, len(categories), 2)
+    ]
+    return _keyboard(*rows, [("🔙 Назад", "back_to_main")])
+
+
+@lru_cache(maxsize=config.RENDER_CACHE_SIZE)
+def forecast_button(cell: str) -> InlineKeyboardMarkup:
+    """Кнопка прогноза под погодой по геопозиции"""
+    return _keyboard([("📅 Прогноз на 5 дней", f"weather_geo_forecast_{cell}")])
+
+
+def city_choice_keyboard(cities: Sequence[Tuple[int, str]], action: str) -> InlineKeyboardMarkup:
+    """Выбор города из справочника или поиск названия как написано (action: current, forecast)"""
+    rows = [[(f"📍 {name}", f"weather_city_{action}_{city_id}")] for city_id, name in cities]
+    return _keyboard(*rows, [("🔎 Искать как написано", f"weather_asis_{action}")])
+
+
+# === СООБЩЕНИЯ ===
+def weather_emoji(icon: str) -> str:
+    """Эмодзи для погоды по коду иконки"""
+    return WEATHER_EMOJI.get(icon, '🌤️')
+
+
+def stale_note(data: Any) -> str:
+    """Пометка для устаревших данных, отданных из кэша"""
+    age = get_stale_age(data)
+    if age is None:
+        return ""
+    minutes = max(age // 60, 1)
+    return f"\n\n⏳ Данные получены {minutes} мин назад и сейчас обновляются"
+
+
+@lru_cache(maxsize=config.RENDER_CACHE_SIZE)
+def render_weather(weather: CurrentWeather, units: str) -> str:
+    """Сообщение с текущей погодой"""
+    temp_unit, wind_unit = UNIT_LABELS.get(units, UNIT_LABELS['metric'])
+    return WEATHER_TEMPLATE.format(
+        w=weather, emoji=weather_emoji(weather.icon), temp_unit=temp_unit, wind_unit=wind_unit
+    ) + stale_note(weather)
+
+
+@lru_cache(maxsize=config.RENDER_CACHE_SIZE)
+def render_weather_line(weather: CurrentWeather, units: str) -> str:
+    """Строка с погодой для ответа по нескольким городам"""
+    temp_unit, wind_unit = UNIT_LABELS.get(units, UNIT_LABELS['metric'])
+    return WEATHER_LINE_TEMPLATE.format(
+        w=weather, emoji=weather_emoji(weather.icon), temp_unit=temp_unit, wind_unit=wind_unit,
+        stale=" ⏳" if weather.stale_age is not None else ""
+    )
+
+
+@lru_cache(maxsize=config.RENDER_CACHE_SIZE)
+def render_forecast(forecast: Forecast, units: str) -> str:
+    """Сообщение с прогнозом погоды"""
+    temp_unit, _ = UNIT_LABELS.get(units, UNIT_LABELS['metric'])
+    days = [
+        FORECAST_DAY_TEMPLATE.format(
+            d=day, emoji=weather_emoji(day.icon), temp_unit=temp_unit,
+            precipitation=f"☔ Осадки: {day.precipitation} мм\n" if day.precipitation else ""
+        )
+        for day in forecast.forecasts
+    ]
+    return "\n\n".join([FORECAST_HEADER_TEMPLATE.format(f=forecast), *days]) + stale_note(forecast)
+
+
+@lru_cache(maxsize=config.RENDER_CACHE_SIZE)
+def render_news(title: str, articles: Tuple[Article, ...]) -> str:
+    """Сообщение со списком новостей под заголовком title"""
+    items = [
+        NEWS_ITEM_TEMPLATE.format(
+            index=index, a=article,
+            link=f"🔗 [Читать далее]({article.url})\n" if article.url else ""
+        )
+        for index, article in enumerate(articles, 1)
+    ]
+    return "\n".join([f"{title}\n", *items]).strip() + stale_note(list(articles))
+
+
+@lru_cache(maxsize=config.RENDER_CACHE_SIZE)
+def render_rates(rates: Rates, currencies: Tuple[Tuple[str, str], ...]) -> str:
+    """Сообщение с курсами валют; currencies - пары (код, символ) в нужном порядке"""
+    lines = [RATES_HEADER_TEMPLATE.format(r=rates)]
+    lines.extend(
+        f"{symbol} **{currency}**: {rates.rates[currency]:.4f}"
+        for currency, symbol in currencies
+        if currency != rates.base and currency in rates.rates
+    )
+    return "\n".join(lines).strip() + stale_note(rates)
+
+
+@lru_cache(maxsize=config.RENDER_CACHE_SIZE)
+def render_conversion(conversion: Conversion, from_symbol: str, to_symbol: str) -> str:
+    """Сообщение с результатом конвертации"""
+    return CONVERSION_TEMPLATE.format(
+        c=conversion, from_symbol=from_symbol, to_symbol=to_symbol
+    ) + stale_note(conversion)
+
+
+def render_digest(body: str) -> str:
+    """Сообщение ежедневной сводки по подписке"""
+    return f"{DIGEST_HEADER}\n\n{body}"
+
+
+def render_alert(rule: Any, value: float, subject_name: str) -> str:
+    """Уведомление о сработавшем правиле (alerts.AlertRule)"""
+    return ALERT_TEMPLATE.format(
+        subject=describe_alert_subject(rule.metric, subject_name),
+        direction=ALERT_DIRECTIONS[rule.direction],
+        threshold=f"{rule.threshold:g}", value=f"{value:g}", unit=ALERT_UNITS[rule.metric]
+    )
+
+
+def describe_alert(rule: Any, subject_name: str) -> str:
+    """Правило уведомления для списка /alerts"""
+    return (f"#{rule.id} {describe_alert_subject(rule.metric, subject_name)} "
+            f"{rule.direction} {rule.threshold:g}{ALERT_UNITS[rule.metric]}")
+
+
+def describe_alert_subject(metric: str, subject_name: str) -> str:
+    """Что отслеживает правило: курс пары или погода в городе (AlertEngine.subject_name)"""
+    if metric == 'rate':
+        return f"💱 {subject_name}"
+    return f"{ALERT_METRIC_LABELS[metric]} {subject_name}"
+
+
+def render_cache_stats() -> Dict[str, int]:
+    """Попадания в кэш готовых сообщений"""
+    stats = {'hits': 0, 'misses': 0, 'size': 0}
+    for render in (render_weather, render_weather_line, render_forecast, render_news,
+                   render_rates, render_conversion):
+        info = render.cache_info()
+        stats['hits'] += info.hits
+        stats['misses'] += info.misses
+        stats['size'] += info.currsize
+    return stats
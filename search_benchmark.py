@@ -0,0 +1,117 @@
+"""Бенчмарк локального поиска по статьям на синтетических новостях.
+
+Заполняет временный NewsIndex статьями (по умолчанию 1 млн) из
+синтетического словаря с распределением Ципфа и измеряет время ответа
+на запросы разной частоты: частое слово, слово в другой форме, редкое
+слово, два слова и запрос без совпадений.
+
+Пример:
+    python search_benchmark.py --articles 1000000
+"""
+import argparse
+import itertools
+import os
+import random
+import statistics
+import tempfile
+import time
+from models import Article
+from news_index import NewsIndex
+
+# Частые слова новостей в разных формах
+COMMON_WORDS = (
+    "россия россии россию президент президента президентом правительство правительства рынок рынка "
+    "рынке нефть нефти курс курса рубль рубля рублей доллар доллара выборы выборах выборов москва "
+    "москве москвы компания компании компаний банк банка банки ставка ставки ставку погода погоды "
+    "технологии технологий искусственный интеллект интеллекта спорт матч матча чемпионат чемпионата "
+    "сборная сборной экономика экономики закон закона законопроект суд суда министр министра "
+    "заявил заявила сообщил сообщила стало стали новый новая новые новых года году время"
+).split()
+SYLLABLES = ["ка", "ро", "ми", "на", "ле", "то", "ва", "се", "ди", "по", "лу", "ре", "жа", "ны", "го", "бе"]
+ENDINGS = ["", "а", "ы", "е", "ов", "ами", "ах", "ой", "ий", "ого"]
+
+
+def make_vocabulary(size: int, rng: random.Random):
+    """Слова словаря и накопленные веса 1/ранг для random.choices"""
+    words = list(COMMON_WORDS)
+    seen = set(words)
+    while len(words) < size:
+        word = "".join(rng.choices(SYLLABLES, k=rng.randint(2, 4))) + rng.choice(ENDINGS)
+        if word not in seen:
+            seen.add(word)
+            words.append(word)
+    cum_weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(words))))
+    return words, cum_weights
+
+
+def make_articles(count: int, words, cum_weights, rng: random.Random):
+    """Синтетические статьи: заголовок 8 слов, описание 25 слов"""
+    for number in range(count):
+        text = rng.choices(words, cum_weights=cum_weights, k=33)
+        yield number, Article(
+            title=" ".join(text[:8]).capitalize(),
+            description=" ".join(text[8:]),
+            url=f"https://example.com/news/{number}",
+            published_at="2024-01-01T00:00:00Z",
+            source="Источник",
+            stale_age=None
+        )
+
+
+def measure(index: NewsIndex, query: str, repeats: int, limit: int):
+    """Время ответа на запрос в миллисекундах: медиана и максимум"""
+    timings = []
+    found = 0
+    for _ in range(repeats):
+        started = time.perf_counter()
+        articles, _ = index.search(query, limit)
+        timings.append((time.perf_counter() - started) * 1000)
+        found = len(articles)
+    return statistics.median(timings), max(timings), found
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк локального поиска по статьям")
+    parser.add_argument('--articles', type=int, default=1000000, help="число статей в индексе")
+    parser.add_argument('--vocabulary', type=int, default=50000, help="размер словаря")
+    parser.add_argument('--batch', type=int, default=1000, help="статей в одной транзакции")
+    parser.add_argument('--repeats', type=int, default=50, help="повторов каждого запроса")
+    parser.add_argument('--limit', type=int, default=5, help="результатов на запрос")
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    words, cum_weights = make_vocabulary(args.vocabulary, rng)
+    rare_word = words[len(words) // 2]
+    queries = {
+        "частое слово": "россия",
+        "другая форма": "президентом",
+        "редкое слово": rare_word,
+        "два слова": "курс рубля",
+        "три слова": f"выборы москве {words[len(words) // 10]}",
+        "нет совпадений": "несуществующее",
+    }
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'news.db')
+        index = NewsIndex(path, max_articles=args.articles)
+        articles = make_articles(args.articles, words, cum_weights, rng)
+        started = time.perf_counter()
+        while True:
+            batch = list(itertools.islice(articles, args.batch))
+            if not batch:
+                break
+            index.add(batch)
+        elapsed = time.perf_counter() - started
+        size = sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory))
+        print(f"Статей: {len(index)}, индексация: {elapsed:.1f} с "
+              f"({len(index) / elapsed:,.0f} в секунду), база: {size / 2 ** 20:.0f} МБ")
+
+        print(f"{'Запрос':<16} {'найдено':>8} {'медиана, мс':>12} {'максимум, мс':>13}")
+        for name, query in queries.items():
+            median, longest, found = measure(index, query, args.repeats, args.limit)
+            print(f"{name:<16} {found:>8} {median:>12.2f} {longest:>13.2f}")
+        index.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,243 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from collections import deque
+from typing import Any, Callable, Coroutine, Deque, Dict, List, Optional, Set, Tuple
+from telegram.error import RetryAfter
+from telegram.ext import BaseRateLimiter
+from rate_limiter import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+# Приоритеты исходящих запросов (rate_limit_args методов бота): меньше - раньше
+PRIORITY_INTERACTIVE = 0  # ответы на действия пользователя (по умолчанию)
+PRIORITY_ALERT = 1  # уведомления о пересечении порогов
+PRIORITY_BULK = 2  # рассылки сводок
+PRIORITY_NAMES = {PRIORITY_INTERACTIVE: 'interactive', PRIORITY_ALERT: 'alert', PRIORITY_BULK: 'bulk'}
+
+
+class _Request:
+    """Запрос к Bot API, ожидающий отправки"""
+    __slots__ = ('priority', 'seq', 'chat_id', 'callback', 'args', 'kwargs', 'future', 'queued_at', 'retries')
+
+    def __init__(self, priority: int, seq: int, chat_id: Any, callback: Callable, args: Any,
+                 kwargs: Dict[str, Any]):
+        self.priority = priority
+        self.seq = seq
+        self.chat_id = chat_id
+        self.callback = callback
+        self.args = args
+        self.kwargs = kwargs
+        self.future = asyncio.get_running_loop().create_future()
+        self.queued_at = time.monotonic()
+        self.retries = 0
+
+
+class OutboundDispatcher(BaseRateLimiter[int]):
+    """Очередь исходящих запросов бота с лимитами Telegram.
+
+    Подключается к Application как rate_limiter, поэтому через нее идут
+    все вызовы reply_text/edit_message_text/send_message. Запросы с
+    chat_id ждут токена в общем bucket (около 30 сообщений в секунду) и
+    в bucket своего чата (около 1 в секунду, в группах 20 в минуту).
+    Из готовых к отправке чатов первым обслуживается запрос с меньшим
+    приоритетом, внутри чата порядок запросов сохраняется. После
+    RetryAfter чат ставится на паузу и запрос повторяется.
+    """
+
+    def __init__(self, global_rate: float, chat_rate: float, chat_burst: int,
+                 group_rate_per_minute: float, max_retries: int, max_chat_buckets: int):
+        self.global_bucket = TokenBucket(rate=global_rate, capacity=global_rate)
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.group_rate = group_rate_per_minute / 60
+        self.max_retries = max_retries
+        self.max_chat_buckets = max_chat_buckets
+        self._chat_buckets: Dict[Any, TokenBucket] = {}
+        self._queues: Dict[Any, Deque[_Request]] = {}
+        self._ready: List[Tuple[int, int, Any]] = []  # (приоритет, номер, чат) - можно отправлять
+        self._delayed: List[Tuple[float, int, Any]] = []  # (когда, номер, чат) - чат ждет токена
+        self._in_flight: Set[Any] = set()
+        self._sending: Set[asyncio.Task] = set()
+        self._seq = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self.sent = 0
+        self.retried = 0
+        self.failed = 0
+        self.direct = 0
+        self._waits: Dict[int, List[float]] = {}  # приоритет -> [число, сумма, максимум]
+
+    async def initialize(self) -> None:
+        self._task = asyncio.create_task(self._dispatch())
+
+    async def shutdown(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        # Уже начатые отправки доводим до конца, пока соединения бота открыты
+        if self._sending:
+            await asyncio.gather(*self._sending, return_exceptions=True)
+        for queue in self._queues.values():
+            for request in queue:
+                if not request.future.done():
+                    request.future.cancel()
+        self._queues.clear()
+
+    async def process_request(
+        self,
+        callback: Callable[..., Coroutine[Any, Any, Any]],
+        args: Any,
+        kwargs: Dict[str, Any],
+        endpoint: str,
+        data: Dict[str, Any],
+        rate_limit_args: Optional[int],
+    ) -> Any:
+        """Поставить запрос в очередь и дождаться ответа Telegram"""
+        chat_id = data.get('chat_id')
+        if chat_id is None or self._task is None:
+            # answerCallbackQuery, getMe и т.п. не относятся к чату и не ограничиваются
+            self.direct += 1
+            return await callback(*args, **kwargs)
+
+        priority = PRIORITY_INTERACTIVE if rate_limit_args is None else rate_limit_args
+        request = _Request(priority, next(self._seq), chat_id, callback, args, kwargs)
+        queue = self._queues.get(chat_id)
+        if queue is None:
+            queue = self._queues[chat_id] = deque()
+        queue.append(request)
+        if len(queue) == 1 and chat_id not in self._in_flight:
+            self._schedule(chat_id)
+        return await request.future
+
+    def _bucket(self, chat_id: Any) -> TokenBucket:
+        """Token bucket чата (группы и каналы - с отрицательным ID - медленнее)"""
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            if len(self._chat_buckets) >= self.max_chat_buckets:
+                self._prune_buckets()
+            is_group = isinstance(chat_id, str) or chat_id < 0
+            bucket = TokenBucket(rate=self.group_rate if is_group else self.chat_rate, capacity=self.chat_burst)
+            self._chat_buckets[chat_id] = bucket
+        return bucket
+
+    def _prune_buckets(self):
+        """Забыть чаты без запросов, у которых bucket уже полон"""
+        for chat_id, bucket in list(self._chat_buckets.items()):
+            if chat_id in self._queues or chat_id in self._in_flight:
+                continue
+            if bucket.time_until_available(bucket.capacity) == 0:
+                del self._chat_buckets[chat_id]
+
+    def _schedule(self, chat_id: Any):
+        """Поставить чат с первым запросом очереди в готовые или отложенные"""
+        head = self._queues[chat_id][0]
+        wait = self._bucket(chat_id).time_until_available()
+        if wait > 0:
+            heapq.heappush(self._delayed, (time.monotonic() + wait, head.seq, chat_id))
+        else:
+            heapq.heappush(self._ready, (head.priority, head.seq, chat_id))
+        self._wakeup.set()
+
+    async def _dispatch(self):
+        """Отправлять запросы по мере появления токенов"""
+        while True:
+            now = time.monotonic()
+            while self._delayed and self._delayed[0][0] <= now:
+                _, _, chat_id = heapq.heappop(self._delayed)
+                self._schedule(chat_id)
+
+            if not self._ready:
+                timeout = self._delayed[0][0] - now if self._delayed else None
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            # Без общего токена ждем, затем выбираем заново: за это время
+            # мог прийти более срочный запрос
+            wait = self.global_bucket.time_until_available()
+            if wait > 0:
+                await asyncio.sleep(wait)
+                continue
+
+            _, _, chat_id = heapq.heappop(self._ready)
+            if not self._bucket(chat_id).try_acquire():
+                # Чат получил RetryAfter, пока ждал в готовых
+                self._schedule(chat_id)
+                continue
+            self.global_bucket.try_acquire()
+            request = self._queues[chat_id].popleft()
+            self._in_flight.add(chat_id)
+            task = asyncio.create_task(self._send(request))
+            self._sending.add(task)
+            task.add_done_callback(self._sending.discard)
+
+    async def _send(self, request: _Request):
+        """Выполнить запрос; после RetryAfter вернуть его в начало очереди чата"""
+        chat_id = request.chat_id
+        if not request.retries:
+            self._record_wait(request)
+        try:
+            if request.future.done():
+                return  # вызывающий уже не ждет ответа
+            try:
+                result = await request.callback(*request.args, **request.kwargs)
+            except RetryAfter as exc:
+                self.retried += 1
+                self._bucket(chat_id).penalize(exc.retry_after)
+                logger.warning("Telegram RetryAfter %s с для чата %s", exc.retry_after, chat_id)
+                if request.retries < self.max_retries:
+                    request.retries += 1
+                    self._queues.setdefault(chat_id, deque()).appendleft(request)
+                else:
+                    self.failed += 1
+                    if not request.future.done():
+                        request.future.set_exception(exc)
+            except Exception as exc:
+                self.failed += 1
+                if not request.future.done():
+                    request.future.set_exception(exc)
+            else:
+                self.sent += 1
+                if not request.future.done():
+                    request.future.set_result(result)
+        finally:
+            self._in_flight.discard(chat_id)
+            if self._queues.get(chat_id):
+                self._schedule(chat_id)
+            else:
+                self._queues.pop(chat_id, None)
+
+    def _record_wait(self, request: _Request):
+        """Учесть время ожидания запроса в очереди"""
+        wait = time.monotonic() - request.queued_at
+        totals = self._waits.setdefault(request.priority, [0, 0.0, 0.0])
+        totals[0] += 1
+        totals[1] += wait
+        totals[2] = max(totals[2], wait)
+
+    def stats(self) -> Dict[str, float]:
+        """Метрики очереди исходящих сообщений"""
+        stats = {
+            'queued': sum(len(queue) for queue in self._queues.values()),
+            'in_flight': len(self._in_flight),
+            'sent': self.sent,
+            'direct': self.direct,
+            'retried': self.retried,
+            'failed': self.failed,
+            'tracked_chats': len(self._chat_buckets)
+        }
+        for priority, (count, total, longest) in sorted(self._waits.items()):
+            name = PRIORITY_NAMES.get(priority, str(priority))
+            stats[f'avg_wait_{name}_ms'] = round(total / count * 1000, 1)
+            stats[f'max_wait_{name}_ms'] = round(longest * 1000, 1)
+        return stats
@@ -0,0 +1,40 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+class SingleFlight:
+    """Объединение одновременных одинаковых запросов в один"""
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, factory: Callable[[], Awaitable[Any]]) -> Any:
+        """Выполнить запрос или дождаться уже выполняющегося с тем же ключом.
+
+        Результат и исключения получают все ожидающие вызовы. Запрос
+        выполняется в отдельной задаче, поэтому отмена одного из
+        ожидающих не прерывает его для остальных.
+        """
+        task = self._inflight.get(key)
+        if task is None:
+            self.calls += 1
+            task = asyncio.ensure_future(factory())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Hashable, task: asyncio.Task):
+        """Убрать завершенный запрос из списка выполняющихся"""
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+
+    def stats(self) -> Dict[str, int]:
+        """Статистика объединения запросов"""
+        return {
+            'in_flight': len(self._inflight),
+            'calls': self.calls,
+            'coalesced': self.coalesced
+        }
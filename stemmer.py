@@ -0,0 +1,67 @@
+import re
+from functools import lru_cache
+from typing import List
+
+# Стеммер Портера для русского языка (алгоритм Snowball, без области R2):
+# отрезает окончания, чтобы "новости", "новостей" и "новостях" совпадали
+
+_WORD_RE = re.compile(r"\w+")
+_RV_RE = re.compile(r"^(.*?[аеиоуыэюя])(.*)$")
+
+_PERFECTIVE_GERUND = re.compile(r"((ив|ивши|ившись|ыв|ывши|ывшись)|((?<=[ая])(в|вши|вшись)))$")
+_REFLEXIVE = re.compile(r"(с[яь])$")
+_ADJECTIVE = re.compile(
+    r"(ее|ие|ые|ое|ими|ыми|ей|ий|ый|ой|ем|им|ым|ом|его|ого|ему|ому|их|ых|ую|юю|ая|яя|ою|ею)$"
+)
+_PARTICIPLE = re.compile(r"((ивш|ывш|ующ)|((?<=[ая])(ем|нн|вш|ющ|щ)))$")
+_VERB = re.compile(
+    r"((ила|ыла|ена|ейте|уйте|ите|или|ыли|ей|уй|ил|ыл|им|ым|ен|ило|ыло|ено|ят|ует|уют|ит|ыт|ены|ить|ыть|ишь|ую|ю)"
+    r"|((?<=[ая])(ла|на|ете|йте|ли|й|л|ем|н|ло|но|ет|ют|ны|ть|ешь|нно)))$"
+)
+_NOUN = re.compile(
+    r"(а|ев|ов|ие|ье|е|иями|ями|ами|еи|ии|и|ией|ей|ой|ий|й|иям|ям|ием|ем|ам|ом|о|у|ах|иях|ях|ы|ь|ию|ью|ю|ия|ья|я)$"
+)
+_DERIVATIONAL = re.compile(r"[^аеиоуыэюя][аеиоуыэюя].*ость?$")
+_DERIVATIONAL_SUFFIX = re.compile(r"ость?$")
+_SUPERLATIVE = re.compile(r"(ейше|ейш)$")
+
+
+@lru_cache(maxsize=100000)
+def stem(word: str) -> str:
+    """Основа слова (слова без русских гласных возвращаются как есть)"""
+    word = word.lower().replace('ё', 'е')
+    match = _RV_RE.match(word)
+    if match is None:
+        return word
+    prefix, rv = match.groups()
+
+    # Шаг 1: деепричастие, иначе возвратная частица и прилагательное/глагол/существительное
+    result = _PERFECTIVE_GERUND.sub('', rv, 1)
+    if result == rv:
+        rv = _REFLEXIVE.sub('', rv, 1)
+        result = _ADJECTIVE.sub('', rv, 1)
+        if result != rv:
+            result = _PARTICIPLE.sub('', result, 1)
+        else:
+            result = _VERB.sub('', rv, 1)
+            if result == rv:
+                result = _NOUN.sub('', rv, 1)
+    rv = result
+
+    # Шаг 2-4: "и", словообразовательное "ость", превосходная степень, "нн" и "ь"
+    if rv.endswith('и'):
+        rv = rv[:-1]
+    if _DERIVATIONAL.search(rv):
+        rv = _DERIVATIONAL_SUFFIX.sub('', rv, 1)
+    if rv.endswith('ь'):
+        rv = rv[:-1]
+    else:
+        rv = _SUPERLATIVE.sub('', rv, 1)
+        if rv.endswith('нн'):
+            rv = rv[:-1]
+    return prefix + rv
+
+
+def stem_words(text: str) -> List[str]:
+    """Основы всех слов текста"""
+    return [stem(word) for word in _WORD_RE.findall(text.lower())]
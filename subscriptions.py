@@ -0,0 +1,263 @@
+import asyncio
+import logging
+import sqlite3
+import time
+from typing import Awaitable, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from telegram.error import Forbidden
+import rendering
+import config
+
+logger = logging.getLogger(__name__)
+
+# Типы подписок
+WEATHER = 'weather'
+CURRENCY = 'currency'
+NEWS = 'news'
+KINDS = (WEATHER, CURRENCY, NEWS)
+
+# Ключ сводки: (тип, тема, язык, единицы). Подписчики с одинаковым ключом
+# получают одно и то же сообщение, поэтому данные запрашиваются один раз на ключ
+DigestKey = Tuple[str, str, str, str]
+# Подписка: (час, тип, тема, язык, единицы, чат)
+SubscriptionRow = Tuple[int, str, str, str, str, int]
+
+
+def digest_key(kind: str, topic: str, language: str, units: str) -> DigestKey:
+    """Ключ сводки; язык и единицы важны только для погоды"""
+    if kind != WEATHER:
+        return (kind, topic, '', '')
+    return (kind, topic, language, units)
+
+
+class SubscriptionStore:
+    """Подписки на ежедневные сводки в SQLite.
+
+    Первичный ключ начинается с часа и ключа сводки, поэтому различные
+    ключи часа и подписчики каждого ключа читаются по индексу, без сортировки.
+    """
+
+    def __init__(self, path: str):
+        self._conn = sqlite3.connect(path)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS subscriptions ("
+            " hour INTEGER NOT NULL,"
+            " kind TEXT NOT NULL,"
+            " topic TEXT NOT NULL,"
+            " language TEXT NOT NULL,"
+            " units TEXT NOT NULL,"
+            " chat_id INTEGER NOT NULL,"
+            " PRIMARY KEY (hour, kind, topic, language, units, chat_id)"
+            ") WITHOUT ROWID"
+        )
+        self._conn.execute(
+            "CREATE UNIQUE INDEX IF NOT EXISTS subscriptions_chat ON subscriptions (chat_id, kind, topic)"
+        )
+        self._conn.commit()
+
+    def add(self, chat_id: int, kind: str, topic: str, language: str, units: str, hour: int):
+        """Подписать чат (повторная подписка на ту же тему меняет час и настройки)"""
+        kind, topic, language, units = digest_key(kind, topic, language, units)
+        self.add_many([(hour, kind, topic, language, units, chat_id)])
+
+    def add_many(self, rows: Iterable[SubscriptionRow]):
+        """Добавить подписки одной транзакцией"""
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO subscriptions (hour, kind, topic, language, units, chat_id)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                rows
+            )
+
+    def has(self, chat_id: int, kind: str, topic: str) -> bool:
+        """Есть ли у чата подписка на тему"""
+        return self._conn.execute(
+            "SELECT 1 FROM subscriptions WHERE chat_id = ? AND kind = ? AND topic = ?", (chat_id, kind, topic)
+        ).fetchone() is not None
+
+    def remove(self, chat_id: int, kind: Optional[str] = None, topic: Optional[str] = None) -> int:
+        """Отписать чат от темы, от всех тем типа или от всего; вернуть число подписок"""
+        query = "DELETE FROM subscriptions WHERE chat_id = ?"
+        params: list = [chat_id]
+        if kind:
+            query += " AND kind = ?"
+            params.append(kind)
+        if topic:
+            query += " AND topic = ?"
+            params.append(topic)
+        with self._conn:
+            return self._conn.execute(query, params).rowcount
+
+    def remove_chats(self, chat_ids: Iterable[int]) -> int:
+        """Удалить все подписки чатов (например, заблокировавших бота)"""
+        with self._conn:
+            return self._conn.executemany(
+                "DELETE FROM subscriptions WHERE chat_id = ?", ((chat_id,) for chat_id in chat_ids)
+            ).rowcount
+
+    def for_chat(self, chat_id: int) -> List[Tuple[str, str, int]]:
+        """Подписки чата: (тип, тема, час)"""
+        return self._conn.execute(
+            "SELECT kind, topic, hour FROM subscriptions WHERE chat_id = ? ORDER BY kind, topic",
+            (chat_id,)
+        ).fetchall()
+
+    def count(self) -> int:
+        """Всего подписок"""
+        return self._conn.execute("SELECT COUNT(*) FROM subscriptions").fetchone()[0]
+
+    def keys(self, hour: int) -> List[DigestKey]:
+        """Различные ключи сводок на этот час"""
+        return self._conn.execute(
+            "SELECT DISTINCT kind, topic, language, units FROM subscriptions WHERE hour = ?", (hour,)
+        ).fetchall()
+
+    def subscribers(self, hour: int, key: DigestKey, batch_size: int = 10000) -> Iterator[List[int]]:
+        """Чаты, подписанные на сводку key в этот час, порциями по batch_size.
+
+        Каждая порция - отдельный запрос по индексу после последнего chat_id,
+        поэтому долгая рассылка не держит открытый курсор.
+        """
+        last_chat_id = -2 ** 63
+        while True:
+            chats = [row[0] for row in self._conn.execute(
+                "SELECT chat_id FROM subscriptions"
+                " WHERE hour = ? AND kind = ? AND topic = ? AND language = ? AND units = ? AND chat_id > ?"
+                " ORDER BY chat_id LIMIT ?",
+                (hour, *key, last_chat_id, batch_size)
+            )]
+            if not chats:
+                return
+            yield chats
+            last_chat_id = chats[-1]
+
+    def close(self):
+        """Закрыть хранилище"""
+        self._conn.close()
+
+
+class DigestEngine:
+    """Рассылка ежедневных сводок подписчикам.
+
+    Данные запрашиваются и форматируются один раз на ключ сводки (погода -
+    пачками через get_current_weather_many), затем одно и то же сообщение
+    отправляется всем подписчикам ключа. Работа с API растет с числом
+    различных ключей, а не подписчиков; отправка идет через send, который
+    в боте ставит сообщения в очередь исходящих с низким приоритетом.
+    """
+
+    def __init__(self, store: SubscriptionStore, weather_api, currency_api, news_api,
+                 send: Callable[[int, str], Awaitable], send_concurrency: int):
+        self.store = store
+        self.weather_api = weather_api
+        self.currency_api = currency_api
+        self.news_api = news_api
+        self.send = send
+        self.send_concurrency = send_concurrency
+        self.last_run: Dict[str, float] = {}
+
+    async def run(self, hour: int) -> Dict[str, float]:
+        """Разослать сводки подписчикам этого часа"""
+        started = time.monotonic()
+        keys = self.store.keys(hour)
+        texts = await self.render_all(keys)
+        rendered_at = time.monotonic()
+
+        stats = {'keys': len(keys), 'rendered': len(texts), 'subscribers': 0,
+                 'sent': 0, 'skipped': 0, 'failed': 0, 'blocked': 0}
+        blocked: List[int] = []
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.send_concurrency * 2)
+
+        async def worker():
+            while True:
+                chat_id, text = await queue.get()
+                try:
+                    await self.send(chat_id, text)
+                    stats['sent'] += 1
+                except Forbidden:
+                    blocked.append(chat_id)
+                except Exception as e:
+                    stats['failed'] += 1
+                    logger.debug(f"Не удалось отправить сводку в чат {chat_id}: {e}")
+                finally:
+                    queue.task_done()
+
+        workers = [asyncio.create_task(worker()) for _ in range(self.send_concurrency)]
+        try:
+            for key in keys:
+                text = texts.get(key)
+                for chats in self.store.subscribers(hour, key):
+                    stats['subscribers'] += len(chats)
+                    if text is None:
+                        stats['skipped'] += len(chats)
+                        continue
+                    for chat_id in chats:
+                        await queue.put((chat_id, text))
+            await queue.join()
+        finally:
+            for task in workers:
+                task.cancel()
+
+        if blocked:
+            self.store.remove_chats(blocked)
+            stats['blocked'] = len(blocked)
+        stats['render_seconds'] = round(rendered_at - started, 3)
+        stats['total_seconds'] = round(time.monotonic() - started, 3)
+        self.last_run = stats
+        logger.info(f"Сводки на {hour}:00 разосланы: {stats}")
+        return stats
+
+    async def render_all(self, keys: List[DigestKey]) -> Dict[DigestKey, str]:
+        """Запросить данные и сформировать текст сводки для каждого ключа"""
+        texts: Dict[DigestKey, str] = {}
+        weather_groups: Dict[Tuple[str, str], List[str]] = {}
+        other: List[DigestKey] = []
+        for key in keys:
+            kind, topic, language, units = key
+            if kind == WEATHER:
+                weather_groups.setdefault((language, units), []).append(topic)
+            else:
+                other.append(key)
+
+        for (language, units), cities in weather_groups.items():
+            weather_by_city = await self.weather_api.get_current_weather_many(cities, language, units)
+            for city, weather in weather_by_city.items():
+                if weather:
+                    texts[(WEATHER, city, language, units)] = rendering.render_digest(
+                        rendering.render_weather(weather, units)
+                    )
+
+        semaphore = asyncio.Semaphore(config.DIGEST_FETCH_CONCURRENCY)
+
+        async def render_other(key: DigestKey):
+            async with semaphore:
+                body = await self._render_body(key)
+            if body:
+                texts[key] = rendering.render_digest(body)
+
+        await asyncio.gather(*(render_other(key) for key in other))
+        return texts
+
+    async def _render_body(self, key: DigestKey) -> Optional[str]:
+        """Текст сводки по валютной паре или категории новостей"""
+        kind, topic, _, _ = key
+        if kind == CURRENCY:
+            from_currency, to_currency = topic.split('/')
+            conversion = await self.currency_api.convert_currency(1, from_currency, to_currency)
+            if not conversion:
+                return None
+            return rendering.render_conversion(
+                conversion,
+                self.currency_api.get_currency_symbol(from_currency),
+                self.currency_api.get_currency_symbol(to_currency)
+            )
+        if kind == NEWS:
+            articles = await self.news_api.get_top_headlines(country="ru", category=topic, limit=5)
+            if not articles:
+                return None
+            return rendering.render_news(f"📰 **Главные новости - {topic.title()}**", tuple(articles))
+        return None
+
+    def stats(self) -> Dict[str, float]:
+        """Число подписок и результат последней рассылки"""
+        return {'subscriptions': self.store.count(), **self.last_run}
@@ -0,0 +1,115 @@
+"""Бенчмарк рассылки сводок на синтетических подписках.
+
+Заполняет временную базу подписками (по умолчанию 1 млн) и прогоняет
+DigestEngine с заглушками API и отправки: считает запросы к API (при
+подходе "запрос на каждого подписчика" их было бы столько же, сколько
+подписчиков) и скорость раздачи сообщений без учета лимитов Telegram.
+
+Пример:
+    python subscriptions_benchmark.py --subscriptions 1000000 --cities 2000
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+from models import Article, Conversion, CurrentWeather
+from subscriptions import CURRENCY, NEWS, WEATHER, DigestEngine, SubscriptionStore, digest_key
+
+PAIRS = ["USD/RUB", "EUR/RUB", "CNY/RUB", "USD/EUR", "GBP/RUB", "TRY/RUB", "USD/KZT", "EUR/USD"]
+CATEGORIES = ['general', 'business', 'technology', 'sports', 'entertainment', 'health', 'science']
+
+
+class StubWeatherAPI:
+    """Погода без сети: считает запросы так, как их делал бы WeatherAPI (/group по 20 городов)"""
+
+    def __init__(self):
+        self.calls = 0
+
+    async def get_current_weather_many(self, cities, language=None, units=None):
+        self.calls += (len(cities) + 19) // 20
+        return {
+            city: CurrentWeather(None, city.title(), "RU", "Ясно", 20, 19, 50, 1013, 3.0, "01d", None)
+            for city in cities
+        }
+
+
+class StubCurrencyAPI:
+    """Курсы без сети"""
+
+    def __init__(self):
+        self.calls = 0
+
+    async def convert_currency(self, amount, from_currency, to_currency):
+        self.calls += 1
+        return Conversion(from_currency, to_currency, amount, amount * 90.0, 90.0, "2024-01-01", None)
+
+    def get_currency_symbol(self, currency):
+        return ""
+
+
+class StubNewsAPI:
+    """Новости без сети"""
+
+    def __init__(self):
+        self.calls = 0
+
+    async def get_top_headlines(self, country="ru", category="general", limit=5):
+        self.calls += 1
+        return [Article(f"Новость {i}", "Описание", "https://example.com", "", "Источник", None) for i in range(limit)]
+
+
+def make_rows(count: int, cities: int, hour: int):
+    """Синтетические подписки: популярность городов убывает как 1/ранг"""
+    city_names = [f"город {i}" for i in range(cities)]
+    weights = [1 / (rank + 1) for rank in range(cities)]
+    kinds = random.choices([WEATHER, CURRENCY, NEWS], weights=[70, 20, 10], k=count)
+    picked_cities = iter(random.choices(city_names, weights=weights, k=count))
+    for chat_id, kind in enumerate(kinds, 1):
+        language = 'ru' if random.random() < 0.9 else 'en'
+        units = 'metric' if random.random() < 0.95 else 'imperial'
+        if kind == WEATHER:
+            topic = next(picked_cities)
+        elif kind == CURRENCY:
+            topic = random.choice(PAIRS)
+        else:
+            topic = random.choice(CATEGORIES)
+        yield (hour, *digest_key(kind, topic, language, units), chat_id)
+
+
+async def run(store: SubscriptionStore, hour: int, concurrency: int):
+    weather_api, currency_api, news_api = StubWeatherAPI(), StubCurrencyAPI(), StubNewsAPI()
+
+    async def send(chat_id: int, text: str):
+        pass
+
+    engine = DigestEngine(store, weather_api, currency_api, news_api, send=send, send_concurrency=concurrency)
+    stats = await engine.run(hour)
+    api_calls = weather_api.calls + currency_api.calls + news_api.calls
+    print(f"Ключей сводок:  {stats['keys']}")
+    print(f"Запросов к API: {api_calls} (по одному на подписчика было бы {stats['subscribers']})")
+    print(f"Подготовка:     {stats['render_seconds']:.2f} с")
+    print(f"Раздача:        {stats['sent']} сообщений за {stats['total_seconds']:.1f} с "
+          f"({stats['sent'] / stats['total_seconds']:,.0f} в секунду без лимитов Telegram)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк рассылки сводок")
+    parser.add_argument('--subscriptions', type=int, default=1000000, help="число подписок")
+    parser.add_argument('--cities', type=int, default=2000, help="число различных городов")
+    parser.add_argument('--concurrency', type=int, default=50, help="одновременных отправок")
+    args = parser.parse_args()
+
+    hour = 8
+    with tempfile.TemporaryDirectory() as directory:
+        store = SubscriptionStore(os.path.join(directory, 'subscriptions.db'))
+        started = time.perf_counter()
+        store.add_many(make_rows(args.subscriptions, args.cities, hour))
+        print(f"Подписок: {store.count()}, запись в базу: {time.perf_counter() - started:.1f} с")
+        asyncio.run(run(store, hour, args.concurrency))
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
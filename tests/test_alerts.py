@@ -0,0 +1,94 @@
+import asyncio
+import pytest
+import config
+import rendering
+from alerts import ABOVE, BELOW, RATE, WIND, AlertEngine
+from models import CurrentWeather, Rates
+from weather_api import WeatherAPI
+
+
+class FakeCurrencyAPI:
+    def __init__(self, rates):
+        self.rates = rates
+        self.calls = 0
+
+    async def get_all_rates(self, base_currency: str = "RUB", refresh: bool = False):
+        self.calls += 1
+        return Rates(base=base_currency, date='2024-01-01', rates=self.rates, stale_age=None)
+
+
+class FakeWeatherAPI:
+    def __init__(self, wind_speed: float):
+        self.wind_speed = wind_speed
+
+    async def get_current_weather(self, city, language=None, units=None, refresh=False):
+        return CurrentWeather(city_id=1, city=city, country='RU', description='ясно', temperature=20,
+                              feels_like=19, humidity=50, pressure=1013, wind_speed=self.wind_speed,
+                              icon='01d', stale_age=None)
+
+
+async def no_send(chat_id: int, text: str):
+    pass
+
+
+@pytest.fixture
+def engine(tmp_path):
+    # 1 RUB = 0.01 USD: курс USD/RUB = 100
+    currency_api = FakeCurrencyAPI({'USD': 0.01, 'EUR': 0.009})
+    engine = AlertEngine(str(tmp_path / 'alerts.db'), FakeWeatherAPI(wind_speed=20.0), currency_api, send=no_send)
+    yield engine
+    engine.close()
+
+
+def test_new_rule_on_unchecked_pair_uses_current_rate(engine):
+    assert config.ALERT_RATES_BASE == 'RUB'
+    rule, already_met = asyncio.run(engine.add(1, RATE, 'USD/RUB', ABOVE, 90))
+    assert already_met
+    assert engine.currency_api.calls == 1
+    # Сработавшее правило не уведомляет, пока курс не вернется ниже порога
+    assert engine.evaluate(RATE, 'USD/RUB', 101) == []
+
+    rule, already_met = asyncio.run(engine.add(1, RATE, 'USD/RUB', BELOW, 90))
+    assert not already_met
+    assert engine.evaluate(RATE, 'USD/RUB', 80) == [rule]
+
+
+def test_new_wind_rule_uses_current_weather(engine):
+    _, already_met = asyncio.run(engine.add(1, WIND, 'москва', ABOVE, 15))
+    assert already_met
+    _, already_met = asyncio.run(engine.add(1, WIND, 'москва', ABOVE, 25))
+    assert not already_met
+
+
+def test_rule_is_armed_when_current_value_is_unknown(engine):
+    engine.weather_api.get_current_weather = lambda *args, **kwargs: asyncio.sleep(0)
+    rule, already_met = asyncio.run(engine.add(1, WIND, 'москва', ABOVE, 15))
+    assert not already_met
+    assert engine.evaluate(WIND, 'москва', 20.0) == [rule]
+
+
+def test_city_rules_show_city_name(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, 'OPENWEATHER_API_KEYS', ['test-key'])
+    weather_api = WeatherAPI()
+    wind = FakeWeatherAPI(wind_speed=10.0)
+    weather_api.get_current_weather = wind.get_current_weather
+
+    async def get_current_weather_many(cities, language=None, units=None):
+        return {city: await wind.get_current_weather(city) for city in cities}
+
+    weather_api.get_current_weather_many = get_current_weather_many
+    sent = []
+
+    async def send(chat_id: int, text: str):
+        sent.append(text)
+
+    engine = AlertEngine(str(tmp_path / 'alerts.db'), weather_api, FakeCurrencyAPI({}), send=send)
+    try:
+        rule, _ = asyncio.run(engine.add(1, WIND, weather_api.city_key("Питер"), ABOVE, 15))
+        assert rendering.describe_alert(rule, engine.subject_name(rule)) == \
+            "#1 🌪️ Ветер, Санкт-Петербург > 15 м/с"
+        wind.wind_speed = 20.0
+        asyncio.run(engine.check())
+        assert sent[0].startswith("🔔 🌪️ Ветер, Санкт-Петербург:")
+    finally:
+        engine.close()
@@ -0,0 +1,43 @@
+import asyncio
+import pytest
+import config
+from weather_api import WeatherAPI
+
+
+@pytest.fixture
+def weather_api(monkeypatch):
+    monkeypatch.setattr(config, 'OPENWEATHER_API_KEYS', ['key-1', 'key-2'])
+    return WeatherAPI()
+
+
+def test_disabled_keys_do_not_spend_limiter_tokens(weather_api):
+    weather_api.keys.report('key-1', 401)
+    weather_api.keys.report('key-2', 429)
+    tokens = weather_api.limiter.bucket.tokens
+
+    async def run():
+        return [await weather_api._reserve_key() for _ in range(int(tokens) + 10)]
+
+    assert asyncio.run(run()) == [None] * (int(tokens) + 10)
+    assert weather_api.limiter.bucket.tokens >= tokens
+    assert weather_api.limiter.stats()['allowed'] == 0
+    assert weather_api.limiter.quota.used == 0
+
+
+def test_token_is_refunded_when_keys_are_ejected_while_waiting(weather_api):
+    limiter = weather_api.limiter
+    limiter.max_wait = 1.0
+    limiter.bucket.drain()
+
+    async def run():
+        reserve = asyncio.ensure_future(weather_api._reserve_key())
+        await asyncio.sleep(0)
+        # Пока запрос ждет токена, оба ключа получают 429
+        weather_api.keys.report('key-1', 429)
+        weather_api.keys.report('key-2', 429)
+        return await reserve
+
+    assert asyncio.run(run()) is None
+    assert limiter.stats()['allowed'] == 0
+    assert limiter.quota.used == 0
+    assert limiter.bucket.time_until_available() == 0
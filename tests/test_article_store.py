@@ -0,0 +1,64 @@
+from article_store import ArticleStore, url_hash
+
+
+def raw(url: str, title: str, published_at: str = "2024-01-01T00:00:00Z", source: str = "РБК"):
+    return {'url': url, 'title': title, 'description': "Описание", 'publishedAt': published_at,
+            'source': {'name': source}}
+
+
+def make_store(**overrides) -> ArticleStore:
+    settings = dict(max_articles=100, feed_size=10, max_distance=5)
+    settings.update(overrides)
+    return ArticleStore(**settings)
+
+
+def test_same_url_is_parsed_once():
+    added = []
+    store = make_store(on_added=added.extend)
+    article = raw("https://example.com/a", "Центробанк сохранил ключевую ставку")
+    first = store.ingest([article])
+    second = store.ingest([article, article])
+    assert second == first
+    assert len(added) == 1
+    assert store.stats()['known'] == 2
+
+
+def test_reprint_with_other_url_is_a_duplicate():
+    store = make_store()
+    original = raw("https://rbc.ru/a", "Центробанк сохранил ключевую ставку на уровне 16% - РБК")
+    reprint = raw("https://tass.ru/b", "Центробанк сохранил ключевую ставку на уровне 16% - ТАСС", source="ТАСС")
+    other = raw("https://tass.ru/c", "Сборная России вышла в финал чемпионата мира")
+    articles = store.ingest([original, reprint, other])
+    assert [article.url for article in articles] == ["https://rbc.ru/a", "https://tass.ru/c"]
+    assert store.stats()['duplicates'] == 1
+    # Перепечатка запоминается по URL и больше не сравнивается по заголовку
+    assert store.ingest([reprint])[0].url == "https://rbc.ru/a"
+    assert store.stats()['duplicates'] == 1
+
+
+def test_eviction_drops_oldest_article_with_its_aliases():
+    store = make_store(max_articles=2)
+    store.ingest([raw("https://rbc.ru/a", "Центробанк сохранил ключевую ставку - РБК"),
+                  raw("https://tass.ru/a", "Центробанк сохранил ключевую ставку - ТАСС")])
+    store.ingest([raw("https://rbc.ru/b", "Сборная России вышла в финал чемпионата мира"),
+                  raw("https://rbc.ru/c", "В Москве открылась новая станция метро")])
+    assert url_hash("https://rbc.ru/a") not in store.articles
+    assert store._aliases == {} and store._aliases_of == {}
+    assert len(store.articles) == 2
+
+
+def test_feed_is_sorted_and_skips_articles_older_than_watermark():
+    store = make_store(feed_size=2)
+    feed = ('ru', 'general')
+    assert store.ingest_feed(feed, [
+        raw("https://example.com/2", "Вторая новость дня о погоде", "2024-01-02T00:00:00Z"),
+        raw("https://example.com/1", "Первая новость дня о курсах", "2024-01-01T00:00:00Z"),
+    ]) == 2
+    assert store.watermarks[feed] == "2024-01-02T00:00:00Z"
+    assert store.ingest_feed(feed, [
+        raw("https://example.com/0", "Старая новость о выборах мэра", "2023-12-31T00:00:00Z"),
+        raw("https://example.com/3", "Третья новость дня о спорте", "2024-01-03T00:00:00Z"),
+    ]) == 1
+    assert url_hash("https://example.com/0") not in store.articles
+    assert [article.url for article in store.feed(feed)] == ["https://example.com/3", "https://example.com/2"]
+    assert store.watermarks[feed] == "2024-01-03T00:00:00Z"
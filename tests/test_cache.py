@@ -0,0 +1,72 @@
+import asyncio
+import time
+import pytest
+from cache import CachedFetcher
+from cache_store import CacheStore, SQLiteCacheStore
+from models import ExchangeRate
+
+
+def value(name: str) -> ExchangeRate:
+    """Сохраняемое значение (в хранилище попадают только модели ответов)"""
+    return ExchangeRate(rate=1.0, date=name, stale_age=None)
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = SQLiteCacheStore(str(tmp_path / 'cache.db'))
+    yield store
+    store.close()
+
+
+def test_cache_store_is_abstract():
+    with pytest.raises(TypeError):
+        CacheStore()
+
+
+def test_warm_load_evicts_oldest_persisted_entry_first(store):
+    now = time.time()
+    store.save_many('test', [
+        (('key', 'oldest'), value('oldest'), now - 30, now + 600),
+        (('key', 'middle'), value('middle'), now - 20, now + 600),
+        (('key', 'newest'), value('newest'), now - 10, now + 600),
+    ])
+
+    async def run():
+        fetcher = CachedFetcher(max_entries=3, name='test', store=store)
+        assert await fetcher.warm_load() == 3
+        fetcher.put(('key', 'fresh'), value('fresh'), 600)
+        return fetcher
+
+    fetcher = asyncio.run(run())
+    assert fetcher.peek(('key', 'oldest')) is None
+    assert fetcher.peek(('key', 'middle')) == value('middle')
+    assert fetcher.peek(('key', 'newest')) == value('newest')
+    assert fetcher.peek(('key', 'fresh')) == value('fresh')
+
+
+def test_warm_load_keeps_entries_already_in_memory(store):
+    now = time.time()
+    store.save_many('test', [(('key', 'stored'), value('stored'), now - 10, now + 600)])
+
+    async def run():
+        fetcher = CachedFetcher(max_entries=2, name='test', store=store)
+        fetcher.put(('key', 'live'), value('live'), 600)
+        await fetcher.warm_load()
+        fetcher.put(('key', 'fresh'), value('fresh'), 600)
+        return fetcher
+
+    fetcher = asyncio.run(run())
+    assert fetcher.peek(('key', 'stored')) is None
+    assert fetcher.peek(('key', 'live')) == value('live')
+
+
+def test_flush_round_trip(store):
+    async def run():
+        fetcher = CachedFetcher(max_entries=10, name='test', store=store)
+        fetcher.put(('key', 'a'), value('a'), 600)
+        assert await fetcher.flush() == 1
+        restored = CachedFetcher(max_entries=10, name='test', store=store)
+        await restored.warm_load()
+        return restored
+
+    assert asyncio.run(run()).peek(('key', 'a')) == value('a')
@@ -0,0 +1,153 @@
+import asyncio
+from aiohttp import web
+import config
+from circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+from currency_api import CurrencyAPI
+from weather_api import WeatherAPI
+
+
+def make_breaker(**overrides) -> CircuitBreaker:
+    settings = dict(window=10, min_calls=4, failure_ratio=0.5, slow_call_seconds=1.0,
+                    slow_ratio=0.8, open_seconds=30, half_open_calls=1)
+    settings.update(overrides)
+    return CircuitBreaker("test", **settings)
+
+
+def trip(breaker: CircuitBreaker):
+    for _ in range(breaker.min_calls):
+        assert breaker.allow()
+        breaker.record(False, 0.01)
+    assert breaker.state == OPEN
+
+
+def test_trips_on_failures_and_rejects_once_per_call():
+    breaker = make_breaker()
+    trip(breaker)
+    assert not breaker.allow()
+    assert not breaker.allow()
+    assert breaker.stats()['rejected'] == 2
+
+
+def test_trips_on_slow_calls():
+    breaker = make_breaker()
+    for _ in range(4):
+        assert breaker.allow()
+        breaker.record(True, 2.0)
+    assert breaker.state == OPEN
+
+
+def test_half_open_reserves_single_probe():
+    breaker = make_breaker(open_seconds=0)
+    trip(breaker)
+    assert breaker.allow()
+    assert breaker.state == HALF_OPEN
+    assert not breaker.allow()
+    breaker.release()
+    assert breaker.allow()
+    breaker.record(True, 0.01)
+    assert breaker.state == CLOSED
+
+
+def test_concurrent_requests_in_half_open_spend_quota_once(monkeypatch):
+    monkeypatch.setattr(config, 'OPENWEATHER_API_KEYS', ['test-key'])
+    received = []
+
+    async def handler(request):
+        received.append(request.query['q'])
+        await asyncio.sleep(0.05)
+        return web.json_response({
+            'id': 1, 'name': request.query['q'], 'sys': {'country': 'RU'},
+            'weather': [{'description': 'ясно', 'icon': '01d'}],
+            'main': {'temp': 20, 'feels_like': 19, 'humidity': 50, 'pressure': 1013}
+        })
+
+    async def run():
+        app = web.Application()
+        app.router.add_get('/weather', handler)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        await web.TCPSite(runner, '127.0.0.1', 0).start()
+        weather_api = WeatherAPI()
+        weather_api.base_url = f"http://127.0.0.1:{runner.addresses[0][1]}"
+        breaker = weather_api.breaker
+        breaker.open_seconds = 0
+        trip(breaker)
+        rejected = breaker.rejected
+        try:
+            results = await asyncio.gather(*(
+                weather_api._request(config.WEATHER_ENDPOINT, {'q': f"city {i}"}, "погоды") for i in range(5)
+            ))
+        finally:
+            await weather_api.http_client.close()
+            await runner.cleanup()
+        return weather_api, results, breaker.rejected - rejected
+
+    weather_api, results, rejected = asyncio.run(run())
+    assert len(received) == 1
+    assert sum(result is not None for result in results) == 1
+    assert rejected == 4
+    assert weather_api.keys.stats()['requests'] == 1
+    assert weather_api.breaker.state == CLOSED
+
+
+def test_primary_currency_api_opens_fails_over_and_recovers(monkeypatch):
+    monkeypatch.setattr(config, 'CURRENCY_API_KEYS', ['test-key'])
+    monkeypatch.setattr(config, 'BREAKER_MIN_CALLS', 3)
+    monkeypatch.setattr(config, 'BREAKER_OPEN_SECONDS', 0.2)
+    received = {'primary': 0, 'fallback': 0}
+    primary_status = [503]
+
+    async def primary(request):
+        received['primary'] += 1
+        if primary_status[0] != 200:
+            return web.json_response({'error': 'injected fault'}, status=primary_status[0])
+        return web.json_response({'base': 'USD', 'date': '2024-01-01', 'rates': {'RUB': 91.0}})
+
+    async def fallback(request):
+        received['fallback'] += 1
+        return web.json_response({'result': 90.0, 'date': '2024-01-01'})
+
+    async def run():
+        app = web.Application()
+        app.router.add_get('/primary/latest/{base}', primary)
+        app.router.add_get('/fallback/convert', fallback)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        await web.TCPSite(runner, '127.0.0.1', 0).start()
+        base_url = f"http://127.0.0.1:{runner.addresses[0][1]}"
+        currency_api = CurrencyAPI()
+        currency_api.base_url = f"{base_url}/primary"
+        currency_api.fallback_url = f"{base_url}/fallback"
+        breaker = currency_api.primary_breaker
+
+        async def rate():
+            result = await currency_api._fetch_exchange_rate('USD', 'RUB')
+            return result.rate if result else None
+
+        try:
+            # Основной API отвечает 503: каждый курс приходит из fallback, затем API отключается
+            assert [await rate() for _ in range(3)] == [90.0] * 3
+            assert breaker.state == OPEN and received['primary'] == 3
+
+            # Отключенный API не получает запросов, fallback отвечает сразу
+            assert [await rate() for _ in range(5)] == [90.0] * 5
+            assert received == {'primary': 3, 'fallback': 8}
+            assert breaker.rejected == 5
+
+            # Пробный запрос снова получает 503: API отключается еще раз
+            await asyncio.sleep(0.25)
+            assert await rate() == 90.0
+            assert breaker.state == OPEN and received['primary'] == 4
+
+            # Сбой прекратился: пробный запрос включает API
+            primary_status[0] = 200
+            await asyncio.sleep(0.25)
+            assert await rate() == 91.0
+            assert breaker.state == CLOSED
+            assert await rate() == 91.0
+            assert received['primary'] == 6 and breaker.trips == 2
+        finally:
+            await currency_api.http_client.close()
+            await runner.cleanup()
+
+    asyncio.run(run())
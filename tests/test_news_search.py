@@ -0,0 +1,82 @@
+import asyncio
+import threading
+import pytest
+from aiohttp import web
+import config
+from models import Article
+from news_api import NewsAPI
+from news_index import NewsIndex
+
+LOCAL = Article(title="Выборы в Москве", description="Итоги голосования", url="https://example.com/local",
+                published_at="2024-01-01T00:00:00Z", source="Локальный", stale_age=None)
+UPSTREAM = {
+    'title': "Выборы: новые итоги", 'description': "Свежие данные", 'url': "https://example.com/upstream",
+    'publishedAt': "2024-01-02T00:00:00Z", 'source': {'name': "News API"}
+}
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = NewsIndex(str(tmp_path / 'news.db'), max_articles=1000)
+    if not index.enabled:
+        pytest.skip("SQLite собран без FTS5")
+    index.add([(1, LOCAL)])
+    yield index
+    index.close()
+
+
+def search(index: NewsIndex, monkeypatch):
+    """Поиск "выборы" через NewsAPI с заглушкой News API; вернуть статьи и запросы к заглушке"""
+    monkeypatch.setattr(config, 'NEWS_API_KEYS', ['test-key'])
+    queried = []
+
+    async def handler(request):
+        queried.append(request.query['q'])
+        return web.json_response({'status': 'ok', 'articles': [UPSTREAM]})
+
+    async def run():
+        app = web.Application()
+        app.router.add_get('/everything', handler)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        await web.TCPSite(runner, '127.0.0.1', 0).start()
+        news_api = NewsAPI(index=index)
+        news_api.base_url = f"http://127.0.0.1:{runner.addresses[0][1]}"
+        try:
+            return await news_api.search_news("выборы")
+        finally:
+            await news_api.http_client.close()
+            await runner.cleanup()
+
+    return asyncio.run(run()), queried
+
+
+def test_fresh_index_answers_without_upstream(index, monkeypatch):
+    articles, queried = search(index, monkeypatch)
+    assert queried == []
+    assert [article.url for article in articles] == [LOCAL.url]
+
+
+def test_stale_index_falls_back_to_upstream(index, monkeypatch):
+    with index._conn:
+        index._conn.execute("UPDATE news_articles SET indexed_at = indexed_at - ?",
+                            (config.NEWS_INDEX_MAX_AGE + 60,))
+    articles, queried = search(index, monkeypatch)
+    assert queried == ["выборы"]
+    assert [article.url for article in articles] == [UPSTREAM['url']]
+    # Найденное в API попадает в индекс и отвечает на следующий поиск
+    assert index.search("выборы", 5)[0][0].url == UPSTREAM['url']
+
+
+def test_index_is_searched_off_the_event_loop(index, monkeypatch):
+    threads = []
+    search_index = index.search
+
+    def recording_search(query, limit):
+        threads.append(threading.get_ident())
+        return search_index(query, limit)
+
+    monkeypatch.setattr(index, 'search', recording_search)
+    articles, queried = search(index, monkeypatch)
+    assert [article.url for article in articles] == [LOCAL.url]
+    assert threads and threads[0] != threading.get_ident()
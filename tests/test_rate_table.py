@@ -0,0 +1,81 @@
+import asyncio
+import time
+import pytest
+import config
+from currency_api import CurrencyAPI
+from models import ExchangeRate
+from rate_table import RateTable
+
+# Курсы относительно USD: сколько единиц валюты за 1 USD
+RATES = {'RUB': 90.0, 'EUR': 0.9, 'ZERO': 0.0}
+
+
+def test_table_lookup():
+    table = RateTable('USD', '2024-01-01', RATES)
+    assert table.size == 3  # базовая валюта добавлена, нулевой курс отброшен
+    assert table.rate('usd', 'rub') == 90.0
+    assert table.rate('RUB', 'USD') == pytest.approx(1 / 90)
+    assert table.rate('USD', 'USD') == 1.0
+    assert table.rate('USD', 'ZERO') is None
+    assert table.rate('USD', 'GBP') is None
+
+
+def test_cross_rate_through_base_currency():
+    table = RateTable('USD', '2024-01-01', RATES)
+    assert table.rate('EUR', 'RUB') == pytest.approx(100.0)
+    assert table.rate('RUB', 'EUR') == pytest.approx(0.01)
+
+
+def test_staleness():
+    table = RateTable('USD', '2024-01-01', RATES, updated_at=time.monotonic() - 120)
+    assert table.age() >= 120
+    assert table.is_stale(60)
+    assert not table.is_stale(600)
+
+
+@pytest.fixture
+def currency_api(monkeypatch):
+    monkeypatch.setattr(config, 'RATE_TABLE_MAX_AGE', 60)
+    currency_api = CurrencyAPI()
+    currency_api.fetched = []
+    currency_api.api_rate = ExchangeRate(rate=91.0, date='2024-01-02', stale_age=None)
+
+    async def fetch(from_currency, to_currency):
+        currency_api.fetched.append((from_currency, to_currency))
+        return currency_api.api_rate
+
+    currency_api._fetch_exchange_rate = fetch
+    return currency_api
+
+
+def test_fresh_table_answers_without_network(currency_api):
+    currency_api.rate_table = RateTable('USD', '2024-01-01', RATES)
+    rate = asyncio.run(currency_api.get_exchange_rate('EUR', 'RUB'))
+    assert rate.rate == pytest.approx(100.0) and rate.stale_age is None
+    assert currency_api.fetched == []
+
+
+def test_stale_table_falls_back_to_api_and_cache(currency_api):
+    currency_api.rate_table = RateTable('USD', '2024-01-01', RATES, updated_at=time.monotonic() - 120)
+
+    async def run():
+        return [await currency_api.get_exchange_rate('USD', 'RUB') for _ in range(2)]
+
+    rates = asyncio.run(run())
+    assert [rate.rate for rate in rates] == [91.0, 91.0]
+    assert currency_api.fetched == [('USD', 'RUB')]  # второй ответ из кэша
+
+
+def test_currency_missing_from_table_goes_to_api(currency_api):
+    currency_api.rate_table = RateTable('USD', '2024-01-01', RATES)
+    assert asyncio.run(currency_api.get_exchange_rate('USD', 'GBP')).rate == 91.0
+    assert currency_api.fetched == [('USD', 'GBP')]
+
+
+def test_stale_table_is_used_when_api_is_down(currency_api):
+    currency_api.rate_table = RateTable('USD', '2024-01-01', RATES, updated_at=time.monotonic() - 120)
+    currency_api.api_rate = None
+    rate = asyncio.run(currency_api.get_exchange_rate('USD', 'RUB'))
+    assert rate.rate == 90.0
+    assert rate.date == '2024-01-01'
+    assert rate.stale_age >= 120
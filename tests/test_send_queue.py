@@ -0,0 +1,140 @@
+import asyncio
+import time
+from telegram.error import RetryAfter
+from send_queue import PRIORITY_BULK, OutboundDispatcher
+
+
+def make_dispatcher(**overrides) -> OutboundDispatcher:
+    settings = dict(global_rate=50, chat_rate=10, chat_burst=1, group_rate_per_minute=60,
+                    max_retries=3, max_chat_buckets=100)
+    settings.update(overrides)
+    return OutboundDispatcher(**settings)
+
+
+def send(dispatcher: OutboundDispatcher, chat_id: int, callback, priority=None):
+    """Запрос к Bot API через очередь, как его делает ExtBot"""
+    return dispatcher.process_request(callback, (), {}, 'sendMessage', {'chat_id': chat_id}, priority)
+
+
+def test_user_replies_are_sent_before_digests():
+    sent = []
+
+    def message(name):
+        async def callback():
+            sent.append(name)
+            return name
+        return callback
+
+    async def run():
+        dispatcher = make_dispatcher()
+        await dispatcher.initialize()
+        dispatcher.global_bucket.drain()  # очередь успевает накопиться
+        try:
+            await asyncio.gather(
+                *(send(dispatcher, chat_id, message(f"сводка {chat_id}"), PRIORITY_BULK) for chat_id in range(1, 6)),
+                send(dispatcher, 10, message("ответ"))
+            )
+        finally:
+            await dispatcher.shutdown()
+        return dispatcher
+
+    dispatcher = asyncio.run(run())
+    assert sent[0] == "ответ"
+    assert sorted(sent[1:]) == [f"сводка {chat_id}" for chat_id in range(1, 6)]
+    assert dispatcher.stats()['sent'] == 6
+
+
+def test_messages_to_one_chat_are_spaced_and_ordered():
+    sent = []
+
+    def message(number):
+        async def callback():
+            sent.append((number, time.monotonic()))
+        return callback
+
+    async def run():
+        dispatcher = make_dispatcher(chat_rate=10, chat_burst=1)
+        await dispatcher.initialize()
+        try:
+            await asyncio.gather(*(send(dispatcher, 1, message(number)) for number in range(3)))
+        finally:
+            await dispatcher.shutdown()
+
+    asyncio.run(run())
+    assert [number for number, _ in sent] == [0, 1, 2]
+    gaps = [later - earlier for (_, earlier), (_, later) in zip(sent, sent[1:])]
+    assert all(gap >= 0.09 for gap in gaps)
+
+
+def test_retry_after_pauses_chat_and_repeats_request():
+    calls = []
+
+    async def callback():
+        calls.append(time.monotonic())
+        if len(calls) == 1:
+            raise RetryAfter(0.2)
+        return "ok"
+
+    async def run():
+        dispatcher = make_dispatcher(chat_burst=3)
+        await dispatcher.initialize()
+        try:
+            return dispatcher, await send(dispatcher, 1, callback)
+        finally:
+            await dispatcher.shutdown()
+
+    dispatcher, result = asyncio.run(run())
+    assert result == "ok"
+    assert len(calls) == 2 and calls[1] - calls[0] >= 0.19
+    assert dispatcher.stats()['retried'] == 1
+
+
+def test_retry_after_for_cancelled_caller_does_not_break_dispatcher():
+    async def run():
+        in_callback = asyncio.Event()
+
+        async def callback():
+            in_callback.set()
+            await asyncio.sleep(0.05)
+            raise RetryAfter(0.01)
+
+        dispatcher = make_dispatcher(max_retries=0)
+        await dispatcher.initialize()
+        try:
+            caller = asyncio.ensure_future(send(dispatcher, 1, callback))
+            await in_callback.wait()
+            sending = set(dispatcher._sending)
+            caller.cancel()
+            await asyncio.gather(*sending, return_exceptions=True)
+            # Диспетчер продолжает отправлять
+            assert await send(dispatcher, 2, lambda: asyncio.sleep(0, "ok")) == "ok"
+        finally:
+            await dispatcher.shutdown()
+        return dispatcher, sending
+
+    dispatcher, sending = asyncio.run(run())
+    assert all(task.exception() is None for task in sending)
+    assert dispatcher.stats()['failed'] == 1
+
+
+def test_shutdown_waits_for_messages_in_flight():
+    delivered = []
+
+    async def callback():
+        await asyncio.sleep(0.05)
+        delivered.append(True)
+        return "ok"
+
+    async def run():
+        dispatcher = make_dispatcher()
+        await dispatcher.initialize()
+        caller = asyncio.ensure_future(send(dispatcher, 1, callback))
+        while not dispatcher._sending:
+            await asyncio.sleep(0)
+        await dispatcher.shutdown()
+        delivered_on_shutdown = list(delivered)
+        return delivered_on_shutdown, await caller
+
+    delivered_on_shutdown, result = asyncio.run(run())
+    assert delivered_on_shutdown == [True]
+    assert result == "ok"
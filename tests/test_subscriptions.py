@@ -0,0 +1,24 @@
+import pytest
+from subscriptions import CURRENCY, WEATHER, SubscriptionStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = SubscriptionStore(str(tmp_path / 'subscriptions.db'))
+    yield store
+    store.close()
+
+
+def test_resubscribe_changes_hour_without_new_row(store):
+    store.add(1, WEATHER, 'moscow,ru', 'ru', 'metric', 8)
+    assert store.has(1, WEATHER, 'moscow,ru')
+    assert not store.has(1, WEATHER, 'bern')
+    assert not store.has(2, WEATHER, 'moscow,ru')
+
+    store.add(1, WEATHER, 'moscow,ru', 'ru', 'metric', 9)
+    assert store.for_chat(1) == [(WEATHER, 'moscow,ru', 9)]
+
+
+def test_has_ignores_language_and_units_for_other_kinds(store):
+    store.add(1, CURRENCY, 'USD/RUB', 'en', 'imperial', 9)
+    assert store.has(1, CURRENCY, 'USD/RUB')
@@ -0,0 +1,70 @@
+import asyncio
+from datetime import datetime, timezone
+from telegram import Chat, Message, Update
+from update_processor import ChatOrderedUpdateProcessor
+
+
+def make_update(update_id: int, chat_id: int) -> Update:
+    chat = Chat(chat_id, Chat.PRIVATE)
+    return Update(update_id, message=Message(update_id, datetime.now(timezone.utc), chat, text="Москва"))
+
+
+def process(processor: ChatOrderedUpdateProcessor, chats, duration: float = 0.05):
+    """Обработать по обновлению на каждый чат из chats; вернуть (чат, начало, конец) и пик одновременных"""
+    spans = []
+    running = 0
+    peak = 0
+
+    async def handle(chat_id: int):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        started = asyncio.get_running_loop().time()
+        await asyncio.sleep(duration)
+        spans.append((chat_id, started, asyncio.get_running_loop().time()))
+        running -= 1
+
+    async def run():
+        await asyncio.gather(*(
+            processor.process_update(make_update(number, chat_id), handle(chat_id))
+            for number, chat_id in enumerate(chats)
+        ))
+
+    asyncio.run(run())
+    return spans, peak
+
+
+def test_updates_of_one_chat_run_in_order():
+    processor = ChatOrderedUpdateProcessor(10)
+    spans, peak = process(processor, [1, 1, 1])
+    assert peak == 1
+    starts = [started for _, started, _ in spans]
+    assert starts == sorted(starts)
+    assert all(later[1] >= earlier[2] for earlier, later in zip(spans, spans[1:]))
+
+
+def test_updates_of_different_chats_overlap():
+    processor = ChatOrderedUpdateProcessor(10)
+    spans, peak = process(processor, [1, 2, 3])
+    assert peak == 3
+    # Второй чат начался раньше, чем закончился первый
+    assert spans[1][1] < spans[0][2]
+
+
+def test_concurrency_is_capped_by_semaphore():
+    processor = ChatOrderedUpdateProcessor(2)
+    _, peak = process(processor, [1, 2, 3, 4, 5])
+    assert peak == 2
+    stats = processor.stats()
+    assert stats['processed'] == 5
+    assert stats['queue_depth'] == 0 and stats['active'] == 0 and stats['chats_waiting'] == 0
+    assert processor._chat_locks == {}
+
+
+def test_wait_metrics_count_time_before_processing():
+    processor = ChatOrderedUpdateProcessor(1)
+    process(processor, [1, 2], duration=0.1)
+    stats = processor.stats()
+    # Первое обновление обрабатывается сразу, второе ждет слот ~100 мс
+    assert 90 <= stats['max_wait_ms'] < 200
+    assert 45 <= stats['avg_wait_ms'] < 100
@@ -0,0 +1,168 @@
+import asyncio
+import pytest
+from aiohttp import web
+import config
+from weather_api import WeatherAPI
+
+# Реальные города, которых нет в cities.txt, но которые похожи на города из него
+UNLISTED_CITIES = [
+    "Bern", "Rotterdam", "Gothenburg", "Ногинск", "Зеленодольск",
+    "Нефтекамск", "Ленинск", "Нижний Тагил", "Новокуйбышевск",
+]
+
+
+@pytest.fixture
+def weather_api(monkeypatch):
+    monkeypatch.setattr(config, 'OPENWEATHER_API_KEYS', ['test-key'])
+    return WeatherAPI()
+
+
+@pytest.mark.parametrize("city", UNLISTED_CITIES)
+def test_unlisted_city_is_not_rewritten(weather_api, city):
+    assert weather_api.known_city(city) is None
+    assert weather_api.resolve_city(city) == city
+
+
+def test_synonym_resolves_to_canonical_city(weather_api):
+    assert weather_api.known_city("Питер").name == "Санкт-Петербург"
+
+
+def test_suggestions_are_only_hints(weather_api):
+    names = [city.name for city in weather_api.suggest_cities("Масква")]
+    assert "Москва" in names
+    assert weather_api.resolve_city("Масква") == "Масква"
+
+
+def test_unlisted_cities_are_queried_as_typed(weather_api):
+    queried = []
+
+    async def handler(request):
+        queried.append(request.query['q'])
+        return web.json_response({
+            'id': len(queried), 'name': request.query['q'], 'sys': {'country': 'XX'},
+            'weather': [{'description': 'ясно', 'icon': '01d'}],
+            'main': {'temp': 20, 'feels_like': 19, 'humidity': 50, 'pressure': 1013}
+        })
+
+    async def run():
+        app = web.Application()
+        app.router.add_get('/weather', handler)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, '127.0.0.1', 0)
+        await site.start()
+        port = runner.addresses[0][1]
+        weather_api.base_url = f"http://127.0.0.1:{port}"
+        try:
+            return [await weather_api.get_current_weather(city) for city in UNLISTED_CITIES]
+        finally:
+            await weather_api.http_client.close()
+            await runner.cleanup()
+
+    results = asyncio.run(run())
+    assert queried == UNLISTED_CITIES
+    assert [weather.city for weather in results] == UNLISTED_CITIES
+
+
+def test_city_name_from_stored_key(weather_api):
+    assert weather_api.city_name(weather_api.city_key("Питер")) == "Санкт-Петербург"
+    assert weather_api.city_name(weather_api.city_key("Москва")) == "Москва"
+    assert weather_api.city_name(weather_api.city_key("Bern")) == "Bern"
+    assert weather_api.city_name("bern,ch") == "Bern, CH"
+
+
+def test_unfinished_name_is_completed(weather_api):
+    assert [city.name for city in weather_api.suggest_cities("Екатеринбур")] == ["Екатеринбург"]
+    assert weather_api.suggest_cities("Мо") == []
+
+
+class FakeMessage:
+    def __init__(self, text: str = ""):
+        self.text = text
+        self.replies = []
+
+    async def reply_text(self, text, **kwargs):
+        self.replies.append((text, kwargs))
+        return FakeMessage(text)
+
+    async def edit_text(self, text, **kwargs):
+        self.text = text
+
+
+class FakeQuery:
+    def __init__(self, data: str):
+        self.data = data
+        self.from_user = FakeUser()
+        self.edits = []
+
+    async def answer(self):
+        pass
+
+    async def edit_message_text(self, text, **kwargs):
+        self.edits.append(text)
+
+
+class FakeUser:
+    id = 1
+
+
+class FakeUpdate:
+    def __init__(self, message=None, callback_query=None):
+        self.message = message
+        self.callback_query = callback_query
+        self.effective_user = FakeUser()
+
+
+class FakeContext:
+    def __init__(self):
+        self.user_data = {}
+
+
+@pytest.fixture
+def bot(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, 'OPENWEATHER_API_KEYS', ['test-key'])
+    monkeypatch.setattr(config, 'USER_DB_PATH', str(tmp_path / 'bot.db'))
+    monkeypatch.setattr(config, 'CACHE_DB_PATH', str(tmp_path / 'cache.db'))
+    monkeypatch.setattr(config, 'NEWS_INDEX_DB_PATH', str(tmp_path / 'news.db'))
+    from advanced_bot import AdvancedWeatherBot
+    bot = AdvancedWeatherBot()
+    queried = []
+
+    async def get_current_weather(city, language=None, units=None, refresh=False):
+        queried.append(city)
+        return None
+
+    bot.weather_api.get_current_weather = get_current_weather
+    bot.queried = queried
+    return bot
+
+
+def test_typo_asks_before_querying_api(bot):
+    context = FakeContext()
+    message = FakeMessage("Масква")
+
+    async def run():
+        await bot.handle_message(FakeUpdate(message), context)
+        assert bot.queried == []
+        text, kwargs = message.replies[0]
+        buttons = [row[0] for row in kwargs['reply_markup'].inline_keyboard]
+        assert buttons[0].text == "📍 Москва"
+        assert buttons[-1].callback_data == "weather_asis_current"
+
+        # Выбранный город запрашивается без повторного вопроса
+        await bot.handle_callback(FakeUpdate(callback_query=FakeQuery(buttons[0].callback_data)), context)
+        assert bot.queried == ["Москва"]
+        # Название как написано - тоже
+        await bot.handle_callback(FakeUpdate(callback_query=FakeQuery("weather_asis_current")), context)
+        assert bot.queried == ["Москва", "Масква"]
+
+    asyncio.run(run())
+
+
+def test_listed_and_unrelated_cities_are_queried_directly(bot):
+    async def run():
+        for city in ("Питер", "Zzyzx"):
+            await bot.handle_message(FakeUpdate(FakeMessage(city)), FakeContext())
+
+    asyncio.run(run())
+    assert bot.queried == ["Санкт-Петербург", "Zzyzx"]
@@ -0,0 +1,28 @@
+import config
+from webhook import run_webhook
+
+
+class FakeApplication:
+    def __init__(self):
+        self.webhook_kwargs = None
+
+    def run_webhook(self, **kwargs):
+        self.webhook_kwargs = kwargs
+
+
+def test_webhook_refuses_to_start_without_secret(monkeypatch):
+    monkeypatch.setattr(config, 'WEBHOOK_URL', 'https://bot.example.com')
+    monkeypatch.setattr(config, 'WEBHOOK_SECRET', None)
+    application = FakeApplication()
+    assert not run_webhook(application)
+    assert application.webhook_kwargs is None
+
+
+def test_webhook_checks_secret_token(monkeypatch):
+    monkeypatch.setattr(config, 'WEBHOOK_URL', 'https://bot.example.com/')
+    monkeypatch.setattr(config, 'WEBHOOK_SECRET', 'secret')
+    monkeypatch.setattr(config, 'WEBHOOK_PATH', 'telegram')
+    application = FakeApplication()
+    assert run_webhook(application)
+    assert application.webhook_kwargs['secret_token'] == 'secret'
+    assert application.webhook_kwargs['webhook_url'] == 'https://bot.example.com/telegram'
@@ -0,0 +1,90 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Dict, Optional
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+class ChatOrderedUpdateProcessor(BaseUpdateProcessor):
+    """Параллельная обработка обновлений с сохранением порядка внутри чата.
+
+    Обновления разных чатов обрабатываются одновременно (не больше
+    max_concurrent_updates), обновления одного чата - строго по очереди.
+    Очередь чата проходится до захвата общего лимита, чтобы один
+    активный чат не занимал все слоты, поэтому process_update переопределен.
+    """
+
+    def __init__(self, max_concurrent_updates: int):
+        super().__init__(max_concurrent_updates)
+        self._chat_locks: Dict[int, asyncio.Lock] = {}
+        self._chat_pending: Dict[int, int] = {}
+        self.pending = 0
+        self.active = 0
+        self.processed = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    async def process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        """Дождаться своей очереди в чате и свободного слота, затем обработать"""
+        received_at = time.monotonic()
+        chat_id = self._get_chat_id(update)
+        self.pending += 1
+        try:
+            if chat_id is None:
+                async with self._semaphore:
+                    await self._run(received_at, update, coroutine)
+                return
+
+            lock = self._chat_locks.get(chat_id)
+            if lock is None:
+                lock = self._chat_locks[chat_id] = asyncio.Lock()
+            self._chat_pending[chat_id] = self._chat_pending.get(chat_id, 0) + 1
+            try:
+                async with lock:
+                    async with self._semaphore:
+                        await self._run(received_at, update, coroutine)
+            finally:
+                self._chat_pending[chat_id] -= 1
+                if not self._chat_pending[chat_id]:
+                    del self._chat_pending[chat_id]
+                    del self._chat_locks[chat_id]
+        finally:
+            self.pending -= 1
+
+    async def _run(self, received_at: float, update: object, coroutine: Awaitable[Any]):
+        """Учесть время ожидания и обработать обновление"""
+        wait = time.monotonic() - received_at
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+        self.active += 1
+        try:
+            await self.do_process_update(update, coroutine)
+        finally:
+            self.active -= 1
+            self.processed += 1
+
+    async def do_process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        await coroutine
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
+
+    @staticmethod
+    def _get_chat_id(update: object) -> Optional[int]:
+        """ID чата, к которому относится обновление"""
+        if isinstance(update, Update) and update.effective_chat:
+            return update.effective_chat.id
+        return None
+
+    def stats(self) -> Dict[str, float]:
+        """Метрики очереди обновлений"""
+        return {
+            'queue_depth': self.pending - self.active,
+            'active': self.active,
+            'chats_waiting': len(self._chat_pending),
+            'processed': self.processed,
+            'avg_wait_ms': round(self.total_wait / self.processed * 1000, 1) if self.processed else 0.0,
+            'max_wait_ms': round(self.max_wait * 1000, 1)
+        }
@@ -0,0 +1,89 @@
+import sqlite3
+from collections import OrderedDict
+from dataclasses import dataclass, replace
+from typing import Dict
+import config
+
+@dataclass(frozen=True)
+class UserSettings:
+    """Настройки пользователя"""
+    __slots__ = ('language', 'units')
+    language: str
+    units: str
+
+    def with_language(self, language: str) -> "UserSettings":
+        """Копия настроек с другим языком"""
+        return replace(self, language=language)
+
+    def with_units(self, units: str) -> "UserSettings":
+        """Копия настроек с другими единицами измерения"""
+        return replace(self, units=units)
+
+
+DEFAULT_SETTINGS = UserSettings(config.DEFAULT_LANGUAGE, config.DEFAULT_UNITS)
+
+# Комбинаций настроек немного, поэтому все пользователи делят одни и те же объекты
+_interned: Dict[UserSettings, UserSettings] = {DEFAULT_SETTINGS: DEFAULT_SETTINGS}
+
+
+def _intern(settings: UserSettings) -> UserSettings:
+    """Один объект на каждую комбинацию настроек"""
+    return _interned.setdefault(settings, settings)
+
+
+class UserSettingsStore:
+    """Хранилище настроек пользователей в SQLite с LRU кэшем в памяти.
+
+    В базу попадают только пользователи, менявшие настройки; остальные
+    получают общий объект DEFAULT_SETTINGS.
+    """
+
+    def __init__(self, path: str, max_cached: int = 100000):
+        self.max_cached = max_cached
+        self._cache: "OrderedDict[int, UserSettings]" = OrderedDict()
+        self._conn = sqlite3.connect(path)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS user_settings ("
+            " user_id INTEGER PRIMARY KEY,"
+            " language TEXT NOT NULL,"
+            " units TEXT NOT NULL"
+            ")"
+        )
+        self._conn.commit()
+
+    def get(self, user_id: int) -> UserSettings:
+        """Получить настройки пользователя"""
+        settings = self._cache.get(user_id)
+        if settings is not None:
+            self._cache.move_to_end(user_id)
+            return settings
+
+        row = self._conn.execute(
+            "SELECT language, units FROM user_settings WHERE user_id = ?", (user_id,)
+        ).fetchone()
+        settings = _intern(UserSettings(*row)) if row else DEFAULT_SETTINGS
+        self._remember(user_id, settings)
+        return settings
+
+    def set(self, user_id: int, settings: UserSettings):
+        """Сохранить настройки пользователя"""
+        if settings == DEFAULT_SETTINGS:
+            self._conn.execute("DELETE FROM user_settings WHERE user_id = ?", (user_id,))
+        else:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO user_settings (user_id, language, units) VALUES (?, ?, ?)",
+                (user_id, settings.language, settings.units)
+            )
+        self._conn.commit()
+        self._remember(user_id, _intern(settings))
+
+    def _remember(self, user_id: int, settings: UserSettings):
+        """Положить настройки в LRU кэш"""
+        self._cache[user_id] = settings
+        self._cache.move_to_end(user_id)
+        while len(self._cache) > self.max_cached:
+            self._cache.popitem(last=False)
+
+    def close(self):
+        """Закрыть хранилище"""
+        self._conn.close()
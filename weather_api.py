@@ -1,145 +1,415 @@
-import aiohttp
 import asyncio
+from datetime import date
 from typing import Dict, Optional, List
 import config
+from http_client import HttpClient
+from cache import CachedFetcher, TTLCache
+from cache_store import CacheStore
+from rate_limiter import UpstreamLimiter
+from api_keys import ApiKeyPool
+from gazetteer import City, load_gazetteer, normalize_name
+from geo import snap_to_grid
+from json_utils import loads
+from models import CurrentWeather, DailyForecast, Forecast
+
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+# Эмодзи для кодов иконок OpenWeatherMap
+WEATHER_EMOJI = {
+    '01d': '☀️',  # ясно днем
+    '01n': '🌙',  # ясно ночью
+    '02d': '⛅',  # малооблачно днем
+    '02n': '☁️',  # малооблачно ночью
+    '03d': '☁️',  # облачно
+    '03n': '☁️',
+    '04d': '☁️',  # пасмурно
+    '04n': '☁️',
+    '09d': '🌧️',  # дождь
+    '09n': '🌧️',
+    '10d': '🌦️',  # дождь с солнцем
+    '10n': '🌧️',
+    '11d': '⛈️',  # гроза
+    '11n': '⛈️',
+    '13d': '❄️',  # снег
+    '13n': '❄️',
+    '50d': '🌫️',  # туман
+    '50n': '🌫️'
+}
+
+
+class _DayStats:
+    """Накопитель дневной сводки прогноза"""
+    __slots__ = ('temp_min', 'temp_max', 'temp_sum', 'count', 'precipitation', 'noon_distance', 'noon')
+
+    def __init__(self, temp: float, precipitation: float, noon_distance: int, item: Dict):
+        self.temp_min = self.temp_max = self.temp_sum = temp
+        self.count = 1
+        self.precipitation = precipitation
+        self.noon_distance = noon_distance
+        self.noon = item
+
+    def add(self, temp: float, precipitation: float, noon_distance: int, item: Dict):
+        if temp < self.temp_min:
+            self.temp_min = temp
+        elif temp > self.temp_max:
+            self.temp_max = temp
+        self.temp_sum += temp
+        self.count += 1
+        self.precipitation += precipitation
+        if noon_distance < self.noon_distance:
+            self.noon_distance = noon_distance
+            self.noon = item
+
 
 class WeatherAPI:
     """Класс для работы с OpenWeatherMap API"""
     
-    def __init__(self):
-        self.api_key = config.OPENWEATHER_API_KEY
+    def __init__(self, http_client: Optional[HttpClient] = None, cache_store: Optional[CacheStore] = None):
+        self.http_client = http_client or HttpClient()
         self.base_url = config.OPENWEATHER_BASE_URL
-        self.language = config.DEFAULT_LANGUAGE
-        self.units = config.DEFAULT_UNITS
+        self.breaker = self.http_client.breaker("openweathermap")
+        self.cache = CachedFetcher(
+            max_entries=config.WEATHER_CACHE_MAX_ENTRIES,
+            stale_ttl=config.CACHE_STALE_TTL,
+            stale_while_revalidate=config.STALE_WHILE_REVALIDATE,
+            name="weather",
+            store=cache_store
+        )
+        self.keys = ApiKeyPool(
+            "openweathermap", config.OPENWEATHER_API_KEYS, config.OPENWEATHER_DAILY_QUOTA,
+            auth_cooldown=config.API_KEY_AUTH_COOLDOWN,
+            throttle_cooldown=config.API_KEY_THROTTLE_COOLDOWN
+        )
+        # Общие лимиты сервиса растут с числом ключей
+        key_count = max(len(self.keys), 1)
+        self.limiter = UpstreamLimiter(
+            "openweathermap",
+            per_minute=config.OPENWEATHER_RATE_PER_MINUTE * key_count,
+            per_day=config.OPENWEATHER_DAILY_QUOTA * key_count,
+            max_wait=config.UPSTREAM_MAX_WAIT,
+            tight_ratio=config.QUOTA_TIGHT_RATIO
+        )
+        # ID городов OpenWeatherMap, узнанные из ответов (нужны для пакетных запросов)
+        self.city_ids = TTLCache(max_entries=config.WEATHER_CITY_IDS_MAX_ENTRIES)
+        # Офлайн справочник городов: синонимы и исправление опечаток без запросов к API
+        self.gazetteer = load_gazetteer(config.GAZETTEER_PATH)
     
-    async def get_current_weather(self, city: str) -> Optional[Dict]:
+    async def get_current_weather(self, city: str, language: Optional[str] = None, units: Optional[str] = None,
+                                  refresh: bool = False) -> Optional[CurrentWeather]:
         """Получить текущую погоду в городе"""
-        if not self.api_key:
+        language = language or config.DEFAULT_LANGUAGE
+        units = units or config.DEFAULT_UNITS
+        city = self.resolve_city(city)
+        key = self._cache_key('weather', city, language, units)
+        return await self.cache.get(
+            key, config.WEATHER_CACHE_TTL,
+            lambda: self._fetch_current_weather(city, language, units),
+            refresh=refresh,
+            prefer_stale=self.limiter.is_tight()
+        )
+    
+    async def get_forecast(self, city: str, language: Optional[str] = None, units: Optional[str] = None,
+                           refresh: bool = False) -> Optional[Forecast]:
+        """Получить прогноз погоды на 5 дней"""
+        language = language or config.DEFAULT_LANGUAGE
+        units = units or config.DEFAULT_UNITS
+        city = self.resolve_city(city)
+        key = self._cache_key('forecast', city, language, units)
+        return await self.cache.get(
+            key, config.FORECAST_CACHE_TTL,
+            lambda: self._fetch_forecast(city, language, units),
+            refresh=refresh,
+            prefer_stale=self.limiter.is_tight()
+        )
+    
+    async def get_current_weather_at(self, lat: float, lon: float, language: Optional[str] = None,
+                                     units: Optional[str] = None, refresh: bool = False) -> Optional[CurrentWeather]:
+        """Получить текущую погоду по координатам (с привязкой к сетке geohash)"""
+        language = language or config.DEFAULT_LANGUAGE
+        units = units or config.DEFAULT_UNITS
+        cell, lat, lon = snap_to_grid(lat, lon, config.GEO_CELL_PRECISION)
+        return await self.cache.get(
+            ('weather_geo', cell, language, units), config.WEATHER_CACHE_TTL,
+            lambda: self._fetch_current_weather_at(lat, lon, language, units),
+            refresh=refresh,
+            prefer_stale=self.limiter.is_tight()
+        )
+    
+    async def get_forecast_at(self, lat: float, lon: float, language: Optional[str] = None,
+                              units: Optional[str] = None, refresh: bool = False) -> Optional[Forecast]:
+        """Получить прогноз погоды по координатам (с привязкой к сетке geohash)"""
+        language = language or config.DEFAULT_LANGUAGE
+        units = units or config.DEFAULT_UNITS
+        cell, lat, lon = snap_to_grid(lat, lon, config.GEO_CELL_PRECISION)
+        return await self.cache.get(
+            ('forecast_geo', cell, language, units), config.FORECAST_CACHE_TTL,
+            lambda: self._fetch_forecast_at(lat, lon, language, units),
+            refresh=refresh,
+            prefer_stale=self.limiter.is_tight()
+        )
+    
+    async def get_current_weather_many(self, cities: List[str], language: Optional[str] = None,
+                                       units: Optional[str] = None) -> Dict[str, Optional[CurrentWeather]]:
+        """Получить текущую погоду сразу в нескольких городах.
+        
+        Города с известными ID запрашиваются пачками через /group,
+        остальные - параллельно по одному (с ограничением одновременных запросов).
+        """
+        language = language or config.DEFAULT_LANGUAGE
+        units = units or config.DEFAULT_UNITS
+        results: Dict[str, Optional[CurrentWeather]] = {}
+        cities_by_id: Dict[int, List[str]] = {}
+        single = []
+        
+        for city in cities:
+            cached = self.cache.peek(self._cache_key('weather', city, language, units))
+            if cached is not None:
+                results[city] = cached
+                continue
+            city_id = self.city_ids.get(self.city_key(city))
+            if city_id:
+                cities_by_id.setdefault(city_id, []).append(city)
+            else:
+                single.append(city)
+        
+        async def fetch_group(chunk: List[int]):
+            group = await self._fetch_group(chunk, language, units) or {}
+            for city_id in chunk:
+                weather = group.get(city_id)
+                if weather is None:
+                    single.extend(cities_by_id[city_id])
+                    continue
+                for city in cities_by_id[city_id]:
+                    self.cache.put(self._cache_key('weather', city, language, units), weather, config.WEATHER_CACHE_TTL)
+                    results[city] = weather
+        
+        ids = list(cities_by_id)
+        await asyncio.gather(*(
+            fetch_group(ids[start:start + config.WEATHER_GROUP_SIZE])
+            for start in range(0, len(ids), config.WEATHER_GROUP_SIZE)
+        ))
+        
+        semaphore = asyncio.Semaphore(config.WEATHER_BATCH_CONCURRENCY)
+        
+        async def fetch_single(city: str):
+            async with semaphore:
+                results[city] = await self.get_current_weather(city, language, units)
+        
+        await asyncio.gather(*(fetch_single(city) for city in single))
+        return {city: results.get(city) for city in cities}
+    
+    def _cache_key(self, kind: str, city: str, language: str, units: str) -> tuple:
+        """Ключ кэша: тип запроса, нормализованный город, язык и единицы"""
+        return (kind, self.city_key(city), language, units)
+    
+    @staticmethod
+    def normalize_city(city: str) -> str:
+        """Нормализовать название города (регистр, пробелы, дефисы, ё/е)"""
+        return normalize_name(city)
+    
+    def city_key(self, city: str) -> str:
+        """Ключ города: синонимы из справочника (СПб, Питер) дают один ключ"""
+        return self.normalize_city(self.resolve_city(city))
+    
+    def resolve_city(self, city: str) -> str:
+        """Каноническое название города для запроса (неизвестные названия - как есть)"""
+        if self.gazetteer:
+            known = self.gazetteer.resolve(city)
+            if known:
+                return known.query
+        return city
+    
+    def city_name(self, key: str) -> str:
+        """Название города для пользователя по ключу города ("moscow,ru" - Москва)"""
+        name, _, country = key.partition(',')
+        known = self.known_city(name)
+        if known and (not country or known.country.lower() == country.strip()):
+            return known.name
+        return name.title() + (f", {country.strip().upper()}" if country else "")
+    
+    def known_city(self, city: str) -> Optional[City]:
+        """Город из справочника по точному названию или синониму"""
+        if not self.gazetteer:
+            return None
+        return self.gazetteer.resolve(city)
+    
+    def city_by_id(self, city_id: int) -> Optional[City]:
+        """Город из справочника по номеру (для кнопок выбора города)"""
+        if not self.gazetteer or not 0 <= city_id < len(self.gazetteer):
+            return None
+        return self.gazetteer.city(city_id)
+    
+    def suggest_cities(self, city: str) -> List[City]:
+        """Похожие города из справочника для подсказки "возможно, вы имели в виду".
+        
+        Сначала города, название которых начинается с введенного текста
+        (недописанное "Екатеринбур"), затем похожие по триграммам. Название
+        запроса не заменяется: справочник небольшой, и похожее название
+        часто оказывается другим реальным городом (Bern - Берлин).
+        """
+        if not self.gazetteer:
+            return []
+        limit = config.GAZETTEER_SUGGESTIONS
+        cities = {}
+        if len(normalize_name(city)) >= config.GAZETTEER_MIN_PREFIX:
+            cities.update((known.id, known) for known in self.gazetteer.complete(city, limit))
+        for known, _ in self.gazetteer.suggest(city, limit, min_score=config.GAZETTEER_MIN_SCORE):
+            cities.setdefault(known.id, known)
+        return list(cities.values())[:limit]
+    
+    async def _request(self, endpoint: str, params: Dict, what: str) -> Optional[Dict]:
+        """GET запрос к OpenWeatherMap с учетом лимитов и ротации ключей"""
+        if not self.keys:
+            return None
+        api_key = await self._reserve_key()
+        if api_key is None:
             return None
             
-        url = f"{self.base_url}{config.WEATHER_ENDPOINT}"
-        params = {
-            'q': city,
-            'appid': self.api_key,
-            'lang': self.language,
-            'units': self.units
-        }
+        url = f"{self.base_url}{endpoint}"
+        params = {**params, 'appid': api_key}
         
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, params=params) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        return self._format_current_weather(data)
-                    else:
-                        return None
+            status, body = await self.http_client.fetch(url, params, self.breaker)
+            self.keys.report(api_key, status)
+            if status == 200:
+                return loads(body)
+            if status == 429:
+                self.limiter.report_throttled()
+            return None
         except Exception as e:
-            print(f"Ошибка при получении погоды: {e}")
+            print(f"Ошибка при получении {what}: {e}")
             return None
     
-    async def get_forecast(self, city: str) -> Optional[Dict]:
-        """Получить прогноз погоды на 5 дней"""
-        if not self.api_key:
+    async def _reserve_key(self) -> Optional[str]:
+        """Разрешение breaker, токен лимитера и ключ для одного запроса.
+        
+        Без рабочих ключей (все получили 401/429) и при отключенном API
+        (и занятом пробном запросе) запрос отклоняется до траты токена и
+        квоты. Если ключ исключили, пока запрос ждал токена, токен
+        возвращается лимитеру; без токена или ключа возвращается и
+        разрешение breaker.
+        """
+        if not self.keys.available() or not self.breaker.allow():
             return None
-            
-        url = f"{self.base_url}{config.FORECAST_ENDPOINT}"
+        api_key = None
+        try:
+            if await self.limiter.acquire():
+                api_key = self.keys.acquire()
+                if api_key is None:
+                    self.limiter.refund()
+        finally:
+            if api_key is None:
+                self.breaker.release()
+        return api_key
+    
+    async def _fetch_current_weather(self, city: str, language: str, units: str) -> Optional[CurrentWeather]:
+        """Запросить текущую погоду у OpenWeatherMap"""
+        params = {'q': city, 'lang': language, 'units': units}
+        data = await self._request(config.WEATHER_ENDPOINT, params, "погоды")
+        if data is None:
+            return None
+        weather = self._format_current_weather(data)
+        if weather and weather.city_id:
+            self.city_ids.set(self.city_key(city), weather.city_id, config.WEATHER_CITY_IDS_TTL)
+        return weather
+    
+    async def _fetch_current_weather_at(self, lat: float, lon: float, language: str, units: str) -> Optional[CurrentWeather]:
+        """Запросить текущую погоду по координатам"""
+        params = {'lat': lat, 'lon': lon, 'lang': language, 'units': units}
+        data = await self._request(config.WEATHER_ENDPOINT, params, "погоды по координатам")
+        return self._format_current_weather(data) if data is not None else None
+    
+    async def _fetch_forecast(self, city: str, language: str, units: str) -> Optional[Forecast]:
+        """Запросить прогноз погоды у OpenWeatherMap"""
+        params = {'q': city, 'lang': language, 'units': units}
+        data = await self._request(config.FORECAST_ENDPOINT, params, "прогноза")
+        return self._format_forecast(data) if data is not None else None
+    
+    async def _fetch_forecast_at(self, lat: float, lon: float, language: str, units: str) -> Optional[Forecast]:
+        """Запросить прогноз погоды по координатам"""
+        params = {'lat': lat, 'lon': lon, 'lang': language, 'units': units}
+        data = await self._request(config.FORECAST_ENDPOINT, params, "прогноза по координатам")
+        return self._format_forecast(data) if data is not None else None
+    
+    async def _fetch_group(self, city_ids: List[int], language: str, units: str) -> Optional[Dict[int, CurrentWeather]]:
+        """Запросить текущую погоду для нескольких городов одним запросом /group"""
         params = {
-            'q': city,
-            'appid': self.api_key,
-            'lang': self.language,
-            'units': self.units
+            'id': ",".join(str(city_id) for city_id in city_ids),
+            'lang': language,
+            'units': units
         }
-        
-        try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, params=params) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        return self._format_forecast(data)
-                    else:
-                        return None
-        except Exception as e:
-            print(f"Ошибка при получении прогноза: {e}")
+        data = await self._request(config.GROUP_ENDPOINT, params, "погоды для группы городов")
+        if data is None:
             return None
+        group = {}
+        for item in data.get('list', []):
+            weather = self._format_current_weather(item)
+            if weather:
+                group[weather.city_id] = weather
+        return group
     
-    def _format_current_weather(self, data: Dict) -> Dict:
+    def _format_current_weather(self, data: Dict) -> Optional[CurrentWeather]:
         """Форматирование данных о текущей погоде"""
         try:
-            weather = data['weather'][0]
-            main = data['main']
-            wind = data.get('wind', {})
-            
-            return {
-                'city': data['name'],
-                'country': data['sys']['country'],
-                'description': weather['description'].capitalize(),
-                'temperature': round(main['temp']),
-                'feels_like': round(main['feels_like']),
-                'humidity': main['humidity'],
-                'pressure': main['pressure'],
-                'wind_speed': wind.get('speed', 0),
-                'icon': weather['icon']
-            }
-        except KeyError as e:
+            return CurrentWeather.from_owm(data)
+        except (KeyError, IndexError, TypeError, ValueError) as e:
             print(f"Ошибка форматирования погоды: {e}")
             return None
     
-    def _format_forecast(self, data: Dict) -> Dict:
-        """Форматирование данных прогноза погоды"""
+    def _format_forecast(self, data: Dict) -> Optional[Forecast]:
+        """Форматирование прогноза: дневные сводки за один проход по 3-часовым интервалам.
+        
+        Дни считаются по местному времени города. Описание, иконка, влажность и
+        температура берутся из интервала, ближайшего к полудню; дополнительно
+        считаются минимум, максимум и среднее за день и сумма осадков.
+        """
         try:
-            city = data['city']['name']
-            country = data['city']['country']
-            forecasts = []
-            
-            # Группируем прогнозы по дням (берем прогноз на 12:00 каждого дня)
-            daily_forecasts = {}
+            city = data['city']
+            offset = city.get('timezone', 0)
+            days: Dict[int, _DayStats] = {}
             
             for item in data['list']:
-                date = item['dt_txt'].split(' ')[0]
-                time = item['dt_txt'].split(' ')[1]
+                day, seconds = divmod(item['dt'] + offset, 86400)
+                temp = item['main']['temp']
+                rain = item.get('rain')
+                snow = item.get('snow')
+                precipitation = (rain.get('3h', 0) if rain else 0) + (snow.get('3h', 0) if snow else 0)
+                noon_distance = abs(seconds - 43200)
                 
-                # Берем прогноз на полдень (12:00)
-                if time == "12:00:00" and len(daily_forecasts) < 5:
-                    weather = item['weather'][0]
-                    main = item['main']
-                    
-                    daily_forecasts[date] = {
-                        'date': date,
-                        'description': weather['description'].capitalize(),
-                        'temperature': round(main['temp']),
-                        'humidity': main['humidity'],
-                        'icon': weather['icon']
-                    }
+                stats = days.get(day)
+                if stats is None:
+                    if len(days) == 5:
+                        break  # интервалы идут по времени, дальше только следующие дни
+                    days[day] = _DayStats(temp, precipitation, noon_distance, item)
+                else:
+                    stats.add(temp, precipitation, noon_distance, item)
             
-            return {
-                'city': city,
-                'country': country,
-                'forecasts': list(daily_forecasts.values())
-            }
-        except KeyError as e:
+            forecasts = []
+            for day, stats in days.items():
+                weather = stats.noon['weather'][0]
+                main = stats.noon['main']
+                forecasts.append(DailyForecast(
+                    date=date.fromordinal(_EPOCH_ORDINAL + day).isoformat(),
+                    description=weather['description'].capitalize(),
+                    temperature=round(main['temp']),
+                    temp_min=round(stats.temp_min),
+                    temp_max=round(stats.temp_max),
+                    temp_mean=round(stats.temp_sum / stats.count, 1),
+                    precipitation=round(stats.precipitation, 1),
+                    humidity=int(main['humidity']),
+                    icon=weather['icon']
+                ))
+            
+            return Forecast(
+                city=city['name'],
+                country=city['country'],
+                forecasts=tuple(forecasts),
+                stale_age=None
+            )
+        except (KeyError, IndexError, TypeError) as e:
             print(f"Ошибка форматирования прогноза: {e}")
             return None
     
     def get_weather_emoji(self, icon: str) -> str:
         """Получить эмодзи для погоды по коду иконки"""
-        emoji_map = {
-            '01d': '☀️',  # ясно днем
-            '01n': '🌙',  # ясно ночью
-            '02d': '⛅',  # малооблачно днем
-            '02n': '☁️',  # малооблачно ночью
-            '03d': '☁️',  # облачно
-            '03n': '☁️',
-            '04d': '☁️',  # пасмурно
-            '04n': '☁️',
-            '09d': '🌧️',  # дождь
-            '09n': '🌧️',
-            '10d': '🌦️',  # дождь с солнцем
-            '10n': '🌧️',
-            '11d': '⛈️',  # гроза
-            '11n': '⛈️',
-            '13d': '❄️',  # снег
-            '13n': '❄️',
-            '50d': '🌫️',  # туман
-            '50n': '🌫️'
-        }
-        return emoji_map.get(icon, '🌤️')
+        return WEATHER_EMOJI.get(icon, '🌤️')
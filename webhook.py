@@ -0,0 +1,31 @@
+import logging
+import config
+
+logger = logging.getLogger(__name__)
+
+
+def run_webhook(application) -> bool:
+    """Запустить приложение в режиме webhook с проверкой секретного токена.
+
+    Без WEBHOOK_URL или WEBHOOK_SECRET бот не запускается: порт webhook
+    открыт наружу, и без заголовка X-Telegram-Bot-Api-Secret-Token любой
+    может прислать поддельные обновления. Возвращает False, если запуск
+    отменен.
+    """
+    if not config.WEBHOOK_URL:
+        logger.error("Не указан WEBHOOK_URL для режима webhook!")
+        return False
+    if not config.WEBHOOK_SECRET:
+        logger.error("Не указан WEBHOOK_SECRET для режима webhook! "
+                     "Сгенерировать: python -c \"import secrets; print(secrets.token_urlsafe(32))\"")
+        return False
+
+    # Перед остановкой бот дообрабатывает уже принятые обновления
+    application.run_webhook(
+        listen=config.WEBHOOK_LISTEN,
+        port=config.WEBHOOK_PORT,
+        url_path=config.WEBHOOK_PATH,
+        webhook_url=f"{config.WEBHOOK_URL.rstrip('/')}/{config.WEBHOOK_PATH}",
+        secret_token=config.WEBHOOK_SECRET
+    )
+    return True
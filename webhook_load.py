@@ -0,0 +1,81 @@
+"""Нагрузочный тест webhook: отправляет синтетические Update на endpoint бота.
+
+Пример:
+    python webhook_load.py --url http://127.0.0.1:8443/telegram --secret my-secret --count 5000
+"""
+import argparse
+import asyncio
+import random
+import time
+from typing import Dict, List
+import aiohttp
+
+CITIES = ["Москва", "Санкт-Петербург", "Казань", "Сочи", "Новосибирск", "Екатеринбург"]
+COMMANDS = ["/weather Москва", "/forecast Казань", "/currency", "/news", "/convert 100 USD RUB"]
+
+
+def make_update(update_id: int, chat_id: int) -> Dict:
+    """Сформировать JSON обновления с текстовым сообщением"""
+    text = random.choice(CITIES + COMMANDS)
+    message = {
+        'message_id': update_id,
+        'date': int(time.time()),
+        'chat': {'id': chat_id, 'type': 'private'},
+        'from': {'id': chat_id, 'is_bot': False, 'first_name': 'Load'},
+        'text': text
+    }
+    if text.startswith('/'):
+        command = text.split()[0]
+        message['entities'] = [{'type': 'bot_command', 'offset': 0, 'length': len(command)}]
+    return {'update_id': update_id, 'message': message}
+
+
+async def run(url: str, secret: str, count: int, concurrency: int, chats: int):
+    """Отправить count обновлений с заданной параллельностью и вывести статистику"""
+    headers = {'X-Telegram-Bot-Api-Secret-Token': secret} if secret else {}
+    updates = [make_update(i, random.randint(1, chats)) for i in range(1, count + 1)]
+    latencies: List[float] = []
+    errors = 0
+    queue: asyncio.Queue = asyncio.Queue()
+    for update in updates:
+        queue.put_nowait(update)
+
+    async def worker(session: aiohttp.ClientSession):
+        nonlocal errors
+        while not queue.empty():
+            update = queue.get_nowait()
+            started = time.perf_counter()
+            try:
+                async with session.post(url, json=update, headers=headers) as response:
+                    await response.read()
+                    if response.status != 200:
+                        errors += 1
+            except aiohttp.ClientError:
+                errors += 1
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    async with aiohttp.ClientSession() as session:
+        await asyncio.gather(*(worker(session) for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    print(f"Отправлено: {count}, ошибок: {errors}, время: {elapsed:.2f} c")
+    print(f"Пропускная способность: {count / elapsed:.1f} обновлений/с")
+    print(f"Задержка p50: {latencies[len(latencies) // 2] * 1000:.1f} мс, "
+          f"p99: {latencies[int(len(latencies) * 0.99) - 1] * 1000:.1f} мс")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Нагрузочный тест webhook бота")
+    parser.add_argument('--url', default='http://127.0.0.1:8443/telegram', help="адрес webhook")
+    parser.add_argument('--secret', default='', help="секретный токен webhook")
+    parser.add_argument('--count', type=int, default=1000, help="сколько обновлений отправить")
+    parser.add_argument('--concurrency', type=int, default=50, help="одновременных запросов")
+    parser.add_argument('--chats', type=int, default=500, help="число разных чатов")
+    args = parser.parse_args()
+    asyncio.run(run(args.url, args.secret, args.count, args.concurrency, args.chats))
+
+
+if __name__ == "__main__":
+    main()